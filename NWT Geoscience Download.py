@@ -1,11 +1,32 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+import argparse
+import json
 import os
-import re
+import sys
+import threading
+
+from nwt import browser, dom, http_engine, policy, reftypes, spatial, trace
+from nwt.bootstrap import DEFAULT_CACHE, SessionCache
+from nwt.browser import navigate_to_page, setup_search
+from nwt.chrome import ManagedDriver, create_driver
+from nwt.common import BASE_URL, DEFAULT_REFERENCE_TYPE
+from nwt.crawl import first_todo, go_to_page
+from nwt.downloads import DownloadTracker
+from nwt.fetch import Downloader
+from nwt.files import DownloadStore
+from nwt.http_engine import HttpGridSession
+from nwt.incremental import NewestFirst, parse_date
+from nwt.location import split_sheet
+from nwt.manifest import DONE, FAILED, STARTED, open_manifest
+from nwt.parse import parse_records, records_from_grid_rows
+from nwt.pipeline import DownloadPipeline
+from nwt.postprocess import PostProcessor
+from nwt.store import DEFAULT_DB, MetadataStore
+from nwt.sync import wait_for_postback
+
+# Seconds to wait for Chrome to start a report's download, and for a started
+# one to grow before it counts as stalled
+DOWNLOAD_START_TIMEOUT = 120
+STALL_TIMEOUT = 300
 
 def get_user_input(prompt):
     while True:
@@ -16,6 +37,39 @@ def get_user_input(prompt):
             return False
         print("Please enter yes or no.")
 
+def ask(prompt, options, default=True):
+    """get_user_input, except in batch mode, where the default is taken without touching stdin."""
+    if options.batch:
+        return default
+    return get_user_input(prompt)
+
+def parse_pages(text):
+    """'all' -> (1, None); '5' -> (5, 5); '5-20' -> (5, 20); '5-' -> (5, None)."""
+    text = text.strip().lower()
+    if text == "all":
+        return 1, None
+    first, sep, last = text.partition("-")
+    first = int(first)
+    last = (int(last) if last.strip() else None) if sep else first
+    if first < 1 or (last is not None and last < first):
+        raise ValueError(f"bad page range {text!r}")
+    return first, last
+
+def parse_rows(text):
+    """'all' -> None, '1,3,5-7' -> [1, 3, 5, 6, 7]; raises ValueError on bad input."""
+    text = text.strip().lower()
+    if text == 'all':
+        return None
+    nums = set()
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = map(int, part.split('-'))
+            nums.update(range(start, end+1))
+        else:
+            nums.add(int(part))
+    return sorted(nums)
+
 def get_page_range():
     while True:
         try:
@@ -31,173 +85,213 @@ def get_page_range():
         except ValueError:
             print("Please enter valid integer values for page numbers.")
 
-def wait_for_downloads(download_dir, timeout=18000):
-    """Wait for all Chrome downloads to complete. Return elapsed time in seconds."""
-    print(f"Waiting for downloads to complete (timeout: {timeout}s)...")
-    start_overall = time.time()
-
-    # Wait for any .crdownload to appear
-    start_detect = time.time()
-    while time.time() - start_detect < timeout:
-        if any(fn.endswith('.crdownload') for fn in os.listdir(download_dir)):
-            break
-        time.sleep(0.5)
+def choose_page_range(options):
+    """(first, last) from --pages, else the interactive menu. 'all' and open ranges
+    have last None: the page loops stop at the pager's last page."""
+    if options.incremental:
+        # Newest first until a page has nothing new; the loop stops there or at the last page
+        return 1, None
+    if options.pages:
+        first, last = parse_pages(options.pages)
+    elif options.batch:
+        first, last = 1, None
     else:
-        print("No downloads appear to have started. Continuing anyway...")
-        return 0.0
-
-    # Wait for all .crdownload to disappear
-    while True:
-        if not any(fn.endswith('.crdownload') for fn in os.listdir(download_dir)):
-            elapsed = time.time() - start_overall
-            print(f"All downloads completed in {elapsed:.1f} seconds.")
-            time.sleep(2)
-            return elapsed
-        if time.time() - start_overall > timeout:
-            print(f"Download timeout after {timeout} seconds.")
-            return timeout
-        time.sleep(1)
-
-def navigate_to_page(driver, target_page):
-    try:
-        current = driver.find_element(By.CSS_SELECTOR, "span.current").text.strip()
-        current_page = int(current)
-    except:
-        current_page = 1
-
-    print(f"Currently on page {current_page}, navigating to page {target_page}")
-    if current_page == target_page:
-        return True
-
-    # Try direct jump
-    try:
-        xpath = f"//a[contains(@href, \"javascript:__doPostBack('ctl00$MainContent$gvReferences','Page${target_page}')\")]"
-        link = driver.find_element(By.XPATH, xpath)
-        driver.execute_script("arguments[0].scrollIntoView();", link)
-        time.sleep(1)
-        link.click()
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-        time.sleep(2)
-        return True
-    except:
-        # Fallback: click “Next” until you reach it
-        while current_page < target_page:
+        print("\nDownload Mode:\n1) Pick pages & rows\n2) All pages\n")
+        while True:
+            mode = input("Choice (1/2): ").strip()
+            if mode in ('1','2'): break
+        if mode == '1':
+            return get_page_range()
+        first, last = 1, None
+        options.auto_advance = get_user_input("Auto-advance through all pages without prompt?")
+    return first, last
+
+def row_tracker(download_dir, manifest=None, store=None, stall_timeout=STALL_TIMEOUT):
+    """DownloadTracker that files each download under its Reference and marks
+    the row done once its last file lands."""
+    def on_finish(download):
+        if download.owner is None:
+            return
+        page, row, reference, page_refs = download.owner
+        if download.error:
+            if manifest is not None:
+                manifest.mark_row(page, row, reference, FAILED, error=f"download {download.error}")
+            return
+        if store is not None and download.sha256:
             try:
-                nxt = driver.find_element(By.XPATH, "//a[contains(@href, 'Page$Next')]")
-                driver.execute_script("arguments[0].scrollIntoView();", nxt)
-                time.sleep(1)
-                nxt.click()
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-                time.sleep(2)
-                try:
-                    current_page = int(driver.find_element(By.CSS_SELECTOR, "span.current").text.strip())
-                except:
-                    current_page += 1
-            except Exception as e:
-                print(f"Navigation error: {e}")
-                return False
-        return True
+                download.path = store.add_file(reference, download.path, download.sha256, download.size)
+            except OSError as e:
+                download.error = f"could not be stored: {e}"
+                if manifest is not None:
+                    manifest.mark_row(page, row, reference, FAILED, error=download.error)
+                return
+        if any(d.owner == download.owner for d in tracker.in_flight.values()) \
+                or any(d.owner == download.owner and d.error for d in tracker.finished):
+            return
+        if store is not None:
+            store.mark_complete(reference)
+        if manifest is not None:
+            manifest.mark_row(page, row, reference, DONE)
+            if all(manifest.row_done(ref) for ref in page_refs):
+                manifest.mark_page(page, DONE)
+
+    tracker = DownloadTracker(download_dir, on_finish, stall_timeout=stall_timeout)
+    return tracker
 
 def find_download_links(driver):
+    """Return [(row number, link dict)] for every download link on the page in one roundtrip."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         print("Scanning for download links...")
-        table = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-
-        # Method 1: icons
-        icons = driver.find_elements(By.CSS_SELECTOR, "i.fa-download")
-        links = []
-        for icon in icons:
-            try:
-                a = icon.find_element(By.XPATH, "./..")
-                if a.tag_name == 'a' and a.get_attribute('href'):
-                    links.append(a)
-            except:
-                pass
-        if links:
-            print(f"Found {len(links)} via icon")
-            return [(i+1, link) for i, link in enumerate(links)]
-
-        # Method 2: href pattern
-        all_a = driver.find_elements(By.TAG_NAME, "a")
-        links = [a for a in all_a if a.get_attribute('href') and 'DownloadRec' in a.get_attribute('href')]
-        if links:
-            print(f"Found {len(links)} via href pattern")
-            return [(i+1, link) for i, link in enumerate(links)]
-
-        # Method 3: scan rows
-        rows = table.find_elements(By.TAG_NAME, "tr")
-        links = []
-        for idx, row in enumerate(rows[1:], start=1):
-            try:
-                a_tags = row.find_elements(By.TAG_NAME, "a")
-                for a in a_tags:
-                    if a.get_attribute('href') and ('DownloadRec' in a.get_attribute('href') or '__doPostBack' in a.get_attribute('href')):
-                        links.append((idx, a))
-                        break
-            except:
-                pass
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
+        links = dom.download_links(dom.grid_rows(driver))
         if links:
-            print(f"Found {len(links)} via table scan")
-            return links
-
-        print("No download links found.")
-        return []
+            print(f"Found {len(links)} download links")
+        else:
+            print("No download links found.")
+        return links
     except Exception as e:
         print(f"Error scanning links: {e}")
         return []
 
 def get_row_numbers_to_download():
     while True:
-        txt = input("Enter row number(s) (e.g., '1,3,5-7' or 'all'): ").strip().lower()
-        if txt == 'all':
-            return None
+        txt = input("Enter row number(s) (e.g., '1,3,5-7' or 'all'): ")
         try:
-            nums = set()
-            for part in txt.split(','):
-                part = part.strip()
-                if '-' in part:
-                    start, end = map(int, part.split('-'))
-                    nums.update(range(start, end+1))
-                else:
-                    nums.add(int(part))
-            return sorted(nums)
-        except:
+            return parse_rows(txt)
+        except ValueError:
             print("Invalid format. Try again.")
 
-def download_individual_reports(driver, download_dir):
+def choose_rows(links, options, manifest=None, store=None):
+    """Pick the page's rows to download (--rows, else ask; all in batch mode),
+    leaving out ones the manifest or store has."""
+    if options.rows:
+        row_nums = parse_rows(options.rows)
+    elif options.batch:
+        row_nums = None
+    else:
+        row_nums = get_row_numbers_to_download()
+    link_dict = {i: link for i, link in links}
+    to_download = sorted(link_dict.keys()) if row_nums is None else [n for n in row_nums if n in link_dict]
+
+    if row_nums:
+        missing = [n for n in row_nums if n not in link_dict]
+        if missing:
+            print(f"Rows {missing} not found; skipping them.")
+
+    if options.only is not None:
+        selected = [n for n in to_download if link_dict[n]["reference"] in options.only]
+        options.found.update(link_dict[n]["reference"] for n in selected)
+        print(f"{len(selected)} of the page's rows are in the selection ({len(options.found)}/{len(options.only)} found so far)")
+        to_download = selected
+
+    if manifest is not None:
+        already = [n for n in to_download if manifest.row_done(link_dict[n]["reference"])]
+        if already:
+            print(f"Rows {already} already downloaded in an earlier run; skipping them.")
+            to_download = [n for n in to_download if n not in already]
+    if store is not None:
+        stored = [n for n in to_download if store.is_complete(link_dict[n]["reference"], options.verify)]
+        if stored:
+            print(f"Rows {stored} are already in the download store; skipping them.")
+            to_download = [n for n in to_download if n not in stored]
+    return to_download
+
+def nothing_new(page, references, records, store, order):
+    """--incremental stop rule: every report on the page is already in the store, and
+    the grid has been newest-first so far (order is a NewestFirst fed the page's records)."""
+    if not order.check(page, records or []):
+        return False
+    return bool(references) and all(store.is_complete(reference) for reference in references)
+
+def selecting(options):
+    return bool(options.area or options.sheets or options.search or options.company
+                or options.date_from or options.date_to)
+
+def select_reports(options):
+    """--area/--sheets and --search/--company/--date-*: the reports the metadata store
+    picks out (all the given filters must hold), and where to start looking.
+
+    Reports only ever move to later pages as new ones are added, so none of
+    them can be before the earliest page any was last scraped on.
+    """
+    store = MetadataStore(options.db)
+    try:
+        selections = []
+        if options.area or options.sheets:
+            bbox = spatial.parse_bbox(options.area) if options.area else None
+            selections.append(store.in_area(bbox, options.sheets.split(",") if options.sheets else None))
+        if options.search or options.company or options.date_from or options.date_to:
+            selections.append(store.search(options.search, options.company, options.date_from, options.date_to))
+    finally:
+        store.close()
+    rows = {row["reference"]: row for row in selections[0]}
+    for selection in selections[1:]:
+        rows = {row["reference"]: rows[row["reference"]] for row in selection if row["reference"] in rows}
+    options.only = set(rows)
+    pages = [row["page"] for row in rows.values() if row["page"]]
+    first = min(pages) if pages else 1
+    print(f"{len(rows)} reports in {options.db} match the selection; looking for them from page {first}")
+    if not options.pages and not options.incremental:
+        options.pages = f"{first}-"
+    return rows
+
+def type_start(rows, reference_type):
+    """--pages for one of several types: from the earliest page its selected reports were
+    scraped on (each type has its own page numbers), or None if none of them is of that type."""
+    pages = [row["page"] or 1 for row in rows.values() if row["type"] == reference_type]
+    return f"{min(pages)}-" if pages else None
+
+def selection_done(options):
+    """Every report of the --area/--search selection has been seen on some page."""
+    return options.only is not None and options.only <= options.found
+
+def download_individual_reports(driver, tracker, options, page=None, manifest=None, store=None):
+    """Download the chosen rows of the current page; rows the manifest has are skipped.
+
+    With --concurrency N > 0 a row's download is only waited on until it
+    starts; the next row is clicked while up to N files are still
+    transferring. The tracker marks each row done when its file lands.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     print("Starting individual downloads...")
     WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-    links = find_download_links(driver)
+    with trace.phase("link_discovery", page=page):
+        links = find_download_links(driver)
     if not links:
         driver.save_screenshot("no_links.png")
         with open("no_links.html", "w", encoding="utf-8") as f:
             f.write(driver.page_source)
         return False
 
-    row_nums = get_row_numbers_to_download()
     link_dict = {i: link for i, link in links}
-    to_download = sorted(link_dict.keys()) if row_nums is None else [n for n in row_nums if n in link_dict]
-
-    if row_nums:
-        missing = [n for n in row_nums if n not in link_dict]
-        if missing:
-            print(f"Rows {missing} not found; skipping them.")
+    references = {i: link["reference"] for i, link in links}
+    to_download = choose_rows(links, options, manifest, store)
 
     print(f"Will download rows: {to_download}")
 
     for idx, row in enumerate(to_download):
-        # refetch links to avoid stale elements
+        # refetch links after each postback; the grid may have been re-rendered
         if idx > 0:
-            links = find_download_links(driver)
+            with trace.phase("link_discovery", page=page):
+                links = find_download_links(driver)
             link_dict = {i: link for i, link in links}
-            if row not in link_dict:
+            if row not in link_dict or link_dict[row]["reference"] != references[row]:
                 print(f"Row {row} disappeared; skipping.")
                 continue
 
-        link = link_dict[row]
-        print(f"Downloading row {row}...")
+        link = dom.resolve_link(driver, link_dict[row])
+        if link is None:
+            print(f"Row {row} disappeared; skipping.")
+            continue
+        print(f"Downloading row {row} ({link_dict[row]['reference']})...")
         driver.execute_script("arguments[0].scrollIntoView(true);", link)
-        time.sleep(1)
 
         # try click methods
         success = False
@@ -209,11 +303,11 @@ def download_individual_reports(driver, download_dir):
                     method(link)
                     success = True
                     break
-                except:
+                except Exception:
                     pass
             else:
                 # last resort: exec JS href
-                href = link.get_attribute('href')
+                href = link_dict[row]["href"]
                 if href and href.startswith('javascript:'):
                     driver.execute_script(href.replace('javascript:', ''))
                     success = True
@@ -221,131 +315,520 @@ def download_individual_reports(driver, download_dir):
 
         if not success:
             print(f"Failed to click row {row}")
+            if manifest is not None:
+                manifest.mark_row(page, row, references[row], FAILED, error="click failed")
             continue
+        if manifest is not None:
+            manifest.mark_row(page, row, references[row], STARTED)
 
         # wait for download dialog
-        try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_ASPxButton1")))
-            time.sleep(2)
-            driver.find_element(By.ID, "MainContent_ASPxButton1").click()
-        except:
-            print("Could not click 'Download All'")
-        elapsed = wait_for_downloads(download_dir, timeout=18000)
-
-        # remove all
+        error = None
+        tracker.expect((page, row, references[row], tuple(references.values())))
+        with trace.phase("download_start", page=page, reference=references[row]) as timing:
+            try:
+                policy.shared().retry(
+                    lambda: WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.ID, "MainContent_ASPxButton1"))).click(),
+                    "Clicking 'Download All'", attempts=3)
+            except Exception as e:
+                print(f"Could not click 'Download All': {e}")
+                error = "could not click 'Download All'"
+            if error is None and not tracker.wait_for_start(options.start_timeout):
+                error = "no download started"
+            if error:
+                timing.fields["error"] = error
+        stalled = False
+        if error is None:
+            # Block until a slot frees up (or, with --concurrency 0, this file lands)
+            finished = tracker.wait(max(options.concurrency - 1, 0))
+            stalled = any(d.error == "stalled" for d in finished)
+        if error and manifest is not None:
+            manifest.mark_row(page, row, references[row], FAILED, error=error)
+
+        # remove all, then wait for the grid to come back
         try:
             btn = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "MainContent_ASPxButton3")))
-            btn.click()
-            time.sleep(2)
-        except:
-            pass
+            wait_for_postback(driver, btn.click, optional=True)
+        except Exception as e:
+            print(f"Could not close the download dialog: {e}")
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-        time.sleep(2)
 
         # decide whether to prompt
-        if elapsed >= 18000 and idx != len(to_download)-1:
-            if not get_user_input("Download hit timeout. Continue to next?"):
+        if stalled and idx != len(to_download)-1:
+            if not ask("A download stalled. Continue to next?", options, default=options.on_stall == "continue"):
                 print("Stopping as per user request.")
                 break
         else:
             print("Proceeding automatically to next report...")
 
+    if manifest is not None and all(manifest.row_done(ref) for ref in references.values()):
+        manifest.mark_page(page, DONE)
     return True
 
-def download_page_reports(driver, page, download_dir):
+def download_page_reports(driver, page, tracker, options, manifest=None, store=None):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     print(f"\n--- Page {page} ---")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-    return download_individual_reports(driver, download_dir)
+    with trace.phase("table_wait", page=page):
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
+    return download_individual_reports(driver, tracker, options, page, manifest, store)
+
+def download_pages_in_range(managed, first_page, last_page, download_dir, options, manifest=None, store=None):
+    """Download pages first_page..last_page, resuming from the manifest if given.
 
-def download_pages_in_range(driver, first_page, last_page, download_dir):
-    if first_page > 1 and not navigate_to_page(driver, first_page):
-        print(f"Could not go to page {first_page}")
+    With --concurrency > 0, paging on doesn't wait for the current page's
+    files; the remaining transfers are waited for once at the end. managed is
+    a ManagedDriver, recycled between pages once its downloads have landed.
+    """
+    tracker = row_tracker(download_dir, manifest, store, options.stall_timeout)
+    try:
+        _download_pages_in_range(managed, first_page, last_page, tracker, options, manifest, store)
+    finally:
+        if tracker.in_flight:
+            print(f"Waiting for {len(tracker.in_flight)} download(s) still in progress...")
+            tracker.wait()
+        tracker.close()
+
+def _download_pages_in_range(managed, first_page, last_page, tracker, options, manifest, store):
+    find_last_page = lambda: browser.find_last_page_number(managed.driver)
+    if manifest is not None:
+        print(manifest.summary(first_page, last_page))
+    curr, last_page = first_todo(first_page, last_page, manifest, find_last_page)
+    if curr is None:
+        print(f"All pages {first_page}-{last_page} already downloaded.")
         return
 
-    curr = first_page
-    while curr <= last_page:
-        if not download_page_reports(driver, curr, download_dir):
+    try:
+        if curr > 1:
+            go_to_page(curr, lambda: browser.next_page(managed.driver),
+                       lambda page: navigate_to_page(managed.driver, page), step=False)
+    except Exception as e:
+        print(f"Could not go to page {curr}: {e}")
+        return
+
+    order = NewestFirst()
+    while last_page is None or curr <= last_page:
+        rows = dom.grid_rows(managed.driver) if options.incremental else None
+        if options.incremental and nothing_new(curr, [link["reference"] for _, link in dom.download_links(rows)],
+                                               records_from_grid_rows(rows), store, order):
+            print(f"Page {curr} has only stored reports; everything after it is older. Stopping.")
+            break
+        if not download_page_reports(managed.driver, curr, tracker, options, manifest, store):
             print("Halting due to an error.")
             break
-        if curr == last_page:
+        trace.count("page", page=curr)
+        if selection_done(options):
+            print(f"Every selected report has turned up by page {curr}. Stopping.")
+            break
+        if managed.page_done(curr):
+            # Quitting Chrome would kill its downloads, so let them land first
+            if tracker.in_flight:
+                print(f"Waiting for {len(tracker.in_flight)} download(s) before recycling the browser...")
+                tracker.wait()
+            managed.recycle(curr)
+        if browser.on_last_page(managed.driver):
+            print(f"Page {curr} is the last page of results.")
+            break
+        # Pages whose files are still transferring count as to-do here
+        next_todo, last_page = first_todo(curr + 1, last_page, manifest, find_last_page)
+        if next_todo is None:
             print(f"Done through page {last_page}.")
             break
-        if not get_user_input(f"Proceed to page {curr+1}?"):
+        if not options.auto_advance and not ask(f"Proceed to page {next_todo}?", options):
             print("User halted at page transition.")
             break
-        # click Next
+        # click Next, or jump over pages finished in an earlier run
         try:
-            xpath = f"//a[contains(@href, \"Page${curr+1}\")]"
-            nxt = driver.find_element(By.XPATH, xpath)
-            driver.execute_script("arguments[0].scrollIntoView();", nxt)
-            time.sleep(1)
-            nxt.click()
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-            time.sleep(2)
-            curr += 1
+            go_to_page(next_todo, lambda: browser.next_page(managed.driver),
+                       lambda page: navigate_to_page(managed.driver, page), step=next_todo == curr + 1)
+            curr = next_todo
         except Exception as e:
             print(f"Could not advance: {e}")
             break
 
-def main():
-    options = Options()
-    options.add_argument("--window-size=1920,1080")
-    download_dir = os.path.join(os.getcwd(), "downloaded_reports")
-    os.makedirs(download_dir, exist_ok=True)
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    options.add_experimental_option("prefs", prefs)
-    for arg in ("--disable-extensions","--disable-gpu","--no-sandbox","--disable-dev-shm-usage"):
-        options.add_argument(arg)
-
-    driver = webdriver.Chrome(options=options)
+def download_page_http(session, page, pipeline, options, manifest=None, store=None):
+    """Resolve the chosen rows' files over HTTP and queue them on the download pipeline.
+
+    Returns as soon as the jobs are queued; rows (and the page) are marked in
+    the manifest from the worker threads as their last file lands.
+    """
+    print(f"\n--- Page {page} ---")
+    with trace.phase("link_discovery", page=page, engine="http"):
+        links = http_engine.download_links(session.soup)
+    if not links:
+        with open("no_links.html", "w", encoding="utf-8") as f:
+            f.write(session.html)
+        print("No download links found.")
+        return False
+    link_dict = {i: link for i, link in links}
+    references = {i: link["reference"] for i, link in links}
+    to_download = choose_rows(links, options, manifest, store)
+    print(f"Will download rows: {to_download}")
+
+    lock = threading.Lock()
+    pending = {}
+    errors = {}
+
+    def row_finished(row):
+        error = errors.get(row)
+        if store is not None and not error:
+            store.mark_complete(references[row])
+        if manifest is None:
+            return
+        manifest.mark_row(page, row, references[row], FAILED if error else DONE, error=error)
+        if all(manifest.row_done(ref) for ref in references.values()):
+            manifest.mark_page(page, DONE)
+
+    def job_done(row):
+        def on_done(job, result, error):
+            if store is not None and not error:
+                path, size, sha256 = result
+                try:
+                    store.add_file(job.reference, path, sha256, size)
+                except OSError as e:
+                    error = f"could not store {path}: {e}"
+            with lock:
+                if error:
+                    errors.setdefault(row, error)
+                pending[row] -= 1
+                last = pending[row] == 0
+            if last:
+                row_finished(row)
+        return on_done
+
+    for row in to_download:
+        try:
+            with trace.phase("resolve", page=page, reference=references[row]):
+                files = session.resolve_report_files(link_dict[row])
+        except Exception as e:
+            print(f"Could not resolve files for row {row}: {e}")
+            if manifest is not None:
+                manifest.mark_row(page, row, references[row], FAILED, error=str(e))
+            continue
+        print(f"Row {row} ({references[row]}): {len(files)} file(s)")
+        if manifest is not None:
+            manifest.mark_row(page, row, references[row], STARTED)
+        pending[row] = len(files)
+        if not files:
+            errors[row] = "no files found"
+            row_finished(row)
+        for job in files:
+            # Blocks while the workers are behind, so the crawl can't run far ahead
+            pipeline.submit(job, job_done(row))
+    if manifest is not None and all(manifest.row_done(ref) for ref in references.values()):
+        manifest.mark_page(page, DONE)
+    pipeline.report()
+    return True
+
+def download_pages_http(session, first_page, last_page, pipeline, options, manifest=None, store=None):
+    """HTTP counterpart of download_pages_in_range; pages on while earlier files are still transferring."""
+    if manifest is not None:
+        print(manifest.summary(first_page, last_page))
+    curr, last_page = first_todo(first_page, last_page, manifest, session.find_last_page)
+    if curr is None:
+        print(f"All pages {first_page}-{last_page} already downloaded.")
+        return
+
+    try:
+        if curr > 1:
+            go_to_page(curr, session.next_page, session.navigate_to_page, step=False)
+    except Exception as e:
+        print(f"Could not go to page {curr}: {e}")
+        return
+
+    order = NewestFirst()
+    while last_page is None or curr <= last_page:
+        if options.incremental and nothing_new(curr, [link["reference"] for _, link in http_engine.download_links(session.soup)],
+                                               parse_records(session.html), store, order):
+            print(f"Page {curr} has only stored reports; everything after it is older. Stopping.")
+            break
+        if not download_page_http(session, curr, pipeline, options, manifest, store):
+            print("Halting due to an error.")
+            break
+        trace.count("page", page=curr)
+        if selection_done(options):
+            print(f"Every selected report has turned up by page {curr}. Stopping.")
+            break
+        if session.on_last_page():
+            print(f"Page {curr} is the last page of results.")
+            break
+        # Pages whose files are still queued count as to-do here, so skip
+        # only those finished in an earlier run
+        next_todo, last_page = first_todo(curr + 1, last_page, manifest, session.find_last_page)
+        if next_todo is None:
+            print(f"Done through page {last_page}.")
+            break
+        if not options.auto_advance and not ask(f"Proceed to page {next_todo}?", options):
+            print("User halted at page transition.")
+            break
+        try:
+            go_to_page(next_todo, session.next_page, session.navigate_to_page, step=next_todo == curr + 1)
+            curr = next_todo
+        except Exception as e:
+            print(f"Could not advance: {e}")
+            break
+
+def open_store(download_dir, processor=None):
+    """The download store, handing each stored file (and any left over from earlier runs) to processor."""
+    store = DownloadStore(download_dir, on_file=processor.submit if processor else None)
+    print(store.summary())
+    if processor:
+        processor.catch_up(store)
+    return store
+
+def plan_run(args, download_dir):
+    """(manifest, first page, last page) for this type's run.
+
+    The manifest keeps per-page and per-row progress, so a re-run resumes
+    where this one stops. Page numbers shift as reports are added, so an
+    --incremental run has none and goes by the store alone.
+    """
+    manifest = None if args.incremental else open_manifest(reftypes.partition(args.report_type, download_dir))
+    first, last = choose_page_range(args)
+    return manifest, first, last
+
+def run_http(args, download_dir, store):
+    """Download without a browser: one thread walks the pages, a worker pool fetches the files."""
+    session = HttpGridSession(args.base_url)
+    try:
+        session.setup(args.report_type, session_cache(args))
+        manifest, fp, lp = plan_run(args, download_dir)
+        # Share the ASP.NET session cookie with the download pool
+        downloader = Downloader(session.http, max_workers=max(1, args.concurrency))
+        # Each file lands straight in its report's folder
+        dest = lambda job: store.report_dir(job.reference)
+        with DownloadPipeline(downloader, dest, max_queue=args.queue_size) as pipeline:
+            download_pages_http(session, fp, lp, pipeline, args, manifest, store)
+            print("Waiting for queued downloads to finish...")
+        print("All done.")
+        return True
+    except Exception as e:
+        print("Fatal error:", e)
+        with open("error.html", "w", encoding="utf-8") as f:
+            f.write(session.html)
+        return False
+
+def load_job(path):
+    """Read a JSON job file whose keys are this script's long options, e.g.
+    {"pages": "1-50", "rows": "all", "engine": "http", "concurrency": 8}."""
+    with open(path, encoding="utf-8") as f:
+        job = json.load(f)
+    return {key.replace("-", "_"): value for key, value in job.items()}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download NWT Geoscience assessment reports.")
+    parser.add_argument("--engine", choices=("chrome", "http"), default="chrome",
+                        help="click through Chrome (default) or fetch files directly over HTTP")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="site root, e.g. a local stand-in server for testing")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="concurrent file transfers (Chrome: downloads left running while "
+                             "the next rows are clicked; 0 waits for each one as before)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="files allowed to wait for a free worker before paging blocks "
+                             "(default twice --concurrency)")
+    parser.add_argument("--rate", type=float, default=4.0,
+                        help="requests per second to start at; adapts to the site's latency (default 4)")
+    parser.add_argument("--max-rate", type=float, default=16.0,
+                        help="ceiling for the adaptive request rate (default 16)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="download only reports the store doesn't have, from the newest page until "
+                             "a page has none (implies --batch)")
+    parser.add_argument("--verify", action="store_true",
+                        help="re-hash stored files against their SHA-256 before skipping a report")
+    parser.add_argument("--postprocess", action="store_true",
+                        help="verify, unzip and extract text from each file as it lands (see nwt/postprocess.py)")
+    parser.add_argument("--postprocess-workers", type=int, default=None,
+                        help="post-processing worker processes (default half the CPUs)")
+    parser.add_argument("--worker-memory-mb", type=int, default=2048,
+                        help="address-space cap per post-processing worker (default 2048)")
+    select = parser.add_argument_group("report selection",
+                                       "download only the reports the scraper's metadata store picks out "
+                                       "(nwt/spatial.py, nwt/search.py); filters combine, and imply --batch")
+    select.add_argument("--area", metavar="W,S,E,N",
+                        help="bounding box in decimal degrees, west longitudes negative, e.g. -116,62,-114,63")
+    select.add_argument("--sheets", help="NTS sheets, map areas or series, e.g. 85J/8,85I,96")
+    select.add_argument("--search", metavar="QUERY",
+                        help='words in the title, company or type, "phrases", prefix* and -exclusions')
+    select.add_argument("--company", help="words that must all appear in the company name, in any order")
+    select.add_argument("--date-from", help="reports dated on or after this day")
+    select.add_argument("--date-to", help="reports dated on or before this day")
+    select.add_argument("--db", default=DEFAULT_DB, help=f"scraper's SQLite store (default {DEFAULT_DB})")
+    batch = parser.add_argument_group("unattended runs")
+    batch.add_argument("--job", help="JSON job file with any of these options; implies --batch")
+    batch.add_argument("--batch", action="store_true",
+                       help="never read stdin: all pages and rows unless given, no confirmations")
+    batch.add_argument("--pages", help="'5-20', '5', '5-' (to the end) or 'all'; the end is read from the pager")
+    batch.add_argument("--rows", help="rows on every page, e.g. '1,3,5-7' or 'all'")
+    batch.add_argument("--report-type", default=DEFAULT_REFERENCE_TYPE,
+                       help=f"reference type to search for (default {DEFAULT_REFERENCE_TYPE!r}), several "
+                            "separated by commas, or 'all'; the types are downloaded one after another")
+    batch.add_argument("--output-dir", default="downloaded_reports", help="download folder (default downloaded_reports)")
+    batch.add_argument("--start-timeout", type=float, default=DOWNLOAD_START_TIMEOUT,
+                       help=f"seconds for a download to start (default {DOWNLOAD_START_TIMEOUT})")
+    batch.add_argument("--stall-timeout", type=float, default=STALL_TIMEOUT,
+                       help=f"seconds without growth before a download counts as stalled (default {STALL_TIMEOUT})")
+    batch.add_argument("--on-stall", choices=("continue", "stop"), default="continue",
+                       help="what batch mode does after a stalled download (default continue)")
+    batch.add_argument("--headless", action="store_true", help="run Chrome without a window")
+    parser.add_argument("--resources", choices=("full", "lean"), default="lean",
+                        help="what Chrome may fetch: full, or lean (no images/fonts, default)")
+    parser.add_argument("--recycle-after", type=int, default=100,
+                        help="restart Chrome after this many pages to cap its memory (0 = never)")
+    parser.add_argument("--session-cache", default=DEFAULT_CACHE,
+                        help=f"where to keep the post-search session state for reuse (default {DEFAULT_CACHE})")
+    parser.add_argument("--no-session-cache", action="store_true",
+                        help="always run the full search setup")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write per-phase timings to FILE (JSONL) and print a p50/p95 summary at the end")
+    args = parser.parse_args()
+    if args.job:
+        job = load_job(args.job)
+        unknown = set(job) - set(vars(args))
+        if unknown:
+            parser.error(f"unknown keys in {args.job}: {', '.join(sorted(unknown))}")
+        # Flags given on the command line still win over the job file
+        parser.set_defaults(**job, batch=True)
+        args = parser.parse_args()
+    if args.pages:
+        try:
+            parse_pages(args.pages)
+        except ValueError:
+            parser.error(f"--pages: expected 'N-M', 'N', 'N-' or 'all', got {args.pages!r}")
+    if args.rows:
+        try:
+            parse_rows(args.rows)
+        except ValueError:
+            parser.error(f"--rows: expected e.g. '1,3,5-7' or 'all', got {args.rows!r}")
+    if args.area:
+        try:
+            spatial.parse_bbox(args.area)
+        except ValueError as e:
+            parser.error(f"--area: {e}")
+    for sheet in (args.sheets or "").split(","):
+        if sheet.strip() and split_sheet(sheet) is None:
+            parser.error(f"--sheets: not an NTS sheet, map area or series: {sheet!r}")
+    for flag in ("date_from", "date_to"):
+        if getattr(args, flag) and parse_date(getattr(args, flag)) is None:
+            parser.error(f"--{flag.replace('_', '-')}: not a date: {getattr(args, flag)!r}")
+    if selecting(args):
+        args.batch = True
+    args.only, args.found = None, set()
+    if args.incremental:
+        if args.pages:
+            parser.error("--incremental reads from the newest page on; it can't be combined with --pages")
+        args.batch = True
+    args.auto_advance = False
+    return args
+
+def new_driver(args, download_dir):
+    driver = create_driver(args.resources, headless=args.headless, download_dir=download_dir)
     driver.set_page_load_timeout(1000)
+    return driver
+
+def session_cache(args):
+    return None if args.no_session_cache else SessionCache(args.session_cache)
 
+def open_search(driver, args, page=1):
+    """Run the search in a (fresh) browser and go to `page`."""
+    setup_search(driver, args.base_url, args.report_type, session_cache(args))
+    if page > 1 and not navigate_to_page(driver, page):
+        raise Exception(f"Could not get back to page {page}")
+
+def report_types(args, download_dir):
+    """The picker names --report-type stands for; the site's list is only read for other types than the default."""
+    if not reftypes.needs_picker(args.report_type):
+        return [args.report_type]
     try:
-        driver.get("https://app.nwtgeoscience.ca/Searching/ReferenceSearch.aspx")
-        time.sleep(3)
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "MainContent_butReferenceType"))).click()
-        time.sleep(2)
-        rows = driver.find_element(By.ID, "MainContent_gvRefTypeSel").find_elements(By.TAG_NAME, "tr")
-        for row in rows:
-            cols = row.find_elements(By.TAG_NAME, "td")
-            if len(cols)>=2 and "Assessment Report" in cols[1].text:
-                driver.execute_script("arguments[0].click();", cols[0].find_element(By.TAG_NAME, "input"))
-                break
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "MainContent_btnApplyRefType"))).click()
-        time.sleep(2)
-        driver.find_element(By.ID, "MainContent_btnSearch").click()
-        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
+        available = HttpGridSession(args.base_url).reference_types()
+    except Exception as e:
+        if args.engine == "http":
+            raise ValueError(f"could not read the site's list of types: {e}")
+        print(f"Could not list the reference types over HTTP ({e}); asking Chrome.")
+        driver = new_driver(args, download_dir)
+        try:
+            available = browser.reference_types(driver, args.base_url)
+        finally:
+            driver.quit()
+    return reftypes.resolve(args.report_type, available)
 
-        print("\nDownload Mode:\n1) Pick pages & rows\n2) All pages\n")
-        while True:
-            mode = input("Choice (1/2): ").strip()
-            if mode in ('1','2'): break
+def run_chrome(args, download_dir, store):
+    managed = ManagedDriver(lambda: new_driver(args, download_dir),
+                            lambda driver, page: open_search(driver, args, page),
+                            args.recycle_after)
+    driver = managed.driver
 
-        if mode=='1':
-            fp, lp = get_page_range()
-            download_pages_in_range(driver, fp, lp, download_dir)
-        else:
-            auto = get_user_input("Auto-advance through all pages without prompt?")
-            download_pages_in_range(driver, 1, 9999, download_dir)
+    try:
+        open_search(driver, args)
+        manifest, fp, lp = plan_run(args, download_dir)
+        download_pages_in_range(managed, fp, lp, download_dir, args, manifest, store)
 
         print("All done.")
+        return True
 
     except Exception as e:
         print("Fatal error:", e)
         try:
-            driver.save_screenshot("error.png")
+            managed.driver.save_screenshot("error.png")
             with open("error.html","w",encoding="utf-8") as f:
-                f.write(driver.page_source)
-        except:
+                f.write(managed.driver.page_source)
+        except Exception:
             pass
+        return False
     finally:
-        driver.quit()
+        managed.quit()
         print("Driver closed.")
 
+def main():
+    args = parse_args()
+    download_dir = os.path.abspath(args.output_dir)
+    os.makedirs(download_dir, exist_ok=True)
+    if args.trace:
+        trace.enable(args.trace)
+    policy.configure(args.rate, args.max_rate)
+    try:
+        types = report_types(args, download_dir)
+    except ValueError as e:
+        sys.exit(f"Report type: {e}")
+    pages, selected = args.pages, None
+    if selecting(args):
+        try:
+            selected = select_reports(args)
+            if not selected:
+                print("No reports match the selection; nothing to download.")
+                return
+        except ValueError as e:
+            sys.exit(f"Selection: {e}")
+    processor = PostProcessor(download_dir, args.postprocess_workers, args.worker_memory_mb) \
+        if args.postprocess else None
+    try:
+        store = open_store(download_dir, processor)
+        run = run_http if args.engine == "http" else run_chrome
+        ok = True
+        # One type at a time: the transfers, not the page walks, are what take long
+        for reference_type in types:
+            args.report_type = reference_type
+            if len(types) > 1:
+                if selection_done(args):
+                    break
+                print(f"\n{reference_type}:")
+                if selected is not None and not pages and not args.incremental:
+                    args.pages = type_start(selected, reference_type)
+                    if args.pages is None:
+                        print(f"None of the selected reports is of type {reference_type}.")
+                        continue
+            ok = run(args, download_dir, store) and ok
+    finally:
+        if processor:
+            print("Waiting for post-processing to finish...")
+            processor.close()
+        policy.shared().report()
+        trace.summary()
+    # A non-zero exit lets batch schedulers notice a failed job
+    if not ok:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
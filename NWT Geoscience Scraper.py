@@ -1,13 +1,24 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from datetime import datetime
+from functools import partial
+import argparse
+import glob
 import json
-import time
 import os
 
+from nwt import browser, dom, http_engine, policy, reftypes, trace
+from nwt.bootstrap import DEFAULT_CACHE, SessionCache
+from nwt.browser import navigate_to_page, setup_search
+from nwt.chrome import POLICIES, ManagedDriver, create_driver
+from nwt.common import BASE_URL, DEFAULT_REFERENCE_TYPE
+from nwt.crawl import scrape_range
+from nwt.http_engine import HttpGridSession
+from nwt.incremental import crawl_new, known_references
+from nwt.manifest import RunManifest, open_manifest
+from nwt.parse import parse_records, records_from_grid_rows, save_page_data, set_default_backend
+from nwt.shards import http_shard_worker, http_type_worker, run_per_type, run_sharded, shard_progress
+from nwt.spatial import page_files
+from nwt.store import DEFAULT_DB, MetadataStore, to_record
+
 def get_page_range():
     while True:
         try:
@@ -25,199 +36,395 @@ def get_page_range():
         except ValueError:
             print("Please enter valid integer values for page numbers.")
 
-def extract_page_data(driver, page_number, folder="assessment_reports"):
+def read_grid(driver, page_number):
+    """The current page's records, or None if the grid is missing."""
+    with trace.phase("parse", page=page_number) as timing:
+        try:
+            # Read just the grid in one roundtrip instead of serializing the whole page
+            return records_from_grid_rows(dom.grid_rows(driver))
+        except Exception as e:
+            print(f"Batched extraction failed ({e}); parsing page source instead.")
+            timing.fields["fallback"] = True
+            return parse_records(driver.page_source)
+
+def extract_page_data(driver, page_number, folder="assessment_reports", store=None):
     print(f"Extracting data from page {page_number}...")
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    table = soup.find("table", id="MainContent_gvReferences")
-    
-    if not table:
+    page_data = read_grid(driver, page_number)
+
+    if page_data is None:
         print("Table not found.")
         return False
-        
-    page_data = []
-    
-    # Get all rows
-    rows = table.find_all("tr")
-    
-    # Apply more comprehensive filtering for pagination rows
-    filtered_rows = []
-    for row in rows:
-        # Skip rows with class 'pgr'
-        if 'pgr' in row.get('class', []):
-            continue
-        # Skip rows containing pagination links
-        if row.find('a', href=lambda x: x and 'Page$' in x):
-            continue
-        # Skip rows containing page number spans
-        if row.find('span') and row.find('span').text.strip().isdigit():
-            continue
-        filtered_rows.append(row)
-    
-    # Skip header row if present
-    if len(filtered_rows) > 1:
-        filtered_rows = filtered_rows[1:]
-    
-    for idx, row in enumerate(filtered_rows, start=1):
-        cols = row.find_all("td")
-        if len(cols) >= 6:
-            download_link = None
-            if cols[5].find("a"):
-                download_link = "https://app.nwtgeoscience.ca " + cols[5].find("a")["href"]
-
-            page_data.append({
-                "S.No": idx-2,
-                "Reference": cols[0].text.strip(),
-                "Type": cols[1].text.strip(),
-                "Title": cols[2].text.strip(),
-                "Company": cols[3].text.strip(),
-                "Date": cols[4].text.strip(),
-                "Location": cols[5].text.strip(),
-                "Download Link": download_link
-            })
-
-    filename = f"PAGE_{page_number}.json"
-    filepath = os.path.join(folder, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(page_data, f, indent=2)
-    print(f"Saved {len(page_data)} records to {filepath}")
-    return True
-
-def navigate_to_page(driver, target_page):
-    """Navigate to a specific page number"""
-    current_page_element = driver.find_element(By.CSS_SELECTOR, "span.current")
-    current_page = int(current_page_element.text.strip())
-    
-    print(f"Currently on page {current_page}, navigating to page {target_page}")
-    
-    if current_page == target_page:
-        return True
-    
-    # Try direct navigation if possible
+
+    with trace.phase("serialize", page=page_number, records=len(page_data)):
+        if store is not None:
+            filepath, content_hash = store.save_page(page_data, page_number)
+        else:
+            filepath, content_hash = save_page_data(page_data, page_number, folder)
+    return filepath, content_hash, len(page_data)
+
+def scrape_pages_in_range(managed, first_page, last_page, folder="assessment_reports", progress=None, manifest=None,
+                          store=None):
+    """Scrape only the pages within the specified range
+
+    progress(page, error) is called once per page with error=None on success.
+    With a manifest, pages it already has are skipped. With a store, records
+    go to SQLite instead of PAGE_N.json files. managed is a ManagedDriver; it
+    may swap in a fresh browser between pages. last_page None scrapes to the
+    pager's last page.
+    """
+    def extract(page):
+        result = extract_page_data(managed.driver, page, folder, store)
+        if result and managed.page_done(page):
+            managed.recycle(page)
+        return result
+
+    scrape_range(first_page, last_page,
+                 extract=extract,
+                 next_page=lambda: browser.next_page(managed.driver),
+                 navigate=lambda page: navigate_to_page(managed.driver, page),
+                 folder=folder, progress=progress, manifest=manifest,
+                 on_last_page=lambda: browser.on_last_page(managed.driver),
+                 find_last_page=lambda: browser.find_last_page_number(managed.driver))
+
+def open_search(driver, base_url=BASE_URL, page=1, cache=None, reference_type=DEFAULT_REFERENCE_TYPE):
+    """Run the search in a (fresh) browser and go to `page`."""
+    setup_search(driver, base_url, reference_type, cache)
+    if page > 1 and not navigate_to_page(driver, page):
+        raise Exception(f"Could not get back to page {page}")
+
+def managed_driver(base_url=BASE_URL, resources="lean", recycle_after=None, label="chrome", cache=None,
+                   reference_type=DEFAULT_REFERENCE_TYPE):
+    return ManagedDriver(lambda: create_driver(resources),
+                         lambda driver, page: open_search(driver, base_url, page, cache, reference_type),
+                         recycle_after, label)
+
+def chrome_shard_worker(worker_id, first_page, last_page, base_url=BASE_URL, folder="assessment_reports",
+                        manifest_path=None, store_path=None, resources="lean", recycle_after=None,
+                        cache_path=None, trace_path=None, reference_type=DEFAULT_REFERENCE_TYPE):
+    """Scrape one shard in its own Chrome instance."""
+    if trace_path:
+        trace.enable(trace_path, append=True)
+    status = {}
+    progress = shard_progress(worker_id, first_page, last_page, status)
+    manifest = RunManifest(manifest_path) if manifest_path else None
+    store = MetadataStore(store_path) if store_path else None
+    cache = SessionCache(cache_path) if cache_path else None
+    managed = managed_driver(base_url, resources, recycle_after, label=f"worker {worker_id}", cache=cache,
+                             reference_type=reference_type)
     try:
-        page_link_xpath = f"//a[contains(@href, \"javascript:__doPostBack('ctl00$MainContent$gvReferences','Page${target_page}')\")]"
-        page_link = driver.find_element(By.XPATH, page_link_xpath)
-        driver.execute_script("arguments[0].scrollIntoView();", page_link)
-        time.sleep(1)
-        page_link.click()
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-        time.sleep(2)
-        return True
-    except:
-        # If direct navigation fails, try incremental navigation
-        while current_page < target_page:
-            try:
-                next_link = driver.find_element(By.XPATH, "//a[contains(@href, 'Page$Next')]")
-                driver.execute_script("arguments[0].scrollIntoView();", next_link)
-                time.sleep(1)
-                next_link.click()
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-                time.sleep(2)
-                current_page_element = driver.find_element(By.CSS_SELECTOR, "span.current")
-                current_page = int(current_page_element.text.strip())
-            except Exception as e:
-                print(f"Navigation error: {str(e)}")
-                return False
-        return current_page == target_page
-
-def scrape_pages_in_range(driver, first_page, last_page, folder="assessment_reports"):
-    """Scrape only the pages within the specified range"""
-    os.makedirs(folder, exist_ok=True)  # Create folder if it doesn't exist
-    
-    # Navigate to the first page if not already there
-    if first_page > 1:
-        if not navigate_to_page(driver, first_page):
-            print(f"Failed to navigate to page {first_page}")
+        open_search(managed.driver, base_url, cache=cache, reference_type=reference_type)
+        scrape_pages_in_range(managed, first_page, last_page, folder, progress, manifest, store)
+    except Exception as e:
+        progress(first_page if not status else max(status) + 1, str(e))
+        with open(f"error_page_worker{worker_id}.html", "w", encoding="utf-8") as f:
+            f.write(managed.driver.page_source)
+    finally:
+        managed.quit()
+    return status
+
+def chrome_type_worker(reference_type, base_url=BASE_URL, store_path=None, resources="lean", recycle_after=None,
+                       cache_path=None, trace_path=None):
+    """Scrape every page of one reference type into its partition folder, in its own Chrome instance."""
+    if trace_path:
+        trace.enable(trace_path, append=True)
+    status = {}
+    folder = reftypes.partition(reference_type)
+    manifest = open_manifest(folder)
+    store = MetadataStore(store_path) if store_path else None
+    cache = SessionCache(cache_path) if cache_path else None
+    managed = managed_driver(base_url, resources, recycle_after, label=reference_type, cache=cache,
+                             reference_type=reference_type)
+    try:
+        open_search(managed.driver, base_url, cache=cache, reference_type=reference_type)
+        progress = shard_progress(reference_type, 1, None, status)
+        scrape_pages_in_range(managed, 1, None, folder, progress, manifest, store)
+    except Exception as e:
+        status[max(status) + 1 if status else 1] = str(e)
+        print(f"[{reference_type}] stopped: {e}")
+        with open(f"error_page_{reftypes.slug(reference_type)}.html", "w", encoding="utf-8") as f:
+            f.write(managed.driver.page_source)
+    finally:
+        managed.quit()
+    return status
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape NWT Geoscience assessment report metadata.")
+    parser.add_argument("--engine", choices=("chrome", "http"), default="chrome",
+                        help="drive a headless Chrome (default) or replay the postbacks over plain HTTP")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="site root, e.g. a local stand-in server for testing")
+    parser.add_argument("--parser", choices=("lxml", "bs4"), default=None,
+                        help="HTML parser backend (default: lxml if installed, else BeautifulSoup)")
+    parser.add_argument("--report-type", default=DEFAULT_REFERENCE_TYPE,
+                        help=f"reference type to scrape (default {DEFAULT_REFERENCE_TYPE!r}), several separated "
+                             "by commas, or 'all'; several types are scraped in parallel, every page of each")
+    parser.add_argument("--list-types", action="store_true",
+                        help="print the reference types the site offers and exit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="split the page range into this many shards scraped in parallel")
+    parser.add_argument("--store", choices=("json", "sqlite"), default="json",
+                        help="write PAGE_N.json files (default) or upsert into an SQLite database")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"SQLite database for --store sqlite (default {DEFAULT_DB})")
+    parser.add_argument("--rate", type=float, default=4.0,
+                        help="requests per second each worker starts at (default 4). --workers N or N "
+                             "reference types start the shared limit at N times this, capped by --max-rate; "
+                             "it then adapts to the site's latency and errors")
+    parser.add_argument("--max-rate", type=float, default=16.0,
+                        help="ceiling for the adaptive request rate (default 16)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="read from the newest page until a page has no new or changed reports, "
+                             "and save only those (no page range needed)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignore the run manifest and scrape every page again")
+    parser.add_argument("--resources", choices=sorted(POLICIES), default="lean",
+                        help="what Chrome may fetch: full, lean (no images/fonts, default) or minimal (no CSS either)")
+    parser.add_argument("--recycle-after", type=int, default=200,
+                        help="restart each Chrome after this many pages to cap its memory (0 = never)")
+    parser.add_argument("--session-cache", default=DEFAULT_CACHE,
+                        help=f"where to keep the post-search session state for reuse (default {DEFAULT_CACHE})")
+    parser.add_argument("--no-session-cache", action="store_true",
+                        help="always run the full search setup")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write per-phase timings to FILE (JSONL) and print a p50/p95 summary at the end")
+    return parser.parse_args()
+
+def session_cache(args):
+    return None if args.no_session_cache else SessionCache(args.session_cache)
+
+def warm_session_cache(args, cache, reference_type=DEFAULT_REFERENCE_TYPE):
+    """Do the search setup once over HTTP so every shard starts from the cached session."""
+    try:
+        HttpGridSession(args.base_url).setup(reference_type, cache)
+    except Exception as e:
+        print(f"Could not warm the session cache ({e}); workers will run the full setup.")
+
+def run_sharded_scrape(args, manifest, reference_type=DEFAULT_REFERENCE_TYPE, folder="assessment_reports"):
+    """Scrape the requested range with one independent session per shard."""
+    first_page, last_page = get_page_range()
+    store_path = args.db if args.store == "sqlite" else None
+    cache = session_cache(args)
+    cache_path = cache.path if cache is not None else None
+    if cache is not None:
+        warm_session_cache(args, cache, reference_type)
+    if args.engine == "http":
+        worker = partial(http_shard_worker, base_url=args.base_url, folder=folder, manifest_path=manifest.path,
+                         store_path=store_path, cache_path=cache_path, trace_path=trace.trace_path(),
+                         reference_type=reference_type)
+    else:
+        worker = partial(chrome_shard_worker, base_url=args.base_url, folder=folder, manifest_path=manifest.path,
+                         store_path=store_path, resources=args.resources, recycle_after=args.recycle_after,
+                         cache_path=cache_path, trace_path=trace.trace_path(), reference_type=reference_type)
+    run_sharded(first_page, last_page, args.workers, worker)
+
+def available_types(args):
+    """The reference types in the site's picker: over HTTP, or in Chrome if that fails."""
+    try:
+        return HttpGridSession(args.base_url).reference_types()
+    except Exception as e:
+        if args.engine == "http":
+            raise
+        print(f"Could not list the reference types over HTTP ({e}); asking Chrome.")
+    driver = create_driver(args.resources)
+    try:
+        return browser.reference_types(driver, args.base_url)
+    finally:
+        driver.quit()
+
+def merge_partitions(args, reference_types):
+    """Upsert every type's PAGE_N.json files into the SQLite store, one row per Reference."""
+    store = MetadataStore(args.db)
+    try:
+        for reference_type in reference_types:
+            pages = page_files(reftypes.partition(reference_type))
+            for page, path in pages:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        store.upsert(json.load(f), page)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping {path}: {e}")
+            print(f"Merged {len(pages)} pages of {reference_type} into {args.db}")
+        total = store.db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        print(f"{args.db} now holds {total} reports")
+    finally:
+        store.close()
+
+def run_types(args, reference_types):
+    """Scrape every page of several reference types at once, one session per type.
+
+    Each type resumes from its own partition's manifest; with --store json the
+    partitions are merged into the SQLite store at the end.
+    """
+    store_path = args.db if args.store == "sqlite" else None
+    cache = session_cache(args)
+    cache_path = cache.path if cache is not None else None
+    if args.fresh:
+        for reference_type in reference_types:
+            open_manifest(reftypes.partition(reference_type), fresh=True)
+    if args.engine == "http":
+        worker = partial(http_type_worker, base_url=args.base_url, store_path=store_path,
+                         cache_path=cache_path, trace_path=trace.trace_path())
+    else:
+        worker = partial(chrome_type_worker, base_url=args.base_url, store_path=store_path,
+                         resources=args.resources, recycle_after=args.recycle_after,
+                         cache_path=cache_path, trace_path=trace.trace_path())
+    run_per_type(reference_types, worker)
+    if store_path is None:
+        merge_partitions(args, reference_types)
+
+def run_http(base_url, manifest, store, cache=None, reference_type=DEFAULT_REFERENCE_TYPE,
+             folder="assessment_reports"):
+    """Same flow as main() but without a browser."""
+    session = HttpGridSession(base_url)
+    try:
+        session.setup(reference_type, cache)
+        print("Starting scraping...")
+        first_page, last_page = get_page_range()
+        http_engine.scrape_pages_in_range(session, first_page, last_page, folder, manifest=manifest, store=store)
+        print(f"Pages {first_page} to {last_page} scraped.")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        with open("error_page.html", "w", encoding="utf-8") as f:
+            f.write(session.html)
+        print("Page source saved as error_page.html for debugging.")
+
+def seed_known(known, folder, store):
+    """Fill an empty known-references list from an earlier full crawl (SQLite store or PAGE_N.json files)."""
+    if store is not None:
+        known.add([to_record(row) for row in store.query()])
+    for path in glob.glob(os.path.join(folder, "PAGE_*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                known.add(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+def new_records_writer(folder, store):
+    """emit(page, records) for an incremental run: upsert into SQLite, or collect into NEW_<time>.json."""
+    if store is not None:
+        return lambda page, records: store.upsert(records, page)
+    path = os.path.join(folder, f"NEW_{datetime.now():%Y%m%dT%H%M%S}.json")
+    collected = []
+
+    def emit(page, records):
+        collected.extend(records)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(collected, f, indent=2)
+        os.replace(tmp_path, path)
+        print(f"Saved {len(collected)} new or changed records to {path}")
+    return emit
+
+def run_incremental(args, store, cache, folder="assessment_reports", reference_type=DEFAULT_REFERENCE_TYPE):
+    """--incremental: read from the newest page until a page has nothing new, saving only what's new."""
+    os.makedirs(folder, exist_ok=True)
+    known = known_references(folder)
+    if not len(known):
+        seed_known(known, folder, store)
+    print(f"{len(known)} references known from earlier runs.")
+    emit = new_records_writer(folder, store)
+    if args.engine == "http":
+        session = HttpGridSession(args.base_url)
+        try:
+            session.setup(reference_type, cache)
+            pages, emitted = crawl_new(lambda page: parse_records(session.html), session.next_page,
+                                       session.on_last_page, known, emit)
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            with open("error_page.html", "w", encoding="utf-8") as f:
+                f.write(session.html)
             return
-    
-    current_page = first_page
-    
-    while current_page <= last_page:
-        if not extract_page_data(driver, current_page, folder):
-            print("No data extracted. Stopping.")
-            break
-            
-        if current_page == last_page:
-            print(f"Reached specified last page ({last_page}).")
-            break
+    else:
+        managed = managed_driver(args.base_url, args.resources, args.recycle_after, cache=cache,
+                                 reference_type=reference_type)
+
+        def read_page(page):
+            records = read_grid(managed.driver, page)
+            if records is not None and managed.page_done(page):
+                managed.recycle(page)
+            return records
 
         try:
-            # Try to find next page link
-            next_page_number = current_page + 1
-            next_page_xpath = f"//a[contains(@href, \"javascript:__doPostBack('ctl00$MainContent$gvReferences','Page${next_page_number}')\")]"
-            
-            try:
-                next_link = driver.find_element(By.XPATH, next_page_xpath)
-            except:
-                next_link = driver.find_element(By.XPATH, "//a[contains(@href, 'Page$Next') or contains(text(), '...')]")
-
-            driver.execute_script("arguments[0].scrollIntoView();", next_link)
-            time.sleep(1)
-            next_link.click()
-            
-            # Wait for table to reload
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
-            time.sleep(2)
-            current_page += 1
+            open_search(managed.driver, args.base_url, cache=cache, reference_type=reference_type)
+            pages, emitted = crawl_new(read_page, lambda: browser.next_page(managed.driver),
+                                       lambda: browser.on_last_page(managed.driver), known, emit)
         except Exception as e:
-            print("No more pages or encountered an error:", str(e))
-            break
+            print(f"Error: {str(e)}")
+            with open("error_page.html", "w", encoding="utf-8") as f:
+                f.write(managed.driver.page_source)
+            return
+        finally:
+            managed.quit()
+    print(f"Read {pages} pages; {emitted} new or changed reports.")
 
 def main():
-    # Setup Chrome options
-    options = Options()
-    options.add_argument("--headless")  # Remove this line if you want to see browser UI
-    options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=options)
-
+    args = parse_args()
+    if args.trace:
+        trace.enable(args.trace)
+    policy.configure(args.rate, args.max_rate)
     try:
-        # Open website
-        print("Opening website...")
-        driver.get("https://app.nwtgeoscience.ca/Searching/ReferenceSearch.aspx ")
-        time.sleep(3)
-
-        # Select Assessment Report type
-        print("Selecting Assessment Report type...")
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "MainContent_butReferenceType"))).click()
-        
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "MainContent_gvRefTypeSel")))
-        time.sleep(2)
-
-        # Find and select Assessment Report option
-        rows = driver.find_element(By.ID, "MainContent_gvRefTypeSel").find_elements(By.TAG_NAME, "tr")
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            if len(cells) >= 2 and "Assessment Report" in cells[1].text:
-                checkbox = cells[0].find_element(By.TAG_NAME, "input")
-                driver.execute_script("arguments[0].click();", checkbox)
-                print("'Assessment Report' selected")
-                break
-        else:
-            raise Exception("Assessment Report option not found")
+        scrape(args)
+    finally:
+        policy.shared().report()
+        trace.summary()
+
+def scrape(args):
+    if args.parser:
+        set_default_backend(args.parser)
+    reference_types = reftypes.requested(args.report_type)
+    if args.list_types or reftypes.needs_picker(args.report_type):
+        try:
+            available = available_types(args)
+            reference_types = reftypes.resolve(args.report_type, available)
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            return
+        if args.list_types:
+            for name in available:
+                print(f"{name}\t{reftypes.partition(name)}")
+            return
+    if args.incremental:
+        store = MetadataStore(args.db) if args.store == "sqlite" else None
+        # Only the newest pages of each type are read, so the types simply take turns
+        for reference_type in reference_types:
+            run_incremental(args, store, session_cache(args), reftypes.partition(reference_type), reference_type)
+        return
+    if len(reference_types) > 1:
+        run_types(args, reference_types)
+        return
+    reference_type = reference_types[0]
+    folder = reftypes.partition(reference_type)
+    # Progress is recorded per page so a re-run resumes at the first incomplete page
+    manifest = open_manifest(folder, fresh=args.fresh)
+    if args.workers > 1:
+        run_sharded_scrape(args, manifest, reference_type, folder)
+        return
+    store = MetadataStore(args.db) if args.store == "sqlite" else None
+    cache = session_cache(args)
+    if args.engine == "http":
+        run_http(args.base_url, manifest, store, cache, reference_type, folder)
+        return
 
-        # Apply selection and search
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "MainContent_btnApplyRefType"))).click()
-        time.sleep(2)
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "MainContent_btnSearch"))).click()
+    managed = managed_driver(args.base_url, args.resources, args.recycle_after, cache=cache,
+                             reference_type=reference_type)
 
-        # Wait for results and start scraping
-        print("Waiting for results...")
-        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.ID, "MainContent_gvReferences")))
+    try:
+        open_search(managed.driver, args.base_url, cache=cache, reference_type=reference_type)
         print("Table loaded. Starting scraping...")
         
         # Get page range from user
         first_page, last_page = get_page_range()
         
         # Use the new function to scrape pages in the specified range
-        scrape_pages_in_range(driver, first_page, last_page)
+        scrape_pages_in_range(managed, first_page, last_page, folder, manifest=manifest, store=store)
         print(f"Pages {first_page} to {last_page} scraped.")
 
     except Exception as e:
         print(f"Error: {str(e)}")
         with open("error_page.html", "w", encoding="utf-8") as f:
-            f.write(driver.page_source)
+            f.write(managed.driver.page_source)
         print("Page source saved as error_page.html for debugging.")
     finally:
-        driver.quit()
+        managed.quit()
         print("Driver closed.")
 
 if __name__ == "__main__":
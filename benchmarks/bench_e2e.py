@@ -0,0 +1,224 @@
+"""End-to-end throughput of the scraper and downloader against the local mock server.
+
+Usage: python benchmarks/bench_e2e.py [--pages 20] [--engines http] [--latency 0.02] ...
+
+Each scenario starts a fresh benchmarks/mock_server.py, runs one of the two
+scripts against it in a scratch directory with --trace, and samples the RSS of
+the script's process tree (Chrome included) while it runs. The trace gives:
+
+- pages/s: pages finished;
+- rows/s: grid rows saved (scraper) or reports resolved/clicked (downloader);
+- downloads/s and MB/s: completed file transfers and their bytes.
+
+Wall time covers the whole run, start-up and search setup included. Every
+result is appended to benchmarks/results/e2e.jsonl (ignored by git; --results
+picks another file) with the commit and the settings, and is printed next to
+the last earlier run with the same settings.
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nwt.procstats import process_tree_rss
+from nwt.trace import load
+
+SERVER = os.path.join(ROOT, "benchmarks", "mock_server.py")
+SCRAPER = os.path.join(ROOT, "NWT Geoscience Scraper.py")
+DOWNLOADER = os.path.join(ROOT, "NWT Geoscience Download.py")
+RESULTS = os.path.join(ROOT, "benchmarks", "results", "e2e.jsonl")
+
+
+def start_server(args):
+    command = [sys.executable, SERVER, "--port", "0", "--pages", str(args.site_pages),
+               "--file-size", args.file_size, "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--drop-rate", str(args.drop_rate),
+               "--bandwidth", str(args.bandwidth)]
+    if args.direct_links:
+        command.append("--direct-links")
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if "http://" not in line:
+        server.kill()
+        raise Exception(f"mock server did not start: {line!r}")
+    return server, line.strip().rsplit(" ", 1)[1]
+
+
+def server_stats(url):
+    try:
+        with urllib.request.urlopen(url + "/__stats", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+
+def scenario_command(name, url, args):
+    """(argv, stdin text) for one scenario."""
+    script, engine = name.split("-")
+    if script == "scrape":
+        command = [sys.executable, SCRAPER, "--engine", engine, "--base-url", url, "--trace", "trace.jsonl",
+                   "--no-session-cache"]
+        if args.workers > 1:
+            command += ["--workers", str(args.workers)]
+        # The scraper asks for the page range on stdin
+        return command, f"1\n{args.pages}\n"
+    command = [sys.executable, DOWNLOADER, "--batch", "--engine", engine, "--base-url", url,
+               "--pages", f"1-{args.pages}", "--output-dir", "downloads", "--concurrency", str(args.concurrency),
+               "--trace", "trace.jsonl", "--no-session-cache"]
+    if engine == "chrome":
+        command.append("--headless")
+    return command, ""
+
+
+def run_scenario(name, args):
+    workdir = tempfile.mkdtemp(prefix=f"nwt-bench-{name}-")
+    server, url = start_server(args)
+    try:
+        command, stdin = scenario_command(name, url, args)
+        with open(os.path.join(workdir, "output.log"), "w") as log:
+            start = time.time()
+            process = subprocess.Popen(command, cwd=workdir, stdin=subprocess.PIPE, stdout=log,
+                                       stderr=subprocess.STDOUT, text=True)
+            process.stdin.write(stdin)
+            process.stdin.close()
+            peak = 0
+            while process.poll() is None:
+                peak = max(peak, process_tree_rss(process.pid) or 0)
+                time.sleep(0.05)
+            wall = time.time() - start
+        stats = server_stats(url)
+    finally:
+        server.terminate()
+        server.wait()
+    result = summarize(name, wall, peak, trace_events(workdir), stats, process.returncode)
+    if process.returncode == 0 and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        result["workdir"] = workdir
+    return result
+
+
+def trace_events(workdir):
+    path = os.path.join(workdir, "trace.jsonl")
+    return load(path) if os.path.exists(path) else []
+
+
+def summarize(name, wall, peak, events, stats, returncode):
+    pages = [e for e in events if e.get("event") == "page"]
+    if name.startswith("scrape"):
+        rows = sum(e.get("records", 0) for e in pages)
+    else:
+        rows = sum(1 for e in events if e.get("phase") in ("resolve", "download_start"))
+    transfers = [e for e in events if e.get("phase") == "transfer" and not e.get("error")]
+    transferred = sum(e.get("bytes", 0) for e in transfers)
+    return {
+        "scenario": name,
+        "exit": returncode,
+        "wall_s": round(wall, 3),
+        "pages": len(pages),
+        "rows": rows,
+        "downloads": len(transfers),
+        "mb": round(transferred / 1e6, 3),
+        "pages_per_s": round(len(pages) / wall, 3),
+        "rows_per_s": round(rows / wall, 3),
+        "downloads_per_s": round(len(transfers) / wall, 3),
+        "mb_per_s": round(transferred / 1e6 / wall, 3),
+        "peak_rss_mb": round(peak / 1e6, 1),
+        "postbacks": stats.get("postbacks"),
+        "server_errors_injected": stats.get("errors_injected"),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def settings(args):
+    """The options that make two runs comparable."""
+    return {key: getattr(args, key) for key in ("pages", "site_pages", "file_size", "latency", "jitter",
+                                                "error_rate", "drop_rate", "bandwidth", "direct_links",
+                                                "concurrency", "workers")}
+
+
+def previous_result(path, scenario, config):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    for event in load(path):
+        if event.get("scenario") == scenario and event.get("settings") == config:
+            previous = event
+    return previous
+
+
+def change(new, old):
+    if not old:
+        return ""
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def report(result, previous):
+    print(f"\n{result['scenario']}: {result['wall_s']:.1f}s wall, exit {result['exit']}")
+    for key, label in (("pages_per_s", "pages/s"), ("rows_per_s", "rows/s"),
+                       ("downloads_per_s", "downloads/s"), ("mb_per_s", "MB/s"), ("peak_rss_mb", "peak RSS MB")):
+        old = previous.get(key) if previous else None
+        print(f"  {label:<13}{result[key]:>10.2f}{change(result[key], old)}")
+    print(f"  {result['pages']} pages, {result['rows']} rows, {result['downloads']} downloads, "
+          f"{result['postbacks']} postbacks")
+    if "workdir" in result:
+        print(f"  output kept in {result['workdir']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark both scripts end to end against the mock server.")
+    parser.add_argument("--scenarios", default="scrape-http,download-http",
+                        help="comma-separated from scrape-http, download-http, scrape-chrome, download-chrome")
+    parser.add_argument("--pages", type=int, default=20, help="pages each script works through")
+    parser.add_argument("--site-pages", type=int, default=250, help="result pages the mock site has")
+    parser.add_argument("--file-size", default="256K")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=0.0)
+    parser.add_argument("--direct-links", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="scraper worker processes")
+    parser.add_argument("--results", default=RESULTS, help="JSONL file the results are appended to")
+    parser.add_argument("--keep", action="store_true", help="keep each run's scratch directory")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = settings(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    failed = False
+    for name in args.scenarios.split(","):
+        result = run_scenario(name.strip(), args)
+        previous = previous_result(args.results, result["scenario"], config)
+        report(result, previous)
+        failed = failed or result["exit"] != 0
+        result.update(time=datetime.datetime.now().isoformat(timespec="seconds"), commit=git_commit(),
+                      settings=config)
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    print(f"\nResults appended to {args.results}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Count the postbacks needed to reach page N, old navigate_to_page vs pager-aware jumps.
+
+Usage: python benchmarks/bench_pager.py [total_pages]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_gridview import MockGridView
+from nwt.pager import jump_to_page
+
+
+def old_navigate(grid, target_page):
+    """The original strategy: a direct Page$N link, otherwise Page$Next until there."""
+    if f"Page${target_page}" in grid.links():
+        grid.post(f"Page${target_page}")
+        return
+    while grid.current < target_page:
+        grid.post("Page$Next")
+
+
+def new_navigate(grid, target_page):
+    jump_to_page(target_page, lambda: grid.current, grid.links, grid.post)
+
+
+def new_navigate_last_known(grid, target_page):
+    jump_to_page(target_page, lambda: grid.current, grid.links, grid.post, last_page=grid.total_pages)
+
+
+def count_postbacks(navigate, total_pages, target_page):
+    grid = MockGridView(total_pages)
+    navigate(grid, target_page)
+    assert grid.current == target_page
+    return grid.postbacks
+
+
+def main():
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+    targets = [5, 11, 50, 200, 800, total_pages // 2, total_pages - 5, total_pages]
+    print(f"Postbacks to reach page N from page 1 ({total_pages} pages, 10-link pager window)")
+    print(f"{'page':>8} {'before':>8} {'after':>8} {'after, last page known':>24}")
+    for target in targets:
+        before = count_postbacks(old_navigate, total_pages, target)
+        after = count_postbacks(new_navigate, total_pages, target)
+        after_last = count_postbacks(new_navigate_last_known, total_pages, target)
+        print(f"{target:>8} {before:>8} {after:>8} {after_last:>24}")
+
+
+if __name__ == "__main__":
+    main()
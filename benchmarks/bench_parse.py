@@ -0,0 +1,72 @@
+"""Parse the saved GridView fixtures with every backend and compare them.
+
+Reports rows/sec and peak memory per backend, fails if any backend disagrees
+with the BeautifulSoup reference, and pins the current S.No numbering.
+
+Usage: python benchmarks/bench_parse.py [iterations]
+"""
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nwt.parse import BACKENDS, parse_records
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REFERENCE_BACKEND = "bs4"
+
+
+def check_numbering(name, records):
+    """S.No currently starts at -1 (off by two); pin it until it is changed on purpose."""
+    expected = list(range(-1, len(records) - 1))
+    actual = [r["S.No"] for r in records]
+    if actual != expected:
+        raise SystemExit(f"{name}: S.No numbering changed: {actual[:5]}... expected {expected[:5]}...")
+
+
+def measure(backend, html, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        records = parse_records(html, backend)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse_records(html, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, len(records) * iterations / elapsed, peak
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    fixtures = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not fixtures:
+        raise SystemExit("No fixtures found; run benchmarks/make_fixtures.py first.")
+
+    print(f"{'fixture':<26} {'backend':<8} {'rows':>5} {'rows/sec':>12} {'peak KB':>10}")
+    failures = 0
+    for path in fixtures:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        results = {}
+        for backend in BACKENDS:
+            records, rate, peak = measure(backend, html, iterations)
+            results[backend] = records
+            print(f"{name:<26} {backend:<8} {len(records):>5} {rate:>12,.0f} {peak // 1024:>10,}")
+        reference = results[REFERENCE_BACKEND]
+        check_numbering(name, reference)
+        for backend, records in results.items():
+            if records != reference:
+                failures += 1
+                print(f"  MISMATCH: {backend} differs from {REFERENCE_BACKEND} on {name}")
+    if failures:
+        raise SystemExit(f"{failures} backend mismatches")
+    print("All backends produce identical records.")
+
+
+if __name__ == "__main__":
+    main()
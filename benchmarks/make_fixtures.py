@@ -0,0 +1,45 @@
+"""Regenerate the saved GridView HTML fixtures used by bench_parse.py.
+
+Usage: python benchmarks/make_fixtures.py
+"""
+import base64
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_gridview import MockGridView, render_grid, render_page, synthetic_rows
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# name: (total pages, current page, rows on the page, viewstate bytes)
+FIXTURES = {
+    "gridview_first_page": (2500, 1, 10, 20_000),
+    "gridview_middle_page": (2500, 412, 10, 250_000),
+    "gridview_last_page": (2500, 2500, 4, 20_000),
+    "gridview_single_page": (1, 1, 7, 5_000),
+    "gridview_100_rows": (250, 37, 100, 120_000),
+}
+
+
+def viewstate(size, seed):
+    return base64.b64encode(random.Random(seed).randbytes(size * 3 // 4)).decode("ascii")
+
+
+def main():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for seed, (name, (total, page, rows, vs_size)) in enumerate(FIXTURES.items()):
+        grid = MockGridView(total)
+        grid.current = page
+        links = grid.links() if total > 1 else None
+        html = render_page(render_grid(synthetic_rows(page, rows), page, links),
+                           viewstate(vs_size, seed), viewstate(600, seed + 100))
+        path = os.path.join(FIXTURE_DIR, name + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"Wrote {path} ({len(html) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
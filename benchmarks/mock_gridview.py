@@ -0,0 +1,172 @@
+"""In-process stand-in for the gvReferences GridView: pager state and HTML rendering."""
+from datetime import date, timedelta
+
+
+class MockGridView:
+    """Renders pager links the way an ASP.NET GridView numeric pager does.
+
+    Pages are shown in windows of `window` numbered links; a '...' link points
+    to the page just before/after the window. First/Last and Next/Prev links
+    are added when enabled. Every post() is one postback.
+    """
+
+    def __init__(self, total_pages, window=10, first_last=True, next_prev=True):
+        self.total_pages = total_pages
+        self.window = window
+        self.first_last = first_last
+        self.next_prev = next_prev
+        self.current = 1
+        self.postbacks = 0
+
+    def links(self):
+        """Return {argument: link text} for the pager of the current page."""
+        links = {}
+        start = (self.current - 1) // self.window * self.window + 1
+        end = min(start + self.window - 1, self.total_pages)
+        if self.first_last and self.current > 1:
+            links["Page$First"] = "First"
+        if self.next_prev and self.current > 1:
+            links["Page$Prev"] = "&lt;"
+        if start > 1:
+            links[f"Page${start - 1}"] = "..."
+        for page in range(start, end + 1):
+            if page != self.current:
+                links[f"Page${page}"] = str(page)
+        if end < self.total_pages:
+            links[f"Page${end + 1}"] = "..."
+        if self.next_prev and self.current < self.total_pages:
+            links["Page$Next"] = "&gt;"
+        if self.first_last and self.current < self.total_pages:
+            links["Page$Last"] = "Last"
+        return links
+
+    def post(self, argument):
+        """Apply a pager postback."""
+        if argument not in self.links():
+            raise Exception(f"Invalid postback argument {argument} on page {self.current}")
+        self.postbacks += 1
+        value = argument.split("$", 1)[1]
+        if value == "First":
+            self.current = 1
+        elif value == "Last":
+            self.current = self.total_pages
+        elif value == "Next":
+            self.current += 1
+        elif value == "Prev":
+            self.current -= 1
+        else:
+            self.current = int(value)
+
+
+COMPANIES = ["Diavik Diamond Mines Inc.", "Fortune Minerals Ltd.", "Cominco Ltd.",
+             "Tyhee Development Corp.", "De Beers Canada Inc.", "Kennecott Canada Exploration Inc.",
+             "Aurora Geosciences Ltd.", "Mountain Province Diamonds Inc."]
+COMMODITIES = ["Gold", "Diamond", "Uranium", "Lead-Zinc", "Copper-Cobalt", "Tungsten",
+               "Rare Earth Elements", "Nickel-Copper-PGE"]
+WORK = ["Geological Mapping", "Till Sampling", "Airborne Magnetic Survey", "Diamond Drilling",
+        "Prospecting and Geochemistry", "Ground Geophysics", "Kimberlite Indicator Mineral Sampling"]
+LATEST_DATE = date(2024, 12, 31)
+NTS_SHEETS = ["85H/12", "85I/1", "76D/9", "75M/3", "86B/7", "95E/16", "106F/1", "85J/8"]
+
+
+def synthetic_row(n, seed=0, reference_type="Assessment Report", type_index=0):
+    """The n-th (0-based) result of a reference type, deterministic and plausible-looking."""
+    key = n * 7919 + seed
+    return {
+        # Each type gets its own block of reference numbers
+        "Reference": f"{90000 - n + type_index * 100000:06d}",
+        "Type": reference_type,
+        "Title": (f"{WORK[key % len(WORK)]} Report on the {COMMODITIES[key % len(COMMODITIES)]} "
+                  f"Claims {key % 9000 + 1000}-{key % 9000 + 1012}"),
+        "Company": COMPANIES[key % len(COMPANIES)],
+        # Newest first, as the site lists them
+        "Date": (LATEST_DATE - timedelta(days=n // 3)).isoformat(),
+        "Location": NTS_SHEETS[key % len(NTS_SHEETS)],
+    }
+
+
+def synthetic_rows(page, page_size=10, seed=0):
+    """Deterministic, plausible-looking gvReferences rows for a results page."""
+    return [synthetic_row((page - 1) * page_size + i, seed) for i in range(page_size)]
+
+
+def render_pager(links, current):
+    """Render the pager row the way GridView does, with a nested table."""
+    cells = []
+    placed = False
+    for argument, text in links.items():
+        if not placed and _link_page(argument) > current:
+            cells.append(f"<td><span class=\"current\">{current}</span></td>")
+            placed = True
+        cells.append(
+            f"<td><a href=\"javascript:__doPostBack(&#39;ctl00$MainContent$gvReferences&#39;,"
+            f"&#39;{argument}&#39;)\">{text}</a></td>")
+    if not placed:
+        cells.append(f"<td><span class=\"current\">{current}</span></td>")
+    return (f"<tr class=\"pgr\">\n\t\t<td colspan=\"6\"><table>\n\t\t\t<tr>\n\t\t\t\t{''.join(cells)}\n"
+            f"\t\t\t</tr>\n\t\t</table></td>\n\t</tr>")
+
+
+def _link_page(argument):
+    """Sort key placing First/Prev before the numbered links and Next/Last after."""
+    value = argument.split("$", 1)[1]
+    if value.isdigit():
+        return int(value)
+    return 0 if value in ("First", "Prev") else 10 ** 9
+
+
+def render_grid(rows, current=1, links=None):
+    """Render the gvReferences table for the given rows and pager links."""
+    head = "".join(f"<th scope=\"col\">{name}</th>"
+                   for name in ("Reference", "Type", "Title", "Company", "Date", "Location"))
+    body = []
+    for i, row in enumerate(rows):
+        body.append(
+            "<tr>\n"
+            f"\t\t<td>{row['Reference']}</td><td>{row['Type']}</td><td>{row['Title']}</td>"
+            f"<td>{row['Company']}</td><td>{row['Date']}</td>"
+            f"<td>{row['Location']} <a href=\"javascript:__doPostBack(&#39;ctl00$MainContent$gvReferences&#39;,"
+            f"&#39;DownloadRec${i}&#39;)\"><i class=\"fa fa-download\"></i></a></td>\n"
+            "\t</tr>")
+    pager = render_pager(links, current) if links else ""
+    return ("<table class=\"table table-striped\" cellspacing=\"0\" rules=\"all\" border=\"1\" "
+            "id=\"MainContent_gvReferences\" style=\"border-collapse:collapse;\">\n"
+            f"\t<tr>\n\t\t{head}\n\t</tr>" + "".join(body) + pager + "\n</table>")
+
+
+def render_page(body_html, viewstate="", event_validation=""):
+    """Wrap content in the ReferenceSearch.aspx form with its hidden fields."""
+    return f"""<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title>Reference Search</title>
+<link href="/Content/bootstrap.css" rel="stylesheet" />
+<link href="/Content/font-awesome.css" rel="stylesheet" />
+</head>
+<body>
+<form method="post" action="./ReferenceSearch.aspx" id="ctl01">
+<div class="aspNetHidden">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+</div>
+<script type="text/javascript">
+function __doPostBack(eventTarget, eventArgument) {{
+    var theForm = document.forms['ctl01'];
+    if (!theForm.onsubmit || (theForm.onsubmit() != false)) {{
+        theForm.__EVENTTARGET.value = eventTarget;
+        theForm.__EVENTARGUMENT.value = eventArgument;
+        theForm.submit();
+    }}
+}}
+</script>
+<div class="aspNetHidden">
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="7A2A3C7F" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{event_validation}" />
+</div>
+<div class="container body-content">
+{body_html}
+</div>
+</form>
+</body>
+</html>
+"""
@@ -0,0 +1,464 @@
+"""Offline stand-in for ReferenceSearch.aspx, for benchmarks and repeatable runs.
+
+Usage: python benchmarks/mock_server.py [--port 8000] [--pages 250] [--latency 0.02] ...
+then point either script at it with --base-url http://127.0.0.1:8000
+
+It imitates the parts of the site the scripts touch:
+
+- the reference type picker (butReferenceType, gvRefTypeSel checkboxes, btnApplyRefType)
+  and btnSearch;
+- the gvReferences grid with the GridView numeric pager (Page$N, '...', Next/Prev,
+  First/Last) from mock_gridview. Like ASP.NET event validation, only
+  arguments the current pager renders (or the current page) are accepted;
+- __VIEWSTATE/__EVENTVALIDATION: the page state travels in the viewstate
+  (padded to --viewstate-kb) and is signed, so a tampered or mismatched
+  state gets a 500 like the real server;
+- the download dialog: DownloadRec$i opens it, ASPxButton1 ("Download All")
+  answers with the report's file (a PDF, or a ZIP when it has several) and
+  ASPxButton3 ("Remove All") closes it. --direct-links also lists each file
+  as a plain link, served from /Files/ with Range support.
+
+Synthetic PDFs are valid, carry the report's reference and title as text and
+are padded to --file-size. --hide-newest N leaves out each type's N newest
+reports, i.e. serves the index as it was before they were added, for trying
+incremental runs. --latency/--jitter delay every request,
+--error-rate answers that fraction of requests with a 503, --drop-rate cuts
+that fraction of file transfers off halfway, --bad-range-rate answers that
+fraction of resumed transfers from the wrong offset and --bandwidth caps each
+transfer. GET /__stats returns request, postback and byte counters as JSON.
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zipfile
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_gridview import MockGridView, render_grid, render_page, synthetic_row
+from nwt.common import GRID_TARGET, SEARCH_PATH
+
+REFERENCE_TYPES = ["Assessment Report", "Government Publication", "Thesis", "Open File",
+                   "Company Report", "Map"]
+
+SECRET = b"mock-nwt"
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_size(text):
+    """'256K', '2M', '1G' or plain bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", text.upper())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"not a size: {text!r}")
+    return int(float(match.group(1)) * {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[match.group(2)])
+
+
+def build_pdf(text, size):
+    """A small valid PDF showing `text`, padded to about `size` bytes with an unused stream."""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    content = f"BT /F1 12 Tf 72 720 Td ({escaped}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    padding = max(0, size - out.tell() - 200 - 20 * (len(objects) + 2))
+    if padding:
+        # Incompressible-looking filler standing in for scanned pages
+        block = hashlib.sha256(text.encode()).digest() * 2048
+        filler = (block * (padding // len(block) + 1))[:padding]
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n<< /Length %d >>\nstream\n" % (len(objects) + 1, padding))
+        out.write(filler)
+        out.write(b"\nendstream\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+    return out.getvalue()
+
+
+class MockSite:
+    """Everything that doesn't depend on one request: the data set, its files and the counters."""
+
+    def __init__(self, pages=250, page_size=10, types=None, file_size=256 * 1024, max_files=2,
+                 direct_links=False, viewstate_kb=20, latency=0.0, jitter=0.0, error_rate=0.0,
+                 drop_rate=0.0, bandwidth=0.0, seed=0, hide_newest=0, bad_range_rate=0.0):
+        self.pages = pages
+        self.page_size = page_size
+        self.types = types or REFERENCE_TYPES
+        self.file_size = file_size
+        self.max_files = max_files
+        self.direct_links = direct_links
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.bad_range_rate = bad_range_rate
+        self.bandwidth = bandwidth
+        self.hide_newest = hide_newest
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.padding = base64.b64encode(random.Random(seed).randbytes(viewstate_kb * 768)).decode("ascii")
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "postbacks": 0, "grid_pages": 0, "files": 0, "bytes": 0,
+                      "errors_injected": 0, "drops_injected": 0, "bad_ranges_injected": 0,
+                      "rejected": 0}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def chance(self, rate):
+        with self.random_lock:
+            return rate > 0 and self.random.random() < rate
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self.random_lock:
+                extra = self.random.uniform(0, self.jitter)
+            time.sleep(self.latency + extra)
+
+    # Results: rows of the selected types interleaved, newest first
+    def total_rows(self, types):
+        # The last page of each type is short, as on the real site
+        return len(types) * (self.pages * self.page_size - self.page_size // 2 - self.hide_newest)
+
+    def total_pages(self, types):
+        return max(1, -(-self.total_rows(types) // self.page_size))
+
+    def row(self, types, n):
+        reference_type = types[n % len(types)]
+        type_index = self.types.index(reference_type)
+        return synthetic_row(n // len(types) + self.hide_newest, seed=type_index, reference_type=reference_type,
+                             type_index=type_index)
+
+    def page_rows(self, types, page):
+        first = (page - 1) * self.page_size
+        last = min(first + self.page_size, self.total_rows(types))
+        return [self.row(types, n) for n in range(first, last)]
+
+    # Files: 1..max_files PDFs per report, fixed by the reference
+    def files(self, row):
+        count = 1 + int(row["Reference"]) % max(1, self.max_files)
+        return [f"{row['Reference']}_{i + 1}.pdf" if count > 1 else f"{row['Reference']}.pdf"
+                for i in range(count)]
+
+    def file_bytes(self, row, name):
+        return _pdf(f"{row['Reference']} {row['Type']}: {row['Title']} ({row['Company']}, {row['Location']})",
+                    self.file_size, name)
+
+    def download_all(self, row):
+        """(filename, bytes) that 'Download All' returns for a report."""
+        names = self.files(row)
+        if len(names) == 1:
+            return names[0], self.file_bytes(row, names[0])
+        return f"{row['Reference']}.zip", _zip(tuple((name, self.file_bytes(row, name)) for name in names))
+
+    def find_reference(self, reference):
+        for reference_type in self.types:
+            type_index = self.types.index(reference_type)
+            n = 90000 + type_index * 100000 - int(reference)
+            if 0 <= n < self.pages * self.page_size:
+                row = synthetic_row(n, seed=type_index, reference_type=reference_type, type_index=type_index)
+                if row["Reference"] == reference:
+                    return row
+        return None
+
+    # Viewstate: padding, then the signed page state at the end where a fingerprint of the tail sees it
+    def encode_state(self, state):
+        packed = base64.b64encode(json.dumps(state, separators=(",", ":")).encode()).decode("ascii")
+        return f"{self.padding}.{packed}", self.sign(packed)
+
+    def decode_state(self, viewstate, validation):
+        packed = viewstate.rsplit(".", 1)[-1]
+        if not hmac.compare_digest(self.sign(packed), validation or ""):
+            raise ValueError("Validation of viewstate MAC failed")
+        return json.loads(base64.b64decode(packed))
+
+    @staticmethod
+    def sign(packed):
+        return base64.b64encode(hmac.new(SECRET, packed.encode(), hashlib.sha256).digest()[:24]).decode("ascii")
+
+
+@lru_cache(maxsize=64)
+def _pdf(text, size, name):
+    return build_pdf(f"{name}: {text}", size)
+
+
+@lru_cache(maxsize=16)
+def _zip(members):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return out.getvalue()
+
+
+def render_picker(site, state):
+    rows = []
+    for i, reference_type in enumerate(site.types):
+        checked = ' checked="checked"' if reference_type in state["types"] else ""
+        rows.append(f"<tr><td><input id=\"MainContent_gvRefTypeSel_chkSelect_{i}\" type=\"checkbox\" "
+                    f"name=\"ctl00$MainContent$gvRefTypeSel$ctl{i + 2:02d}$chkSelect\"{checked} /></td>"
+                    f"<td>{reference_type}</td></tr>")
+    style = "" if state["picker"] else " style=\"display:none\""
+    return (f"<div id=\"MainContent_pnlRefType\"{style}>\n"
+            "<table id=\"MainContent_gvRefTypeSel\"><tr><th scope=\"col\"></th><th scope=\"col\">Type</th></tr>"
+            + "".join(rows) + "</table>\n"
+            "<input type=\"submit\" name=\"ctl00$MainContent$btnApplyRefType\" value=\"Apply\" "
+            "id=\"MainContent_btnApplyRefType\" />\n</div>")
+
+
+def render_dialog(site, row):
+    if site.direct_links:
+        items = "".join(f"<tr><td><a href=\"/Files/{row['Reference']}/{quote(name)}\">{name}</a></td></tr>"
+                        for name in site.files(row))
+    else:
+        items = "".join(f"<tr><td>{name}</td></tr>" for name in site.files(row))
+    return ("<div id=\"MainContent_popDownload\" class=\"dxpc-content\">\n"
+            f"<h4>Files for {row['Reference']}</h4>\n"
+            f"<table id=\"MainContent_gvFiles\">{items}</table>\n"
+            "<input type=\"submit\" name=\"ctl00$MainContent$ASPxButton1\" value=\"Download All\" "
+            "id=\"MainContent_ASPxButton1\" />\n"
+            "<input type=\"submit\" name=\"ctl00$MainContent$ASPxButton3\" value=\"Remove All\" "
+            "id=\"MainContent_ASPxButton3\" />\n</div>")
+
+
+def render(site, state):
+    state["n"] += 1
+    parts = ["<input type=\"submit\" name=\"ctl00$MainContent$butReferenceType\" value=\"Reference Type\" "
+             "id=\"MainContent_butReferenceType\" />",
+             render_picker(site, state),
+             "<input type=\"submit\" name=\"ctl00$MainContent$btnSearch\" value=\"Search\" "
+             "id=\"MainContent_btnSearch\" />"]
+    if state["searched"]:
+        types = state["searched"]
+        grid = MockGridView(site.total_pages(types))
+        grid.current = state["page"]
+        rows = site.page_rows(types, state["page"])
+        parts.append(render_grid(rows, state["page"], grid.links() if grid.total_pages > 1 else None))
+        site.count("grid_pages")
+        if state["dialog"] is not None and state["dialog"] < len(rows):
+            parts.append(render_dialog(site, rows[state["dialog"]]))
+    viewstate, validation = site.encode_state(state)
+    return render_page("\n".join(parts), viewstate, validation)
+
+
+def new_state():
+    return {"types": [], "picker": False, "searched": None, "page": 1, "dialog": None, "n": 0}
+
+
+class Handler(BaseHTTPRequestHandler):
+    site = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.site
+        site.count("requests")
+        path = urlparse(self.path).path
+        if path == "/__stats":
+            with site.lock:
+                return self.send_body(json.dumps(site.stats).encode(), "application/json")
+        site.delay()
+        if site.chance(site.error_rate):
+            return self.injected_error()
+        if path == SEARCH_PATH:
+            cookie = None if "ASP.NET_SessionId" in self.headers.get("Cookie", "") else os.urandom(12).hex()
+            return self.send_body(render(site, new_state()).encode(), "text/html; charset=utf-8", cookie=cookie)
+        match = re.fullmatch(r"/Files/(\d+)/([^/]+)", path)
+        if match:
+            row = site.find_reference(match.group(1))
+            name = unquote(match.group(2))
+            if row is not None and name in site.files(row):
+                return self.send_file(name, site.file_bytes(row, name))
+        self.send_error(404)
+
+    def do_POST(self):
+        site = self.site
+        site.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode(), keep_blank_values=True).items()}
+        site.delay()
+        if urlparse(self.path).path != SEARCH_PATH:
+            return self.send_error(404)
+        if site.chance(site.error_rate):
+            return self.injected_error()
+        site.count("postbacks")
+        try:
+            state = site.decode_state(form.get("__VIEWSTATE", ""), form.get("__EVENTVALIDATION"))
+            response = self.postback(state, form)
+        except (ValueError, KeyError) as e:
+            site.count("rejected")
+            return self.send_body(f"<h1>Server Error in '/' Application.</h1><p>{e}</p>".encode(),
+                                  "text/html; charset=utf-8", status=500)
+        if response is not None:
+            return self.send_file(*response)
+        self.send_body(render(site, state).encode(), "text/html; charset=utf-8")
+
+    def postback(self, state, form):
+        """Apply one postback to state; returns (name, bytes) when the answer is a file."""
+        site = self.site
+        target, argument = form.get("__EVENTTARGET", ""), form.get("__EVENTARGUMENT", "")
+        if target == GRID_TARGET and argument.startswith("Page$"):
+            if not state["searched"]:
+                raise ValueError("Invalid postback or callback argument")
+            grid = MockGridView(site.total_pages(state["searched"]))
+            grid.current = state["page"]
+            # Event validation accepts what the pager rendered, plus a repeat of the current page
+            if argument != f"Page${grid.current}":
+                try:
+                    grid.post(argument)
+                except Exception:
+                    raise ValueError("Invalid postback or callback argument")
+            state.update(page=grid.current, dialog=None)
+        elif target == GRID_TARGET and argument.startswith("DownloadRec$"):
+            index = int(argument.split("$", 1)[1])
+            if not state["searched"] or index >= len(site.page_rows(state["searched"], state["page"])):
+                raise ValueError("Invalid postback or callback argument")
+            state["dialog"] = index
+        elif "ctl00$MainContent$butReferenceType" in form:
+            state["picker"] = True
+        elif "ctl00$MainContent$btnApplyRefType" in form:
+            state["types"] = [t for i, t in enumerate(site.types)
+                              if f"ctl00$MainContent$gvRefTypeSel$ctl{i + 2:02d}$chkSelect" in form]
+            state["picker"] = False
+        elif "ctl00$MainContent$btnSearch" in form:
+            state.update(searched=state["types"] or list(site.types), page=1, dialog=None, picker=False)
+        elif "ctl00$MainContent$ASPxButton1" in form:
+            if state["dialog"] is None:
+                raise ValueError("No report selected")
+            row = site.page_rows(state["searched"], state["page"])[state["dialog"]]
+            return site.download_all(row)
+        elif "ctl00$MainContent$ASPxButton3" in form:
+            state["dialog"] = None
+        return None
+
+    def injected_error(self):
+        self.site.count("errors_injected")
+        self.send_body(b"Service Unavailable", "text/plain", status=503)
+
+    def send_body(self, body, content_type, status=200, cookie=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", f"ASP.NET_SessionId={cookie}; path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(body)
+        self.site.count("bytes", len(body))
+
+    def send_file(self, name, data):
+        """Send a file as an attachment, honouring a 'bytes=N-' Range."""
+        site = self.site
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and int(match.group(1)) < len(data):
+            start = int(match.group(1))
+            if site.chance(site.bad_range_rate):
+                # A broken cache or proxy: partial content, but not from where it was asked
+                start //= 2
+                site.count("bad_ranges_injected")
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        kind = "application/zip" if name.endswith(".zip") else "application/pdf"
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Disposition", f"attachment; filename=\"{name}\"")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        site.count("files")
+        # A dropped transfer stops halfway through and closes the connection
+        end = start + (len(data) - start) // 2 if site.chance(site.drop_rate) else len(data)
+        sent_at = time.time()
+        for offset in range(start, end, CHUNK_SIZE):
+            chunk = data[offset:min(offset + CHUNK_SIZE, end)]
+            self.wfile.write(chunk)
+            site.count("bytes", len(chunk))
+            if site.bandwidth:
+                ahead = (offset + len(chunk) - start) / (site.bandwidth * 1e6) - (time.time() - sent_at)
+                if ahead > 0:
+                    time.sleep(ahead)
+        if end < len(data):
+            site.count("drops_injected")
+            self.close_connection = True
+
+
+def serve(site, host="127.0.0.1", port=8000):
+    """Start the server on a background thread; returns it (server.server_port has the port)."""
+    server = ThreadingHTTPServer((host, port), type("MockHandler", (Handler,), {"site": site}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the NWT ReferenceSearch.aspx page.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 picks a free port")
+    parser.add_argument("--pages", type=int, default=250, help="result pages per reference type")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--types", help="comma-separated reference types (default: %s)" % ", ".join(REFERENCE_TYPES))
+    parser.add_argument("--file-size", type=parse_size, default="256K", help="size of each synthetic PDF")
+    parser.add_argument("--max-files", type=int, default=2, help="files per report vary from 1 to this")
+    parser.add_argument("--direct-links", action="store_true", help="list each file as a link in the dialog")
+    parser.add_argument("--viewstate-kb", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of file transfers cut off halfway")
+    parser.add_argument("--bad-range-rate", type=float, default=0.0,
+                        help="fraction of resumed transfers answered from the wrong offset")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="MB/s cap per transfer (0 = none)")
+    parser.add_argument("--hide-newest", type=int, default=0,
+                        help="leave out each type's N newest reports, as if they weren't published yet")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    types = [t.strip() for t in args.types.split(",")] if args.types else None
+    site = MockSite(args.pages, args.page_size, types, args.file_size, args.max_files, args.direct_links,
+                    args.viewstate_kb, args.latency, args.jitter, args.error_rate, args.drop_rate,
+                    args.bandwidth, args.seed, args.hide_newest, args.bad_range_rate)
+    server = serve(site, args.host, args.port)
+    # The benchmark harness reads this line to learn the port
+    print(f"Serving {SEARCH_PATH} on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps(site.stats))
+
+
+if __name__ == "__main__":
+    main()
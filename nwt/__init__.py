@@ -0,0 +1 @@
+"""Shared helpers for the NWT Geoscience scraper and downloader scripts."""
@@ -0,0 +1,96 @@
+"""Reuse the post-search session instead of redoing the search setup.
+
+Getting to the results grid takes a page load, opening the reference type
+picker, ticking a row, applying it and running the search. Every run, shard
+worker and recycled browser repeats those steps. Once one session has
+done it, SessionCache keeps that session's cookies and form state
+(__VIEWSTATE, __EVENTVALIDATION and the picker's checkbox). A new session
+replays them as a single Page$1 postback, which rebuilds the same grid.
+
+The replayed grid is checked before it is trusted: it must be on page 1, have
+rows, and every row must be of the requested type. Otherwise (expired or
+tampered state, a site update) the cached entry is dropped and the caller does
+the full setup, which refreshes the cache.
+"""
+from contextlib import contextmanager
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_CACHE = ".nwt_session_cache.json"
+MAX_AGE = 6 * 3600
+
+
+class SessionCache:
+    """JSON file of post-search state, one entry per (site, reference type)."""
+
+    def __init__(self, path=DEFAULT_CACHE, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    @staticmethod
+    def key(base_url, reference_type):
+        return f"{base_url.rstrip('/')}|{reference_type}"
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        # Written whole and renamed into place: shard workers may read it at any time.
+        # Owner-only, since the entries hold session cookies
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def load(self, base_url, reference_type):
+        """The cached entry ({"cookies", "fields", "saved"}), or None if missing or stale."""
+        entry = self._read().get(self.key(base_url, reference_type))
+        if entry is None or time.time() - entry.get("saved", 0) > self.max_age:
+            return None
+        return entry
+
+    @contextmanager
+    def _updating(self):
+        """Hold a lock file while reading and rewriting, so workers saving different types at once
+        don't drop each other's entries. Without fcntl (Windows) the last writer wins."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def save(self, base_url, reference_type, cookies, fields):
+        with self._updating():
+            entries = self._read()
+            entries[self.key(base_url, reference_type)] = {
+                "saved": time.time(),
+                "cookies": cookies,
+                "fields": fields,
+            }
+            self._write(entries)
+
+    def forget(self, base_url, reference_type):
+        with self._updating():
+            entries = self._read()
+            if entries.pop(self.key(base_url, reference_type), None) is not None:
+                self._write(entries)
+
+
+def results_valid(records, reference_type):
+    """True if records look like page 1 of a search for reference_type."""
+    if not records:
+        return False
+    wanted = reference_type.lower()
+    return all(wanted in (record.get("Type") or "").lower() for record in records)
@@ -0,0 +1,200 @@
+"""Selenium helpers shared by the scraper and downloader scripts.
+
+selenium is imported by the functions that need it, so the scripts (and their
+--engine http) load without it installed.
+"""
+from bs4 import BeautifulSoup
+import time
+
+from nwt import dom, trace
+from nwt.bootstrap import results_valid
+
+from nwt.common import (BASE_URL, SEARCH_PATH, GRID_ID, REF_TYPE_GRID_ID, REF_TYPE_BUTTON_ID,
+                        APPLY_REF_TYPE_BUTTON_ID, SEARCH_BUTTON_ID, DEFAULT_REFERENCE_TYPE, GRID_TARGET)
+from nwt.http_engine import form_fields
+from nwt.parse import records_from_grid_rows
+from nwt.pager import find_last_page, is_last_page, jump_to_page, links_from_hrefs
+from nwt.reftypes import picker_types
+from nwt.sync import wait_for_postback
+
+# One roundtrip for every pager href instead of a find_element per link
+PAGER_HREFS_JS = (
+    "return Array.from(document.querySelectorAll(\"#MainContent_gvReferences a[href*='Page$']\"),"
+    " function (a) { return a.getAttribute('href'); });"
+)
+
+# POST a cached form state back to the page, as __doPostBack would
+REPLAY_FORM_JS = """
+var fields = arguments[0];
+var form = document.createElement('form');
+form.method = 'post';
+form.action = document.forms.length ? document.forms[0].action : window.location.href;
+for (var name in fields) {
+    var input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = fields[name];
+    form.appendChild(input);
+}
+document.body.appendChild(form);
+HTMLFormElement.prototype.submit.call(form);
+"""
+
+
+def current_page(driver):
+    """Read the highlighted page number from the pager, defaulting to 1."""
+    from selenium.webdriver.common.by import By
+
+    try:
+        return int(driver.find_element(By.CSS_SELECTOR, "span.current").text.strip())
+    except Exception:
+        return 1
+
+
+def pager_links(driver):
+    return links_from_hrefs(driver.execute_script(PAGER_HREFS_JS) or [])
+
+
+def click_pager_link(driver, argument):
+    """Click the pager link for e.g. 'Page$12' and wait for the grid to reload."""
+    from selenium.webdriver.common.by import By
+
+    link = driver.find_element(By.XPATH, f"//a[contains(@href, \"'{argument}')\")]")
+    driver.execute_script("arguments[0].scrollIntoView();", link)
+    wait_for_postback(driver, link.click)
+
+
+def next_page(driver):
+    """Click through to the page after the current one and check the pager agrees."""
+    with trace.phase("next_page"):
+        _next_page(driver)
+
+
+def _next_page(driver):
+    target = current_page(driver) + 1
+    links = pager_links(driver)
+    if f"Page${target}" in links:
+        click_pager_link(driver, f"Page${target}")
+    elif "Page$Next" in links:
+        click_pager_link(driver, "Page$Next")
+    else:
+        raise Exception(f"No pager link to page {target}")
+    if current_page(driver) != target:
+        raise Exception(f"Expected page {target}, pager shows {current_page(driver)}")
+
+
+def on_last_page(driver):
+    """True when the pager has no link past the current page."""
+    return is_last_page(current_page(driver), pager_links(driver))
+
+
+def find_last_page_number(driver):
+    """Learn how many result pages there are, then come back to the current page."""
+    start = current_page(driver)
+    last, hops = find_last_page(lambda: current_page(driver), lambda: pager_links(driver),
+                                lambda argument: click_pager_link(driver, argument))
+    print(f"Results end at page {last} (found in {hops} postbacks)")
+    if not navigate_to_page(driver, start):
+        raise Exception(f"Could not return to page {start}")
+    return last
+
+
+def restore_search(driver, entry, reference_type):
+    """Replay a cached post-search state (see nwt.bootstrap); True if the grid checks out."""
+    for cookie in entry["cookies"]:
+        try:
+            driver.add_cookie({"name": cookie["name"], "value": cookie["value"], "path": cookie.get("path") or "/"})
+        except Exception:
+            pass
+    fields = dict(entry["fields"], __EVENTTARGET=GRID_TARGET, __EVENTARGUMENT="Page$1")
+    try:
+        wait_for_postback(driver, lambda: driver.execute_script(REPLAY_FORM_JS, fields), timeout=30)
+        return current_page(driver) == 1 and results_valid(records_from_grid_rows(dom.grid_rows(driver)),
+                                                           reference_type)
+    except Exception as e:
+        print(f"Replaying the cached session failed: {e}")
+        return False
+
+
+def reference_types(driver, base_url=BASE_URL):
+    """Open the search page and the reference type picker; the names of the types it lists."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver.get(base_url.rstrip("/") + SEARCH_PATH)
+    WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, REF_TYPE_BUTTON_ID))).click()
+    WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, REF_TYPE_GRID_ID)))
+    return picker_types(BeautifulSoup(driver.page_source, "html.parser"))
+
+
+def setup_search(driver, base_url=BASE_URL, reference_type=DEFAULT_REFERENCE_TYPE, cache=None):
+    """Open the search page, select the reference type and run the search.
+
+    With a SessionCache, a saved post-search state is replayed instead when it
+    still produces a valid grid, and a full setup refreshes the cache.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    start = time.time()
+    print("Opening website...")
+    driver.get(base_url.rstrip("/") + SEARCH_PATH)
+    entry = cache.load(base_url, reference_type) if cache is not None else None
+    if entry is not None:
+        if restore_search(driver, entry, reference_type):
+            print(f"Results loaded from the cached session in {time.time() - start:.2f}s.")
+            trace.record("setup", time.time() - start, cached=True)
+            return
+        print("Cached session is no longer valid; running the full search setup.")
+        cache.forget(base_url, reference_type)
+        driver.delete_all_cookies()
+        driver.get(base_url.rstrip("/") + SEARCH_PATH)
+
+    print(f"Selecting {reference_type} type...")
+    WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, REF_TYPE_BUTTON_ID))).click()
+    WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, REF_TYPE_GRID_ID)))
+
+    rows = driver.find_element(By.ID, REF_TYPE_GRID_ID).find_elements(By.TAG_NAME, "tr")
+    for row in rows:
+        cells = row.find_elements(By.TAG_NAME, "td")
+        if len(cells) >= 2 and reference_type in cells[1].text:
+            checkbox = cells[0].find_element(By.TAG_NAME, "input")
+            driver.execute_script("arguments[0].click();", checkbox)
+            print(f"'{reference_type}' selected")
+            break
+    else:
+        raise Exception(f"{reference_type} option not found")
+
+    # Apply may or may not post back; the search button is ready either way
+    apply_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, APPLY_REF_TYPE_BUTTON_ID)))
+    wait_for_postback(driver, apply_button.click, ready_id=SEARCH_BUTTON_ID, timeout=5, optional=True)
+    search_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, SEARCH_BUTTON_ID)))
+
+    print("Waiting for results...")
+    wait_for_postback(driver, search_button.click, ready_id=GRID_ID, timeout=30)
+    print(f"Results loaded in {time.time() - start:.2f}s.")
+    trace.record("setup", time.time() - start, cached=False)
+    if cache is not None:
+        cookies = [{"name": c["name"], "value": c["value"], "domain": c.get("domain"), "path": c.get("path")}
+                   for c in driver.get_cookies()]
+        cache.save(base_url, reference_type, cookies, form_fields(BeautifulSoup(driver.page_source, "html.parser")))
+
+
+def navigate_to_page(driver, target_page):
+    """Navigate to a specific page number by always taking the pager link nearest to it"""
+    start_page = current_page(driver)
+    print(f"Currently on page {start_page}, navigating to page {target_page}")
+    if start_page == target_page:
+        return True
+    try:
+        with trace.phase("navigate", target=target_page) as timing:
+            hops = jump_to_page(target_page, lambda: current_page(driver), lambda: pager_links(driver),
+                                lambda argument: click_pager_link(driver, argument))
+            timing.fields["hops"] = hops
+    except Exception as e:
+        print(f"Navigation error: {str(e)}")
+        return False
+    print(f"Reached page {target_page} in {hops} postbacks")
+    return True
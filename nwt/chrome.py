@@ -0,0 +1,168 @@
+"""Chrome driver factory: resource policy, memory flags, recycling and metrics.
+
+Both scripts only read the grid's DOM, yet a default profile fetches every
+image, the icon font behind the fa-download icons, and the stylesheets on every
+postback. A resource policy drops those requests with the CDP
+Network.setBlockedURLs command before they leave the browser:
+
+- "full": block nothing, as before.
+- "lean": block images, fonts and media.
+- "minimal": also block stylesheets. Only safe where nothing depends on
+  computed visibility, so the downloader (DevExpress dialog) doesn't offer it.
+
+ManagedDriver counts pages, prints the bytes transferred and the browser's
+RSS after each one, and replaces the browser every `recycle_after` pages so
+a long crawl's memory can't keep growing.
+"""
+import json
+
+from nwt.procstats import process_tree_rss
+
+IMAGE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.bmp"]
+FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+MEDIA_PATTERNS = ["*.mp4", "*.webm", "*.mp3"]
+STYLE_PATTERNS = ["*.css", "*.css?*"]
+
+POLICIES = {
+    "full": [],
+    "lean": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS,
+    "minimal": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS + STYLE_PATTERNS,
+}
+
+# The two performance-log events page_metrics() reads
+TRACKED_EVENTS = ("Network.loadingFinished", "Network.loadingFailed")
+
+# Background services, a second renderer and the V8 heap are the main costs per instance
+MEMORY_FLAGS = (
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--renderer-process-limit=1",
+    "--js-flags=--max-old-space-size=256",
+)
+
+
+def chrome_options(policy="lean", headless=True, download_dir=None, metrics=True):
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    for flag in MEMORY_FLAGS:
+        options.add_argument(flag)
+    prefs = {}
+    if policy != "full":
+        # Also stops the renderer decoding images that slip past the URL patterns
+        prefs["profile.managed_default_content_settings.images"] = 2
+    if download_dir:
+        prefs.update({
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True,
+        })
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+    if metrics:
+        # chromedriver can't filter the log by method, so log the Network domain
+        # at INFO only (no Page domain, no trace categories) and let
+        # page_metrics() drain it after every page, keeping TRACKED_EVENTS
+        options.set_capability("goog:loggingPrefs", {"performance": "INFO"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False, "traceCategories": ""})
+    return options
+
+
+def create_driver(policy="lean", headless=True, download_dir=None, metrics=True):
+    """Start Chrome with the given resource policy ("full", "lean" or "minimal")."""
+    from selenium import webdriver
+
+    driver = webdriver.Chrome(options=chrome_options(policy, headless, download_dir, metrics))
+    apply_policy(driver, policy)
+    return driver
+
+
+def apply_policy(driver, policy):
+    patterns = POLICIES[policy]
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def page_metrics(driver):
+    """(bytes received, requests blocked) since the last call, from the performance log."""
+    received = blocked = 0
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None, None
+    for entry in entries:
+        if not any(event in entry["message"] for event in TRACKED_EVENTS):
+            continue
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            received += message["params"].get("encodedDataLength", 0)
+        elif message["method"] == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            blocked += 1
+    return received, blocked
+
+
+def driver_rss(driver):
+    """RSS of chromedriver plus every Chrome process under it."""
+    try:
+        return process_tree_rss(driver.service.process.pid)
+    except AttributeError:
+        return None
+
+
+class ManagedDriver:
+    """A Chrome driver that is replaced with a fresh one every recycle_after pages.
+
+    factory() starts a new driver; prepare(driver, page) brings a fresh one to
+    `page` (search set up, pager navigated). Always use .driver, since it
+    changes on recycle.
+    """
+
+    def __init__(self, factory, prepare, recycle_after=None, label="chrome"):
+        self.factory = factory
+        self.prepare = prepare
+        self.recycle_after = recycle_after
+        self.label = label
+        self.driver = factory()
+        self.pages = 0
+        self.recycles = 0
+
+    def page_done(self, page):
+        """Report this page's transfer and memory; True when the driver is due for recycling."""
+        received, blocked = page_metrics(self.driver)
+        rss = driver_rss(self.driver)
+        parts = [f"[{self.label}] page {page}"]
+        if received is not None:
+            parts.append(f"{received / 1024:.0f} KB transferred, {blocked} requests blocked")
+        if rss is not None:
+            parts.append(f"RSS {rss / 1e6:.0f} MB")
+        print(", ".join(parts))
+        self.pages += 1
+        return bool(self.recycle_after) and self.pages >= self.recycle_after
+
+    def recycle(self, page):
+        """Quit the browser and bring up a fresh one on `page`."""
+        print(f"[{self.label}] recycling the browser after {self.pages} pages")
+        self.quit()
+        self.driver = self.factory()
+        self.pages = 0
+        self.recycles += 1
+        self.prepare(self.driver, page)
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
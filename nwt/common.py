@@ -0,0 +1,16 @@
+"""Constants shared by the Chrome and HTTP engines."""
+
+BASE_URL = "https://app.nwtgeoscience.ca"
+SEARCH_PATH = "/Searching/ReferenceSearch.aspx"
+
+# Element ids as rendered by the ASP.NET page
+GRID_ID = "MainContent_gvReferences"
+REF_TYPE_GRID_ID = "MainContent_gvRefTypeSel"
+REF_TYPE_BUTTON_ID = "MainContent_butReferenceType"
+APPLY_REF_TYPE_BUTTON_ID = "MainContent_btnApplyRefType"
+SEARCH_BUTTON_ID = "MainContent_btnSearch"
+
+# __doPostBack target used by the results grid pager
+GRID_TARGET = "ctl00$MainContent$gvReferences"
+
+DEFAULT_REFERENCE_TYPE = "Assessment Report"
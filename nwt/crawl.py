@@ -0,0 +1,133 @@
+"""Engine-independent page loop shared by the Chrome and HTTP scrapers."""
+import os
+
+from nwt import policy, trace
+from nwt.manifest import DONE, FAILED
+
+# Page-level attempts; each postback inside is also retried by the policy
+PAGE_ATTEMPTS = 3
+
+
+class TableNotFound(Exception):
+    pass
+
+
+def go_to_page(target, next_page, navigate, step):
+    """Reach target, retrying through the shared policy.
+
+    step means target is the next page: the first attempt clicks Next, and
+    retries navigate to the absolute page in case the failed click landed.
+    """
+    attempts = []
+
+    def attempt():
+        attempts.append(target)
+        if step and len(attempts) == 1:
+            next_page()
+        elif not navigate(target):
+            raise Exception(f"Failed to navigate to page {target}")
+    policy.shared().retry(attempt, f"Going to page {target}", PAGE_ATTEMPTS)
+
+
+def first_todo(page, last_page, manifest=None, find_last_page=None):
+    """The first page from `page` on that still needs work, and the range's last page.
+
+    last_page None is an open range ("5-", "all"). Paging on with Next stops at
+    the pager's last page by itself, so find_last_page() is only called when
+    the manifest skips over finished pages and the jump has to land on a page
+    that exists. Returns (page, or None if nothing is left, last_page).
+    """
+    todo = page
+    if manifest is not None:
+        todo = manifest.next_incomplete_page(page, last_page)
+    if last_page is None and todo is not None and todo > page and find_last_page is not None:
+        last_page = find_last_page()
+    if todo is not None and last_page is not None and todo > last_page:
+        todo = None
+    return todo, last_page
+
+
+def extract_with_retries(extract, page):
+    """extract(page), retried while the grid is missing (e.g. still rendering)."""
+    def attempt():
+        result = extract(page)
+        if not result:
+            raise TableNotFound(f"table not found on page {page}")
+        return result
+    return policy.shared().retry(attempt, f"Reading page {page}", PAGE_ATTEMPTS)
+
+
+def scrape_range(first_page, last_page, extract, next_page, navigate, folder="assessment_reports",
+                 progress=None, manifest=None, on_last_page=None, find_last_page=None):
+    """Scrape first_page..last_page, skipping pages the manifest already has.
+
+    extract(page) saves one page and returns (path, sha256, record count) or a
+    falsy value if the grid was missing; next_page() moves one page forward and
+    navigate(page) jumps anywhere. progress(page, error) is called once per page
+    with error=None on success (pages already complete count as successes).
+    last_page None runs to the pager's last page (on_last_page()); see
+    first_todo for when find_last_page() is needed.
+    """
+    os.makedirs(folder, exist_ok=True)  # Create folder if it doesn't exist
+    progress = progress or (lambda page, error=None: None)
+
+    def todo_after(page):
+        nonlocal last_page
+        todo, last_page = first_todo(page, last_page, manifest, find_last_page)
+        return todo
+
+    page = todo_after(first_page)
+    if manifest is not None:
+        print(manifest.summary(first_page, last_page))
+    for done in range(first_page, page or last_page + 1):
+        progress(done)
+    if page is None:
+        print(f"All pages {first_page}-{last_page} already scraped.")
+        return
+
+    # Navigate to the first page still to do if not already there
+    if page > 1:
+        try:
+            go_to_page(page, next_page, navigate, step=False)
+        except Exception as e:
+            print(f"Failed to navigate to page {page}: {e}")
+            if manifest is not None:
+                manifest.mark_page(page, FAILED, error="navigation failed")
+            progress(page, "navigation failed")
+            return
+
+    while True:
+        try:
+            result = extract_with_retries(extract, page)
+        except Exception as e:
+            print(f"No data extracted ({e}). Stopping.")
+            if manifest is not None:
+                manifest.mark_page(page, FAILED, error=str(e))
+            progress(page, str(e))
+            break
+        if manifest is not None:
+            path, content_hash, records = result
+            manifest.mark_page(page, DONE, path=path, content_hash=content_hash, records=records)
+        trace.count("page", page=page, records=result[2])
+        progress(page)
+        if last_page is None and on_last_page():
+            print(f"Page {page} is the last page of results.")
+            break
+
+        next_todo = todo_after(page + 1)
+        for done in range(page + 1, next_todo or last_page + 1):
+            progress(done)
+        if next_todo is None:
+            print(f"Reached specified last page ({last_page}).")
+            break
+
+        try:
+            # Follow the next page link (or '...'/Next) and wait for the new grid, or jump
+            go_to_page(next_todo, next_page, navigate, step=next_todo == page + 1)
+            page = next_todo
+        except Exception as e:
+            print("No more pages or encountered an error:", str(e))
+            if manifest is not None:
+                manifest.mark_page(next_todo, FAILED, error=str(e))
+            progress(next_todo, str(e))
+            break
@@ -0,0 +1,92 @@
+"""Read the whole gvReferences grid in a single WebDriver roundtrip.
+
+Calling get_attribute/find_element per anchor costs one roundtrip each, so a
+page of results used to cost O(rows x anchors) calls. GRID_ROWS_JS walks the
+table inside the browser and returns plain data; a live element is only
+looked up (resolve_link) when something actually has to be clicked.
+"""
+
+# Mirrors the row filtering in nwt.parse.parse_records: drop pager rows, then
+# the header row. Each row comes back with its cell texts, the first href in
+# the Location cell, and the position of its download anchor (if any).
+GRID_ROWS_JS = """
+var table = document.getElementById('MainContent_gvReferences');
+if (!table) return null;
+var rows = table.getElementsByTagName('tr');
+var kept = [];
+for (var i = 0; i < rows.length; i++) {
+    var row = rows[i];
+    if ((' ' + row.className + ' ').indexOf(' pgr ') >= 0) continue;
+    if (row.querySelector("a[href*='Page$']")) continue;
+    var span = row.querySelector('span');
+    if (span && /^[0-9]+$/.test(span.textContent.trim())) continue;
+    kept.push(i);
+}
+if (kept.length > 1) kept = kept.slice(1);
+var out = [];
+for (var k = 0; k < kept.length; k++) {
+    var row = rows[kept[k]];
+    var cells = row.getElementsByTagName('td');
+    var texts = [];
+    for (var c = 0; c < cells.length; c++) texts.push(cells[c].textContent);
+    var locationLink = cells.length >= 6 ? cells[5].querySelector('a') : null;
+    var anchors = row.getElementsByTagName('a');
+    var download = -1, downloadHref = null;
+    for (var a = 0; a < anchors.length; a++) {
+        var href = anchors[a].getAttribute('href') || '';
+        if (anchors[a].querySelector('i.fa-download') || href.indexOf('DownloadRec') >= 0) {
+            download = a; downloadHref = anchors[a].href; break;
+        }
+    }
+    if (download < 0) {
+        for (var a = 0; a < anchors.length; a++) {
+            if ((anchors[a].getAttribute('href') || '').indexOf('__doPostBack') >= 0) {
+                download = a; downloadHref = anchors[a].href; break;
+            }
+        }
+    }
+    out.push({
+        tr: kept[k],
+        cells: texts,
+        location_href: locationLink ? locationLink.getAttribute('href') : null,
+        download_anchor: download,
+        download_href: downloadHref
+    });
+}
+return out;
+"""
+
+RESOLVE_LINK_JS = """
+var rows = document.getElementById('MainContent_gvReferences').getElementsByTagName('tr');
+var row = rows[arguments[0]];
+return row ? row.getElementsByTagName('a')[arguments[1]] || null : null;
+"""
+
+
+def grid_rows(driver):
+    """Return the grid's data rows as plain dicts, or None if the grid is missing."""
+    return driver.execute_script(GRID_ROWS_JS)
+
+
+def download_links(rows):
+    """Number the rows that have a download link 1..n, the same way the old icon scan did.
+
+    Returns [(number, {"reference", "href", "tr", "anchor"})].
+    """
+    links = []
+    for row in rows or []:
+        if row["download_anchor"] < 0:
+            continue
+        reference = row["cells"][0].strip() if row["cells"] else ""
+        links.append((len(links) + 1, {
+            "reference": reference,
+            "href": row["download_href"],
+            "tr": row["tr"],
+            "anchor": row["download_anchor"],
+        }))
+    return links
+
+
+def resolve_link(driver, link):
+    """Look up the live <a> element for a link dict from download_links."""
+    return driver.execute_script(RESOLVE_LINK_JS, link["tr"], link["anchor"])
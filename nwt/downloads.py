@@ -0,0 +1,275 @@
+"""Track Chrome downloads per file instead of polling for any .crdownload.
+
+Chrome writes a download to "<name>.crdownload" (at first "Unconfirmed
+NNN.crdownload") and renames it to its final name when it completes.
+DownloadTracker watches the download folder with inotify, so each create and
+rename is seen the moment it happens, without listing the folder.
+Every new file is attributed to whatever the caller last expect()-ed (the row
+whose "Download All" was just clicked). A download counts as stalled when its
+.crdownload stops growing, not after a fixed wall-clock timeout.
+
+Where inotify isn't available (macOS, Windows) the tracker falls back to
+diffing directory listings, which sees the same events one tick late.
+
+Each file is SHA-256 hashed while Chrome writes it: every tick feeds the bytes
+appended since the last one (still in the page cache) to the download's
+hasher, so a finished multi-GB ZIP doesn't have to be read again.
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+from nwt import trace
+
+PARTIAL_SUFFIX = ".crdownload"
+# Our own bookkeeping files (run manifest, store index) live in the same folder
+IGNORE_SUFFIXES = (".jsonl", ".prev")
+
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+
+def is_partial(name):
+    return name.endswith(PARTIAL_SUFFIX)
+
+
+class Inotify:
+    """Minimal inotify binding over ctypes: one watch, (mask, cookie, name) events."""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, i = [], 0
+        while i < len(data):
+            _, mask, cookie, length = EVENT.unpack_from(data, i)
+            name = os.fsdecode(data[i + EVENT.size:i + EVENT.size + length].rstrip(b"\0"))
+            events.append((mask, cookie, name))
+            i += EVENT.size + length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Download:
+    """One file Chrome is writing, and who asked for it."""
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+        self.started = time.time()
+        self.last_growth = self.started
+        self.size = 0
+        self.finished = None
+        self.path = None
+        self.error = None
+        self.hasher = hashlib.sha256()
+        self.hashed = 0
+        self.sha256 = None
+
+    def hash_tail(self, path):
+        """Hash whatever was appended to path since the last call."""
+        with open(path, "rb") as f:
+            f.seek(self.hashed)
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                self.hasher.update(chunk)
+                self.hashed += len(chunk)
+
+    def seconds(self):
+        return (self.finished or time.time()) - self.started
+
+    def mb_per_s(self):
+        return self.size / 1e6 / max(self.seconds(), 1e-6)
+
+
+class DownloadTracker:
+    """Per-file download events for one folder.
+
+    on_finish(download) is called once per file, when it completes (error is
+    None) or fails ("stalled" / "cancelled").
+    """
+
+    def __init__(self, download_dir, on_finish=None, stall_timeout=300, tick=0.5):
+        self.dir = download_dir
+        self.on_finish = on_finish
+        self.stall_timeout = stall_timeout
+        self.tick = tick
+        self.owner = None
+        self.in_flight = {}
+        self.finished = []
+        self.moved_from = {}
+        try:
+            if not sys.platform.startswith("linux"):
+                raise OSError("inotify needs Linux")
+            self.inotify = Inotify(download_dir)
+            self.seen = None
+        except OSError as e:
+            print(f"inotify unavailable ({e}); polling {download_dir} instead")
+            self.inotify = None
+            self.seen = set(os.listdir(download_dir))
+
+    def expect(self, owner):
+        """Attribute the files that appear from now on to owner."""
+        self.owner = owner
+
+    def owned(self, owner):
+        return [d for d in list(self.in_flight.values()) + self.finished if d.owner == owner]
+
+    def wait_for_start(self, timeout=30):
+        """Wait until a file for the current owner appears. Returns False if none did."""
+        deadline = time.time() + timeout
+        while not self.owned(self.owner):
+            if time.time() > deadline:
+                return False
+            self.poll()
+        return True
+
+    def wait(self, max_in_flight=0):
+        """Process events until at most max_in_flight files are still downloading.
+
+        Returns the downloads that finished or failed meanwhile.
+        """
+        start = len(self.finished)
+        while len(self.in_flight) > max_in_flight:
+            self.poll()
+        return self.finished[start:]
+
+    def poll(self):
+        """Handle one tick's worth of events and check in-flight files for stalls."""
+        if self.inotify:
+            self._handle_events(self.inotify.read(self.tick))
+        else:
+            time.sleep(self.tick)
+            self._diff_listing()
+        self._check_growth()
+
+    def _handle_events(self, events):
+        unpaired = set(self.moved_from)
+        for mask, cookie, name in events:
+            if mask & IN_CREATE:
+                self._appeared(name)
+            elif mask & IN_MOVED_FROM:
+                self.moved_from[cookie] = name
+            elif mask & IN_MOVED_TO:
+                old = self.moved_from.pop(cookie, None)
+                if old in self.in_flight:
+                    self._renamed(old, name)
+                else:
+                    self._appeared(name)
+            elif mask & IN_DELETE and name in self.in_flight:
+                self._fail(self.in_flight.pop(name), "cancelled")
+        # A rename out of the folder has no MOVED_TO half; give it one read to show up
+        for cookie in unpaired & set(self.moved_from):
+            name = self.moved_from.pop(cookie)
+            if name in self.in_flight:
+                self._fail(self.in_flight.pop(name), "cancelled")
+
+    def _diff_listing(self):
+        names = set(os.listdir(self.dir))
+        added, gone = names - self.seen, self.seen - names
+        self.seen = names
+        gone_partials = [name for name in gone if name in self.in_flight]
+        for name in sorted(added, key=is_partial):
+            if not is_partial(name) and name + PARTIAL_SUFFIX in gone_partials:
+                gone_partials.remove(name + PARTIAL_SUFFIX)
+                self._renamed(name + PARTIAL_SUFFIX, name)
+            elif len(gone_partials) == 1:
+                # "Unconfirmed NNN.crdownload" renamed, or a quick finish we only saw the end of
+                self._renamed(gone_partials.pop(), name)
+            else:
+                self._appeared(name)
+        for name in gone_partials:
+            self._fail(self.in_flight.pop(name), "cancelled")
+
+    def _appeared(self, name):
+        if name in self.in_flight or name.startswith(".") or name.endswith(IGNORE_SUFFIXES):
+            return
+        if os.path.isdir(os.path.join(self.dir, name)):
+            # A per-report folder, or a file filed away before we saw it
+            return
+        if is_partial(name):
+            self.in_flight[name] = Download(self.owner, name)
+        elif name + PARTIAL_SUFFIX in self.in_flight:
+            self._renamed(name + PARTIAL_SUFFIX, name)
+        else:
+            # Small files can be complete before we ever see the partial
+            self._complete(Download(self.owner, name), name)
+
+    def _renamed(self, old, new):
+        download = self.in_flight.pop(old)
+        if is_partial(new):
+            download.name = new
+            self.in_flight[new] = download
+        else:
+            self._complete(download, new)
+
+    def _complete(self, download, name):
+        download.name = name
+        download.path = os.path.join(self.dir, name)
+        try:
+            download.hash_tail(download.path)
+            download.size = download.hashed
+            download.sha256 = download.hasher.hexdigest()
+        except OSError as e:
+            print(f"Could not read {name}: {e}")
+        download.finished = time.time()
+        print(f"Downloaded {name} ({download.size / 1e6:.1f} MB in {download.seconds():.1f}s, "
+              f"{download.mb_per_s():.2f} MB/s)")
+        trace.record("transfer", download.seconds(), bytes=download.size, name=name, engine="chrome")
+        self._done(download)
+
+    def _fail(self, download, error):
+        download.error = error
+        download.finished = time.time()
+        print(f"Download {download.name} {error} after {download.size / 1e6:.1f} MB")
+        self._done(download)
+
+    def _done(self, download):
+        self.finished.append(download)
+        if self.on_finish:
+            self.on_finish(download)
+
+    def _check_growth(self):
+        now = time.time()
+        for name, download in list(self.in_flight.items()):
+            path = os.path.join(self.dir, name)
+            try:
+                size = os.path.getsize(path)
+                if size > download.size:
+                    download.hash_tail(path)
+            except OSError:
+                continue
+            if size > download.size:
+                download.size, download.last_growth = size, now
+            elif now - download.last_growth > self.stall_timeout:
+                self._fail(self.in_flight.pop(name), "stalled")
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
@@ -0,0 +1,197 @@
+"""Concurrent, resumable HTTP file downloads.
+
+Each report's files are resolved to plain HTTP requests once (see
+HttpGridSession.resolve_report_files) and then fetched here by the download
+pipeline's workers (nwt.pipeline), sharing one pooled requests session.
+Files stream to a .part file in fixed-size chunks, so memory stays bounded
+whatever the file size. An interrupted .part file is resumed with an HTTP
+Range request. Each attempt takes a token from the shared Policy
+(nwt.policy), and server errors, resets and bodies cut off mid-transfer are
+retried with its backoff.
+"""
+from urllib.parse import unquote, urlparse
+import hashlib
+import os
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nwt import policy as request_policy
+from nwt.policy import FATAL, SERVER, check_status, classify
+
+CHUNK_SIZE = 1024 * 1024
+FILENAME_RE = re.compile(r"""filename\*?=(?:UTF-8'')?["']?([^"';]+)""", re.IGNORECASE)
+CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-\d+/(?:\d+|\*)", re.IGNORECASE)
+
+
+def safe_name(name):
+    """Strip path separators and other characters that don't belong in a file name."""
+    name = os.path.basename(unquote(name or "").replace("\\", "/")).strip()
+    return re.sub(r'[<>:"|?*\x00-\x1f]', "_", name) or "download"
+
+
+def response_filename(response, fallback):
+    """File name from Content-Disposition, else the URL path, else fallback."""
+    match = FILENAME_RE.search(response.headers.get("Content-Disposition", ""))
+    if match:
+        return safe_name(match.group(1))
+    path_name = os.path.basename(urlparse(response.url).path)
+    if "." in path_name and not path_name.lower().endswith(".aspx"):
+        return safe_name(path_name)
+    return safe_name(fallback)
+
+
+def hash_file(path, hasher=None, chunk_size=CHUNK_SIZE):
+    """Feed a whole file to hasher (a new sha256 by default) and return it."""
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+class ShortRead(requests.exceptions.ChunkedEncodingError):
+    """The body ended before Content-Length bytes arrived."""
+
+
+class RangeMismatch(Exception):
+    """A 206 response that doesn't start where the .part file ends."""
+
+
+def range_start(response):
+    """First byte offset of a 206 response's Content-Range, or None if it has none."""
+    match = CONTENT_RANGE_RE.match(response.headers.get("Content-Range", "").strip())
+    return int(match.group(1)) if match else None
+
+
+class DownloadJob:
+    """One file to fetch: a GET of url, or a POST of form data (e.g. 'Download All')."""
+
+    def __init__(self, reference, url, name=None, data=None):
+        self.reference = reference
+        self.url = url
+        self.name = name
+        self.data = data
+
+    def key(self):
+        """Stable name for the .part file, so a later run finds and resumes it."""
+        if self.name:
+            return safe_name(self.name)
+        # Leave out __VIEWSTATE and friends: they change on every run
+        fields = sorted((k, v) for k, v in (self.data or {}).items() if not k.startswith("__"))
+        digest = hashlib.sha1(f"{self.url}|{fields}".encode("utf-8")).hexdigest()
+        return safe_name(f"{self.reference}_{digest[:12]}")
+
+    def __repr__(self):
+        return f"DownloadJob({self.reference!r}, {self.url!r}, name={self.name!r})"
+
+
+class Downloader:
+    """Pool of HTTP workers streaming files to disk with Range resume and retries."""
+
+    def __init__(self, http=None, max_workers=4, retries=5, timeout=60, chunk_size=CHUNK_SIZE, policy=None):
+        self.http = http or requests.Session()
+        self.policy = policy or request_policy.shared()
+        # One pooled connection per worker instead of requests' default of 10 shared
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+    def fetch(self, job, dest_dir):
+        """Download one job into dest_dir, retrying and resuming.
+
+        Returns (path, bytes, sha256); the hash is computed as the file streams in.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        part_path = os.path.join(dest_dir, job.key() + ".part")
+        for attempt in range(self.retries + 1):
+            self.policy.acquire()
+            try:
+                return self._fetch_once(job, dest_dir, part_path)
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL:
+                    raise
+                if kind == SERVER:
+                    self.policy.observe(ok=False)
+                if attempt == self.retries:
+                    raise Exception(f"{job.reference}: giving up after {attempt + 1} attempts: {e}")
+                delay = self.policy.backoff(attempt)
+                print(f"{job.reference}: {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _fetch_once(self, job, dest_dir, part_path):
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={have}-"} if have else {}
+        start = time.time()
+        if job.data is not None:
+            response = self.http.post(job.url, data=job.data, headers=headers, stream=True, timeout=self.timeout)
+        else:
+            response = self.http.get(job.url, headers=headers, stream=True, timeout=self.timeout)
+        with response:
+            check_status(response)
+            # The limiter adapts to time to first byte; the transfer itself depends on the file size
+            self.policy.observe(time.time() - start)
+            if response.status_code == 416:
+                # The part file is already complete
+                mode = None
+            elif response.status_code == 206:
+                offset = range_start(response)
+                if offset == have:
+                    mode = "ab"
+                elif offset == 0:
+                    # The whole file after all
+                    mode, have = "wb", 0
+                else:
+                    # Appending would corrupt the file; the retry asks for all of it
+                    os.remove(part_path)
+                    raise RangeMismatch(f"asked for bytes {have}- but got Content-Range "
+                                        f"{response.headers.get('Content-Range')!r}; starting over")
+            else:
+                response.raise_for_status()
+                # Server ignored the Range header; start this file over
+                mode, have = "wb", 0
+            # Only a resumed file's existing prefix is read back; new bytes are hashed as they arrive
+            hasher = hash_file(part_path) if have else hashlib.sha256()
+            if mode:
+                received = 0
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        received += len(chunk)
+                have += received
+                check_length(response, received)
+            name = job.name or response_filename(response, job.key())
+        path = unique_path(os.path.join(dest_dir, safe_name(name)))
+        os.replace(part_path, path)
+        return path, have, hasher.hexdigest()
+
+
+def check_length(response, received):
+    """Raise ShortRead if fewer bytes arrived than the response announced.
+
+    The bytes that did arrive stay in the .part file, so the retry resumes
+    with a Range request. A compressed body's length can't be compared.
+    """
+    expected = response.headers.get("Content-Length")
+    if expected and expected.isdigit() and not response.headers.get("Content-Encoding") \
+            and received < int(expected):
+        raise ShortRead(f"body cut off after {received} of {expected} bytes")
+
+
+def unique_path(path):
+    """Don't overwrite a different report's file that happens to share a name."""
+    if not os.path.exists(path):
+        return path
+    root, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{root} ({n}){ext}"):
+        n += 1
+    return f"{root} ({n}){ext}"
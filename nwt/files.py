@@ -0,0 +1,124 @@
+"""Download store keyed by Reference.
+
+Files live under downloaded_reports/<Reference>/, and store_index.jsonl
+records each file's name, size and SHA-256 plus when a report's download
+finished. Before clicking or fetching a row, the downloaders ask
+is_complete(); a re-crawl of reports we already have is then a metadata
+check instead of another multi-GB transfer.
+
+Hashes are computed while the file is written (Downloader for HTTP,
+DownloadTracker for Chrome), so adding a file never reads it again. A file
+whose content is already in the store under another report is replaced by a
+hard link to the existing copy. on_file(reference, path, sha256) is called
+for every file stored, e.g. to hand it to the PostProcessor.
+"""
+from datetime import datetime, timezone
+import json
+import os
+import threading
+
+from nwt.fetch import hash_file, safe_name
+
+INDEX_NAME = "store_index.jsonl"
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class DownloadStore:
+    """Report files laid out per Reference, with an append-only JSONL index."""
+
+    def __init__(self, root, on_file=None):
+        self.root = root
+        self.on_file = on_file
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self.reports = {}
+        self.by_hash = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self.index_path):
+            self._load()
+
+    def _load(self):
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                report = self.reports.setdefault(event["reference"], {"files": {}, "complete": None})
+                if event["kind"] == "file":
+                    report["files"][event["name"]] = event
+                    self.by_hash[event["sha256"]] = self.path(event["reference"], event["name"])
+                elif event["kind"] == "complete":
+                    report["complete"] = event["time"]
+
+    def _append(self, event):
+        event["time"] = now()
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        return event
+
+    def report_dir(self, reference):
+        path = os.path.join(self.root, safe_name(reference))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, reference, name):
+        return os.path.join(self.root, safe_name(reference), name)
+
+    def add_file(self, reference, path, sha256, size=None):
+        """Move a finished download into the report's folder and index it. Returns the stored path."""
+        with self.lock:
+            name = os.path.basename(path)
+            dest = os.path.join(self.report_dir(reference), name)
+            if os.path.abspath(path) != os.path.abspath(dest):
+                os.replace(path, dest)
+            size = os.path.getsize(dest) if size is None else size
+            twin = self.by_hash.get(sha256)
+            if twin and os.path.abspath(twin) != os.path.abspath(dest) and os.path.exists(twin):
+                try:
+                    os.link(twin, dest + ".link")
+                    os.replace(dest + ".link", dest)
+                    print(f"{reference}/{name} duplicates {os.path.relpath(twin, self.root)}; hard-linked")
+                except OSError:
+                    # No hard links on this filesystem; keep the second copy
+                    pass
+            event = self._append({"kind": "file", "reference": reference, "name": name,
+                                  "size": size, "sha256": sha256})
+            self.reports.setdefault(reference, {"files": {}, "complete": None})["files"][name] = event
+            self.by_hash.setdefault(sha256, dest)
+        if self.on_file:
+            self.on_file(reference, dest, sha256)
+        return dest
+
+    def mark_complete(self, reference):
+        with self.lock:
+            report = self.reports.setdefault(reference, {"files": {}, "complete": None})
+            report["complete"] = self._append({"kind": "complete", "reference": reference})["time"]
+
+    def is_complete(self, reference, verify=False):
+        """True if the report finished and every file is present at its recorded size.
+
+        verify=True also re-hashes each file against its recorded SHA-256.
+        """
+        report = self.reports.get(reference)
+        if not report or not report["complete"] or not report["files"]:
+            return False
+        for name, entry in report["files"].items():
+            path = self.path(reference, name)
+            try:
+                if os.path.getsize(path) != entry["size"]:
+                    return False
+            except OSError:
+                return False
+            if verify and hash_file(path).hexdigest() != entry["sha256"]:
+                print(f"{reference}/{name} fails its SHA-256 check")
+                return False
+        return True
+
+    def summary(self):
+        complete = sum(1 for report in self.reports.values() if report["complete"])
+        size = sum(entry["size"] for report in self.reports.values() for entry in report["files"].values())
+        return f"{complete} reports ({size / 1e9:.2f} GB) in {self.root}"
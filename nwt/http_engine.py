@@ -0,0 +1,422 @@
+"""Browserless engine that replays the ReferenceSearch.aspx postbacks over plain HTTP.
+
+The site is an ASP.NET WebForms page, so every interaction is a POST of the
+whole form back to the same URL together with the hidden __VIEWSTATE and
+__EVENTVALIDATION fields from the previous response. HttpGridSession keeps
+that state for one session and exposes the same steps main() performs in
+Chrome: pick the reference type, search, and page through the results grid.
+"""
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse
+import time
+
+import requests
+
+from nwt import policy as request_policy
+from nwt import trace
+from nwt.bootstrap import results_valid
+from nwt.common import (BASE_URL, SEARCH_PATH, GRID_ID, GRID_TARGET, REF_TYPE_GRID_ID,
+                        REF_TYPE_BUTTON_ID, APPLY_REF_TYPE_BUTTON_ID, SEARCH_BUTTON_ID,
+                        DEFAULT_REFERENCE_TYPE)
+from nwt.crawl import scrape_range
+from nwt.fetch import DownloadJob
+from nwt.pager import POSTBACK_RE, PagerCache, find_last_page, is_last_page, jump_to_page, reach_distance
+from nwt.parse import parse_records, save_page_data
+from nwt.reftypes import picker_types
+
+FILE_EXTENSIONS = (".pdf", ".zip", ".rar", ".7z", ".tif", ".tiff", ".jpg", ".png", ".doc", ".docx",
+                   ".xls", ".xlsx", ".csv", ".txt", ".dwg", ".dxf", ".shp", ".gz")
+
+DOWNLOAD_ALL_BUTTON_ID = "MainContent_ASPxButton1"
+
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+def form_fields(soup):
+    """Collect the form values a browser would submit, without any button."""
+    form = soup.find("form") or soup
+    fields = {}
+    for inp in form.find_all("input"):
+        name = inp.get("name")
+        if not name:
+            continue
+        kind = (inp.get("type") or "text").lower()
+        if kind in ("submit", "button", "image", "reset", "file"):
+            continue
+        if kind in ("checkbox", "radio"):
+            if inp.has_attr("checked"):
+                fields[name] = inp.get("value", "on")
+            continue
+        fields[name] = inp.get("value", "")
+    for select in form.find_all("select"):
+        name = select.get("name")
+        if not name:
+            continue
+        option = select.find("option", selected=True) or select.find("option")
+        if option is not None:
+            fields[name] = option.get("value", option.text)
+    for area in form.find_all("textarea"):
+        if area.get("name"):
+            fields[area["name"]] = area.text
+    return fields
+
+
+def control_fields(soup, element_id):
+    """Return the extra form fields that clicking the given control would submit."""
+    element = soup.find(id=element_id)
+    if element is None:
+        raise Exception(f"{element_id} not found in page")
+    for attr in ("href", "onclick"):
+        match = POSTBACK_RE.search(element.get(attr, ""))
+        if match:
+            return {"__EVENTTARGET": match.group(1), "__EVENTARGUMENT": match.group(2)}
+    if element.get("name"):
+        return {element["name"]: element.get("value", "")}
+    # DevExpress buttons render a wrapper div around the real submit input
+    inner = element.find(["input", "button"], attrs={"name": True})
+    if inner is not None:
+        return {inner["name"]: inner.get("value", "")}
+    raise Exception(f"Don't know how to click {element_id}")
+
+
+def pager_links(soup):
+    """Map each pager postback argument (e.g. 'Page$12') to its link text."""
+    links = {}
+    table = soup.find("table", id=GRID_ID)
+    if table is None:
+        return links
+    for a in table.find_all("a", href=True):
+        match = POSTBACK_RE.search(a["href"])
+        if match and match.group(1) == GRID_TARGET and match.group(2).startswith("Page$"):
+            links[match.group(2)] = a.text.strip()
+    return links
+
+
+def current_page_number(soup):
+    """Read the highlighted page number from the pager, defaulting to 1."""
+    span = soup.select_one("span.current")
+    try:
+        return int(span.text.strip())
+    except (AttributeError, ValueError):
+        return 1
+
+
+def download_links(soup):
+    """Number the grid rows that have a download link 1..n, like nwt.dom.download_links.
+
+    Returns [(number, {"reference", "href"})].
+    """
+    links = []
+    table = soup.find("table", id=GRID_ID)
+    if table is None:
+        return links
+    for row in table.find_all("tr"):
+        cells = row.find_all("td", recursive=False)
+        if not cells or row.find("a", href=lambda x: x and "Page$" in x):
+            continue
+        anchors = row.find_all("a", href=True)
+        chosen = None
+        for a in anchors:
+            if a.find("i", class_="fa-download") or "DownloadRec" in a["href"]:
+                chosen = a
+                break
+        if chosen is None:
+            chosen = next((a for a in anchors if "__doPostBack" in a["href"]), None)
+        if chosen is not None:
+            links.append((len(links) + 1, {"reference": cells[0].text.strip(), "href": chosen["href"]}))
+    return links
+
+
+def dialog_file_links(soup, page_url):
+    """Direct file links offered in the download dialog (anything that isn't a postback)."""
+    files = []
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith(("javascript:", "#", "mailto:")):
+            continue
+        path = urlparse(href).path.lower()
+        if path.endswith(FILE_EXTENSIONS) or "download" in path or "getfile" in path:
+            files.append((urljoin(page_url, href), a.text.strip() or None))
+    return files
+
+
+class HttpGridSession:
+    """One HTTP session against ReferenceSearch.aspx with its own viewstate."""
+
+    def __init__(self, base_url=BASE_URL, timeout=60, policy=None):
+        self.base_url = base_url
+        self.policy = policy or request_policy.shared()
+        self.url = base_url.rstrip("/") + SEARCH_PATH
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.http.headers["User-Agent"] = USER_AGENT
+        self.html = ""
+        self.soup = None
+        self.pager_cache = PagerCache()
+        self.last_page = None
+
+    def _load(self, response):
+        response.raise_for_status()
+        self.html = response.text
+        self.soup = BeautifulSoup(self.html, "html.parser")
+        if self.soup.find("table", id=GRID_ID) is not None:
+            # Keep this page's viewstate so later jumps can start from it
+            page, links = self.current_page(), pager_links(self.soup)
+            self.pager_cache.remember(page, links, form_fields(self.soup))
+            if is_last_page(page, links):
+                self.last_page = page
+        return self.soup
+
+    def open(self):
+        """GET the search page and start a fresh viewstate."""
+        return self._load(self.policy.call(
+            lambda: request_policy.check_status(self.http.get(self.url, timeout=self.timeout)), "Opening the search page"))
+
+    def postback(self, extra_fields, fields=None, attempts=None):
+        """POST the current form back with the given event fields added.
+
+        fields replaces the current form values, e.g. with a cached viewstate.
+        attempts=1 posts once: a failure is raised without retries and isn't
+        counted against the site.
+        """
+        data = dict(fields) if fields is not None else form_fields(self.soup)
+        data["__EVENTTARGET"] = ""
+        data["__EVENTARGUMENT"] = ""
+        data.update(extra_fields)
+        with trace.phase("postback", engine="http", argument=data["__EVENTARGUMENT"]):
+            # Re-posting the same form is safe: the server keeps no state between postbacks
+            response = self.policy.call(
+                lambda: request_policy.check_status(self.http.post(self.url, data=data, timeout=self.timeout,
+                                                                   headers={"Referer": self.url})),
+                f"Postback {data['__EVENTARGUMENT'] or data['__EVENTTARGET'] or 'form'}", attempts)
+            return self._load(response)
+
+    def click(self, element_id, extra_fields=None):
+        """Replay a click on a button or link button."""
+        fields = dict(extra_fields or {})
+        fields.update(control_fields(self.soup, element_id))
+        return self.postback(fields)
+
+    def reference_types(self):
+        """Open the search page and the reference type picker; the names of the types it lists."""
+        self.open()
+        self.click(REF_TYPE_BUTTON_ID)
+        return picker_types(self.soup)
+
+    def select_reference_type(self, reference_type=DEFAULT_REFERENCE_TYPE):
+        """Open the reference type picker, tick the matching row and apply it."""
+        self.click(REF_TYPE_BUTTON_ID)
+        table = self.soup.find("table", id=REF_TYPE_GRID_ID)
+        if table is None:
+            raise Exception("Reference type picker did not open")
+        for row in table.find_all("tr"):
+            cells = row.find_all("td")
+            if len(cells) >= 2 and reference_type in cells[1].text:
+                checkbox = cells[0].find("input")
+                if checkbox is None or not checkbox.get("name"):
+                    continue
+                checkbox["checked"] = "checked"
+                print(f"'{reference_type}' selected")
+                break
+        else:
+            raise Exception(f"{reference_type} option not found")
+        self.click(APPLY_REF_TYPE_BUTTON_ID)
+
+    def search(self):
+        """Run the search and make sure the results grid came back."""
+        self.click(SEARCH_BUTTON_ID)
+        if self.soup.find("table", id=GRID_ID) is None:
+            raise Exception("Results table not found after search")
+
+    def setup(self, reference_type=DEFAULT_REFERENCE_TYPE, cache=None):
+        """Do the same start-up sequence as main(): open, pick the type, search.
+
+        With a SessionCache, a saved post-search state is replayed instead when
+        it still produces a valid grid, and a full setup refreshes the cache.
+        """
+        start = time.time()
+        entry = cache.load(self.base_url, reference_type) if cache is not None else None
+        if entry is not None:
+            if self.restore(entry, reference_type):
+                print(f"Table loaded from the cached session in {time.time() - start:.2f}s.")
+                trace.record("setup", time.time() - start, cached=True)
+                return
+            print("Cached session is no longer valid; running the full search setup.")
+            cache.forget(self.base_url, reference_type)
+            self.http.cookies.clear()
+        print("Opening website...")
+        self.open()
+        print(f"Selecting {reference_type} type...")
+        self.select_reference_type(reference_type)
+        self.search()
+        print(f"Table loaded in {time.time() - start:.2f}s.")
+        trace.record("setup", time.time() - start, cached=False)
+        if cache is not None:
+            cookies = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                       for c in self.http.cookies]
+            cache.save(self.base_url, reference_type, cookies, form_fields(self.soup))
+
+    def restore(self, entry, reference_type):
+        """Replay a cached post-search state as a Page$1 postback; True if the grid checks out."""
+        for cookie in entry["cookies"]:
+            self.http.cookies.set(cookie["name"], cookie["value"],
+                                  domain=cookie.get("domain") or "", path=cookie.get("path") or "/")
+        try:
+            # A stale viewstate is often answered with a 500; that means "do the full setup", not "retry"
+            self.postback({"__EVENTTARGET": GRID_TARGET, "__EVENTARGUMENT": "Page$1"}, fields=entry["fields"],
+                          attempts=1)
+        except (requests.RequestException, request_policy.RetryableStatus) as e:
+            print(f"Replaying the cached session failed: {e}")
+            return False
+        return self.current_page() == 1 and results_valid(parse_records(self.html), reference_type)
+
+    def current_page(self):
+        return current_page_number(self.soup)
+
+    def go_to_page_argument(self, argument):
+        """Post a pager argument such as 'Page$7' or 'Page$Next'."""
+        return self.postback({"__EVENTTARGET": GRID_TARGET, "__EVENTARGUMENT": argument})
+
+    def next_page(self):
+        """Move one page forward using whatever link the pager offers."""
+        target = self.current_page() + 1
+        links = pager_links(self.soup)
+        with trace.phase("next_page", engine="http"):
+            if f"Page${target}" in links:
+                self.go_to_page_argument(f"Page${target}")
+            elif "Page$Next" in links:
+                self.go_to_page_argument("Page$Next")
+            else:
+                raise Exception(f"No pager link to page {target}")
+        if self.current_page() != target:
+            raise Exception(f"Expected page {target}, pager shows {self.current_page()}")
+
+    def resolve_report_files(self, link):
+        """Turn one grid download link into DownloadJobs without transferring anything big.
+
+        Replays the row's postback, then takes the direct file links from the
+        download dialog, falling back to the 'Download All' postback itself.
+        The grid page's state is restored afterwards, so the next row (or the
+        next page) is posted from the grid again.
+        """
+        reference, href = link["reference"], link["href"]
+        grid_html, grid_soup = self.html, self.soup
+        try:
+            match = POSTBACK_RE.search(href)
+            if match is None:
+                # A plain URL: either the file itself or a page listing the files
+                url = urljoin(self.url, href)
+
+                def open_link():
+                    # Only a page is read here; a file is left for the download pool
+                    with self.http.get(url, stream=True, timeout=self.timeout) as response:
+                        request_policy.check_status(response).raise_for_status()
+                        if "html" not in response.headers.get("Content-Type", ""):
+                            return None, None
+                        return response.text, response.url
+
+                html, page_url = self.policy.call(open_link, f"Download link of {reference}")
+                if html is None:
+                    return [DownloadJob(reference, url)]
+                self.html = html
+                self.soup = BeautifulSoup(self.html, "html.parser")
+            else:
+                self.postback({"__EVENTTARGET": match.group(1), "__EVENTARGUMENT": match.group(2)})
+                page_url = self.url
+
+            files = dialog_file_links(self.soup, page_url)
+            if files:
+                return [DownloadJob(reference, url, name=None) for url, _ in files]
+            if self.soup.find(id=DOWNLOAD_ALL_BUTTON_ID) is not None:
+                data = form_fields(self.soup)
+                data["__EVENTTARGET"] = ""
+                data["__EVENTARGUMENT"] = ""
+                data.update(control_fields(self.soup, DOWNLOAD_ALL_BUTTON_ID))
+                return [DownloadJob(reference, self.url, data=data)]
+            raise Exception(f"No files found in the download dialog for {reference}")
+        finally:
+            self.html, self.soup = grid_html, grid_soup
+
+    def on_last_page(self):
+        return is_last_page(self.current_page(), pager_links(self.soup))
+
+    def find_last_page(self):
+        """Learn the real number of result pages, then come back to the current page."""
+        start = self.current_page()
+
+        def post(argument):
+            self.postback({"__EVENTTARGET": GRID_TARGET, "__EVENTARGUMENT": argument})
+
+        last, hops = find_last_page(self.current_page, lambda: pager_links(self.soup), post)
+        self.last_page = last
+        print(f"Results end at page {last} (found in {hops} postbacks)")
+        if not self.navigate_to_page(start):
+            raise Exception(f"Could not return to page {start}")
+        return last
+
+    def navigate_to_page(self, target_page):
+        """Navigate to a specific page number"""
+        current_page = self.current_page()
+        print(f"Currently on page {current_page}, navigating to page {target_page}")
+        if current_page == target_page:
+            return True
+
+        position = {"page": current_page, "links": pager_links(self.soup), "fields": None}
+        cached = self.pager_cache.best_start(target_page)
+        # The cache holds a page's pager and form fields, not its rows, so it can only be a
+        # starting point for at least one postback, never the destination itself
+        if cached is not None and cached[0] != target_page and \
+                reach_distance(cached[0], cached[1], target_page) < \
+                reach_distance(current_page, position["links"], target_page):
+            print(f"Starting from cached state of page {cached[0]}")
+            position = {"page": cached[0], "links": cached[1], "fields": cached[2]}
+
+        def post(argument):
+            self.postback({"__EVENTTARGET": GRID_TARGET, "__EVENTARGUMENT": argument},
+                          fields=position["fields"])
+            position.update(page=self.current_page(), links=pager_links(self.soup), fields=None)
+
+        try:
+            with trace.phase("navigate", target=target_page) as timing:
+                hops = jump_to_page(target_page, lambda: position["page"], lambda: position["links"], post,
+                                    last_page=self.last_page)
+                timing.fields["hops"] = hops
+        except Exception as e:
+            print(f"Navigation error: {str(e)}")
+            return False
+        print(f"Reached page {target_page} in {hops} postbacks")
+        return True
+
+
+def extract_page_data(session, page_number, folder="assessment_reports", store=None):
+    """HTTP counterpart of the scraper's extract_page_data."""
+    print(f"Extracting data from page {page_number}...")
+    with trace.phase("parse", page=page_number):
+        page_data = parse_records(session.html)
+    if page_data is None:
+        print("Table not found.")
+        return False
+    with trace.phase("serialize", page=page_number, records=len(page_data)):
+        if store is not None:
+            filepath, content_hash = store.save_page(page_data, page_number)
+        else:
+            filepath, content_hash = save_page_data(page_data, page_number, folder)
+    return filepath, content_hash, len(page_data)
+
+
+def scrape_pages_in_range(session, first_page, last_page, folder="assessment_reports", progress=None,
+                          manifest=None, store=None):
+    """Scrape only the pages within the specified range
+
+    progress(page, error) is called once per page with error=None on success.
+    With a manifest, pages it already has are skipped. With a store, records
+    go to SQLite instead of PAGE_N.json files. last_page None scrapes to the
+    pager's last page.
+    """
+    scrape_range(first_page, last_page,
+                 extract=lambda page: extract_page_data(session, page, folder, store),
+                 next_page=session.next_page,
+                 navigate=session.navigate_to_page,
+                 folder=folder, progress=progress, manifest=manifest,
+                 on_last_page=session.on_last_page, find_last_page=session.find_last_page)
@@ -0,0 +1,166 @@
+"""Incremental crawls: only the reports added (or changed) since the last run.
+
+The results grid lists the newest reports first, so everything new since the
+last run is on the first few pages. KnownReferences remembers every Reference
+seen so far together with a fingerprint of its row. crawl_new() walks the
+grid from page 1 and hands on only the new or changed rows. It stops at the
+first full page that has nothing new: from there on every row is older and
+already known.
+
+The stop rule depends on the newest-first order. crawl_new() checks the Date
+column as it goes (NewestFirst), and if a row is newer than one before it, on
+the same page or an earlier one, the early stop is turned off and the walk
+continues to the last page. The downloader's --incremental uses the same check.
+
+known_references.jsonl is append-only like the run manifest: one line per
+reference whose row is new or changed, and the last line per reference wins.
+"""
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import threading
+
+from nwt import trace
+
+KNOWN_NAME = "known_references.jsonl"
+
+# Columns that describe the report itself; S.No and the download link move with the paging
+FINGERPRINT_KEYS = ("Reference", "Type", "Title", "Company", "Date", "Location")
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%d-%b-%Y", "%b %d, %Y", "%B %d, %Y")
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def fingerprint(record):
+    text = json.dumps([(record.get(key) or "").strip() for key in FINGERPRINT_KEYS])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def parse_date(text):
+    """The grid's Date cell as a date, or None if it isn't in a known format."""
+    text = (text or "").strip()
+    # Also try without a trailing time, e.g. "1/5/2021 12:00:00 AM"
+    for candidate in (text, text.split(" ")[0]):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+class NewestFirst:
+    """Watches the Date column page by page for a row newer than one before it.
+
+    ordered stays True while every date seen is no newer than the one above
+    it; a page whose dates can't all be read doesn't count either way.
+    """
+
+    def __init__(self):
+        self.ordered = True
+        self.oldest = None
+
+    def check(self, page, records):
+        """Take one page's records in grid order; returns ordered."""
+        dates = [parse_date(record.get("Date")) for record in records]
+        if not self.ordered or not dates or not all(dates):
+            return self.ordered
+        if any(later > earlier for earlier, later in zip(dates, dates[1:])):
+            print(f"Page {page} isn't sorted newest-first; this run will read every page.")
+            self.ordered = False
+        elif self.oldest is not None and dates[0] > self.oldest:
+            print(f"Page {page} has reports newer than the page before it; the grid isn't newest-first, "
+                  "so this run will read every page.")
+            self.ordered = False
+        else:
+            self.oldest = dates[-1]
+        return self.ordered
+
+
+class KnownReferences:
+    """References seen by earlier crawls, each with its row fingerprint."""
+
+    def __init__(self, path):
+        self.path = path
+        self.known = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                self.known[event["reference"]] = event["fingerprint"]
+
+    def __len__(self):
+        return len(self.known)
+
+    def __contains__(self, reference):
+        return reference in self.known
+
+    def fresh(self, records):
+        """The records whose Reference is new or whose row has changed."""
+        return [record for record in records
+                if self.known.get(record.get("Reference")) != fingerprint(record)]
+
+    def add(self, records):
+        """Remember records (typically the fresh ones once they are saved)."""
+        lines = []
+        for record in records:
+            reference, digest = record.get("Reference"), fingerprint(record)
+            if reference and self.known.get(reference) != digest:
+                self.known[reference] = digest
+                lines.append(json.dumps({"reference": reference, "fingerprint": digest, "time": now()}) + "\n")
+        if lines:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self.lock, open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+
+def known_references(folder):
+    return KnownReferences(os.path.join(folder, KNOWN_NAME))
+
+
+def crawl_new(read_page, next_page, on_last_page, known, emit, stop_after=1):
+    """Walk the grid from page 1 and emit(page, records) the new or changed rows of each page.
+
+    read_page(page) returns the current page's records (None if the grid is
+    missing), next_page() moves one page on and on_last_page() says whether
+    there is anywhere to go. Stops after stop_after consecutive pages with
+    nothing new. Returns (pages read, rows emitted).
+    """
+    page, quiet, emitted = 1, 0, 0
+    page_size = None
+    order = NewestFirst()
+    while True:
+        records = read_page(page)
+        if records is None:
+            raise Exception(f"Results table not found on page {page}")
+        page_size = page_size or len(records)
+        fresh = known.fresh(records)
+        if fresh:
+            emit(page, fresh)
+            known.add(fresh)
+            emitted += len(fresh)
+        trace.count("page", page=page, records=len(records), fresh=len(fresh))
+        print(f"Page {page}: {len(fresh)} new or changed of {len(records)} rows")
+
+        ordered = order.check(page, records)
+        quiet = quiet + 1 if not fresh and len(records) >= page_size else 0
+        if ordered and quiet >= stop_after:
+            print(f"Page {page} has only known reports; everything after it is older. Stopping.")
+            break
+        if on_last_page():
+            print(f"Page {page} is the last page of results.")
+            break
+        next_page()
+        page += 1
+    return page, emitted
@@ -0,0 +1,154 @@
+"""Parse the grid's Location cell into NTS map sheets and coordinates.
+
+Locations are National Topographic System references ("85I/12", "085I12",
+"NTS 85I/1-4, 85J/8", a whole map area "86B" or series "96"), sometimes
+coordinates ("62°27'N 114°22'W", "62.45 N, 114.37 W", "Lat 62.45 Long
+-114.37"). parse() returns the canonical sheet ids and a bounding box for
+each piece, so a report can be matched to an area without re-reading the text.
+
+Sheet ids are canonical as series + map area + sheet, zero-padded: "085I12",
+"085I" or "085". A prefix of an id is the larger area containing it.
+
+Boxes are (west, south, east, north) in decimal degrees, west longitudes
+negative. NTS geometry: a series is 4 deg of latitude by 8 deg of longitude.
+South of 68 deg N it is split into map areas A-P of 1 x 2 deg, from 68 to 80
+deg N into A-H of 1 x 4 deg. Each map area holds sheets 1-16, four rows of
+four. Letters and sheet numbers snake back and forth from the south-east
+corner: the first row runs east to west, the next one west to east.
+"""
+import re
+
+# Coordinates first, so "62 N" isn't read as series 62, map area N
+DMS = r"(\d{1,3}(?:\.\d+)?)\s*(?:°|deg|d)?\s*(?:(\d{1,2}(?:\.\d+)?)\s*(?:'|′|m)\s*(?:(\d{1,2}(?:\.\d+)?)\s*(?:\"|″|s)\s*)?)?"
+LAT_LON_RE = re.compile(DMS + r"\s*([NS])\b[\s,;/]*" + DMS + r"\s*([EW])\b", re.I)
+LABELLED_RE = re.compile(r"\blat(?:itude)?\.?\s*[:=]?\s*(-?\d{1,2}(?:\.\d+)?)[\s,;]*"
+                         r"\b(?:long?|lng)(?:itude)?\.?\s*[:=]?\s*(-?\d{1,3}(?:\.\d+)?)", re.I)
+# 85I/12, 085I12, 85 I/1-4, 85I/1,2,8, 85I, and "096" on its own after "NTS"
+SHEET_RE = re.compile(r"(?<![\d.])0?(\d{2,3})\s*([A-P])(?![A-Za-z])"
+                      r"(?:\s*/?\s*(\d{1,2})(?![\d.°])"
+                      r"((?:\s*(?:-|,|&|and|to)\s*\d{1,2}(?![\d.°]|\s*[A-P/]))*))?", re.I)
+SERIES_RE = re.compile(r"\bNTS\s*:?\s*0?(\d{2,3})(?![\d.A-Za-z/])", re.I)
+NUMBER_RE = re.compile(r"(-|,|&|and|to)?\s*(\d{1,2})", re.I)
+
+# Rows of a map area or sheet grid, south to north, columns counted from the east
+SNAKE_16 = {i + 1: (i // 4, i % 4 if (i // 4) % 2 == 0 else 3 - i % 4) for i in range(16)}
+SNAKE_8 = {i + 1: (i // 2, i % 2 if (i // 2) % 2 == 0 else 1 - i % 2) for i in range(8)}
+
+
+def series_box(series):
+    """Bounding box of an NTS series (primary quadrangle), or None if the number isn't one."""
+    lon_band, lat_band = divmod(series, 10)
+    if lon_band < 1:
+        return None
+    east = -(48.0 + 8 * lon_band)
+    south = 40.0 + 4 * lat_band
+    return (east - 8, south, east, south + 4)
+
+
+def sheet_box(series, area=None, sheet=None):
+    """Bounding box of a series, map area (letter) or 1:50,000 sheet, or None if there's no such sheet."""
+    box = series_box(series)
+    if box is None or area is None:
+        return box
+    west, south, east, north = box
+    arctic = south >= 68
+    letters = SNAKE_8 if arctic else SNAKE_16
+    number = ord(area.upper()) - ord("A") + 1
+    if number not in letters:
+        return None
+    row, col = letters[number]
+    width = 4.0 if arctic else 2.0
+    east, south = east - col * width, south + row
+    if sheet is None:
+        return (east - width, south, east, south + 1)
+    if sheet not in SNAKE_16:
+        return None
+    row, col = SNAKE_16[sheet]
+    east, south = east - col * width / 4, south + row / 4
+    return (east - width / 4, south, east, south + 0.25)
+
+
+def sheet_id(series, area=None, sheet=None):
+    return f"{series:03d}" + (area.upper() if area else "") + (f"{sheet:02d}" if area and sheet else "")
+
+
+def split_sheet(text):
+    """(series, area, sheet) of any spelling of one sheet id ("85I/12", "085I12", "85I", "96"); None if invalid."""
+    text = text.strip()
+    match = re.fullmatch(r"0?(\d{2,3})\s*(?:([A-Pa-p])\s*(?:/?\s*(\d{1,2}))?)?", text)
+    if not match:
+        return None
+    series, area, sheet = int(match.group(1)), match.group(2), match.group(3)
+    sheet = int(sheet) if sheet else None
+    if series_box(series) is None:
+        return None
+    if area and sheet_box(series, area, sheet) is None:
+        return None
+    return series, area.upper() if area else None, sheet
+
+
+def _degrees(degrees, minutes, seconds):
+    return float(degrees) + float(minutes or 0) / 60 + float(seconds or 0) / 3600
+
+
+def _numbers(first, rest):
+    """Sheet numbers from "1" plus its continuation, e.g. "-4" or ", 8 & 9"."""
+    numbers, previous = [first], first
+    for separator, number in NUMBER_RE.findall(rest or ""):
+        number = int(number)
+        if separator.lower() in ("-", "to") and previous < number:
+            numbers.extend(range(previous + 1, number + 1))
+        else:
+            numbers.append(number)
+        previous = number
+    return numbers
+
+
+def parse(text):
+    """Parse a Location cell. Returns [(sheet id, or None for a point; box)], one per sheet or point found."""
+    text = text or ""
+    parts = []
+
+    def point(lat, lon):
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            parts.append((None, (lon, lat, lon, lat)))
+
+    for match in LAT_LON_RE.finditer(text):
+        lat = _degrees(*match.group(1, 2, 3)) * (-1 if match.group(4).upper() == "S" else 1)
+        lon = _degrees(*match.group(5, 6, 7)) * (-1 if match.group(8).upper() == "W" else 1)
+        point(lat, lon)
+    for match in LABELLED_RE.finditer(text):
+        lat, lon = float(match.group(1)), float(match.group(2))
+        # The NWT is all west of Greenwich; a positive longitude there means "W"
+        point(lat, -abs(lon))
+    rest = LABELLED_RE.sub(" ", LAT_LON_RE.sub(" ", text))
+
+    seen = set()
+    for match in SHEET_RE.finditer(rest):
+        series, area = int(match.group(1)), match.group(2).upper()
+        sheets = _numbers(int(match.group(3)), match.group(4)) if match.group(3) else [None]
+        for sheet in sheets:
+            box = sheet_box(series, area, sheet)
+            if box is None and sheet is not None:
+                # "85I 1990" and the like: keep the map area, drop the bogus sheet number
+                sheet, box = None, sheet_box(series, area)
+            if box is not None and sheet_id(series, area, sheet) not in seen:
+                seen.add(sheet_id(series, area, sheet))
+                parts.append((sheet_id(series, area, sheet), box))
+    for match in SERIES_RE.finditer(rest):
+        series = int(match.group(1))
+        box = series_box(series)
+        if box is not None and sheet_id(series) not in seen:
+            seen.add(sheet_id(series))
+            parts.append((sheet_id(series), box))
+    return parts
+
+
+def intersects(a, b):
+    """Whether two boxes overlap. Boxes that only share an edge don't; a point on an edge does."""
+    for lo1, hi1, lo2, hi2 in ((a[0], a[2], b[0], b[2]), (a[1], a[3], b[1], b[3])):
+        if lo1 > hi2 or lo2 > hi1:
+            return False
+        if min(hi1, hi2) == max(lo1, lo2) and lo1 != hi1 and lo2 != hi2:
+            return False
+    return True
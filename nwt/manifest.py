@@ -0,0 +1,105 @@
+"""Run manifest so an interrupted scrape or download can pick up where it stopped.
+
+The manifest is an append-only JSONL log next to the output: one line per
+page or row status change, with a timestamp and (for pages) a content hash.
+Loading replays the log, so the latest line for a page/row wins. Appending a
+single short line per event is cheap, never rewrites earlier progress, and is
+safe with several shard workers writing to the same file.
+"""
+from datetime import datetime, timezone
+import json
+import os
+import threading
+
+MANIFEST_NAME = "run_manifest.jsonl"
+
+DONE = "done"
+FAILED = "failed"
+STARTED = "started"
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunManifest:
+    """Page and row status for one output folder."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.rows = {}
+        # Download workers report rows from their own threads
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash; everything before it is still good
+                    continue
+                if event.get("kind") == "page":
+                    self.pages[event["page"]] = event
+                elif event.get("kind") == "row":
+                    self.rows[event["reference"]] = event
+
+    def _append(self, event):
+        event["time"] = now()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        return event
+
+    def mark_page(self, page, status, path=None, content_hash=None, records=None, error=None):
+        event = {"kind": "page", "page": page, "status": status}
+        for key, value in (("path", path), ("sha256", content_hash), ("records", records), ("error", error)):
+            if value is not None:
+                event[key] = value
+        self.pages[page] = self._append(event)
+
+    def mark_row(self, page, row, reference, status, error=None):
+        event = {"kind": "row", "page": page, "row": row, "reference": reference, "status": status}
+        if error is not None:
+            event["error"] = error
+        # Keyed by Reference: page boundaries move when the site adds reports
+        self.rows[reference] = self._append(event)
+
+    def page_done(self, page):
+        """True if the page finished and its output file (if any) is still there."""
+        event = self.pages.get(page)
+        if not event or event["status"] != DONE:
+            return False
+        return "path" not in event or os.path.exists(event["path"])
+
+    def row_done(self, reference):
+        event = self.rows.get(reference)
+        return bool(event) and event["status"] == DONE
+
+    def next_incomplete_page(self, first_page, last_page=None):
+        """First page in first_page..last_page (no end if None) that still needs work, or None."""
+        page = first_page
+        while last_page is None or page <= last_page:
+            if not self.page_done(page):
+                return page
+            page += 1
+        return None
+
+    def summary(self, first_page, last_page=None):
+        if last_page is None:
+            done = sum(1 for page in self.pages if page >= first_page and self.page_done(page))
+            return f"{done} pages from page {first_page} on already complete"
+        done = sum(1 for page in range(first_page, last_page + 1) if self.page_done(page))
+        return f"{done}/{last_page - first_page + 1} pages already complete"
+
+
+def open_manifest(folder, fresh=False):
+    """Open the run manifest in `folder`; fresh=True sets the old one aside as .prev first."""
+    path = os.path.join(folder, MANIFEST_NAME)
+    if fresh and os.path.exists(path):
+        os.replace(path, path + ".prev")
+        print(f"Previous manifest kept as {path}.prev")
+    return RunManifest(path)
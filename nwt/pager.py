@@ -0,0 +1,153 @@
+"""Pager-aware navigation for the gvReferences GridView.
+
+The pager row only links a window of pages (plus '...' links to the next and
+previous windows, and First/Last/Next/Prev where the site renders them).
+Instead of clicking Page$Next once per page, jump_to_page always follows the
+visible link closest to the target, so reaching page N costs one postback per
+pager window rather than one per page.
+"""
+import re
+
+POSTBACK_RE = re.compile(r"__doPostBack\('([^']*)','([^']*)'\)")
+
+
+def links_from_hrefs(hrefs, target="ctl00$MainContent$gvReferences"):
+    """Map pager arguments ('Page$12', 'Page$Next', ...) found in hrefs to themselves."""
+    links = {}
+    for href in hrefs:
+        match = POSTBACK_RE.search(href or "")
+        if match and match.group(1) == target and match.group(2).startswith("Page$"):
+            links[match.group(2)] = match.group(2)
+    return links
+
+
+def link_page_number(argument, current_page, last_page=None):
+    """Return the page a pager argument leads to, or None if it can't be known."""
+    value = argument.split("$", 1)[1]
+    if value.isdigit():
+        return int(value)
+    if value == "First":
+        return 1
+    if value == "Next":
+        return current_page + 1
+    if value == "Prev":
+        return current_page - 1
+    if value == "Last":
+        return last_page
+    return None
+
+
+def choose_hop(current_page, target_page, links, last_page=None):
+    """Pick the pager argument that lands closest to target_page.
+
+    Only links that get strictly closer than the current page are considered;
+    on a tie the link that does not overshoot wins. Unless last_page is known,
+    Page$Last is only used as a last resort.
+    Returns None if no link makes progress.
+    """
+    best = None
+    best_key = None
+    for argument in links:
+        page = link_page_number(argument, current_page, last_page)
+        if page is None:
+            continue
+        distance = abs(target_page - page)
+        if distance >= abs(target_page - current_page):
+            continue
+        key = (distance, page > target_page)
+        if best_key is None or key < best_key:
+            best, best_key = argument, key
+    if best is None and target_page > current_page and "Page$Last" in links:
+        return "Page$Last"
+    return best
+
+
+def reach_distance(page, links, target_page):
+    """How far from target_page one could get from `page` with a single postback."""
+    distance = abs(target_page - page)
+    for argument in links:
+        linked = link_page_number(argument, page)
+        if linked is not None:
+            distance = min(distance, abs(target_page - linked) + 1)
+    return distance
+
+
+def is_last_page(current_page, links):
+    """True when the pager offers nothing past current_page."""
+    return not any(a in links for a in ("Page$Next", "Page$Last", f"Page${current_page + 1}"))
+
+
+def find_last_page(current_page_fn, links_fn, post_fn, max_hops=1000):
+    """Walk forward to the final page and return (its number, postbacks used).
+
+    Takes Page$Last when the pager has it (one postback), otherwise the
+    furthest forward link on each window.
+    """
+    hops = 0
+    while True:
+        current_page = current_page_fn()
+        links = links_fn()
+        if is_last_page(current_page, links):
+            return current_page, hops
+        if hops >= max_hops:
+            raise Exception(f"Gave up looking for the last page after {hops} postbacks")
+        if "Page$Last" in links:
+            argument = "Page$Last"
+        else:
+            ahead = [a for a in links if (link_page_number(a, current_page) or 0) > current_page]
+            argument = max(ahead, key=lambda a: link_page_number(a, current_page))
+        post_fn(argument)
+        hops += 1
+
+
+def jump_to_page(target_page, current_page_fn, links_fn, post_fn, max_hops=1000, last_page=None):
+    """Follow the nearest pager link until target_page is current.
+
+    current_page_fn() returns the current page number, links_fn() the pager
+    links of the current page and post_fn(argument) performs the postback.
+    last_page, when known, lets targets near the end start from Page$Last.
+    Returns the number of postbacks used; raises if the target can't be reached.
+    """
+    hops = 0
+    visited = set()
+    while True:
+        current_page = current_page_fn()
+        if current_page == target_page:
+            return hops
+        if hops >= max_hops:
+            raise Exception(f"Gave up reaching page {target_page} after {hops} postbacks")
+        argument = choose_hop(current_page, target_page, links_fn(), last_page)
+        if argument is None or (current_page, argument) in visited:
+            raise Exception(f"No pager link from page {current_page} towards page {target_page}")
+        visited.add((current_page, argument))
+        post_fn(argument)
+        hops += 1
+
+
+class PagerCache:
+    """Remember the pager links (and any reusable state) seen for each page.
+
+    The HTTP engine stores each page's form fields here: replaying a postback
+    from a cached viewstate lets a later jump start from whichever visited page
+    links closest to its target instead of from the current page.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def remember(self, page, links, state=None):
+        self.entries.pop(page, None)
+        self.entries[page] = (links, state)
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def best_start(self, target_page):
+        """Return (page, links, state) of the cached page closest to target_page, or None."""
+        best = None
+        best_distance = None
+        for page, (links, state) in self.entries.items():
+            distance = reach_distance(page, links, target_page)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = (page, links, state), distance
+        return best
@@ -0,0 +1,190 @@
+"""Turn a rendered ReferenceSearch.aspx page into PAGE_N.json records.
+
+Two parser backends produce the same rows:
+
+- "lxml" (default when lxml is installed) slices the gvReferences table out of
+  the page text first, so the viewstate blobs are never parsed, then walks it
+  with lxml.
+- "bs4" is the original BeautifulSoup/html.parser implementation, kept as the
+  reference that the fast backend is checked against
+  (benchmarks/bench_parse.py).
+"""
+from bs4 import BeautifulSoup
+import hashlib
+import json
+import os
+import re
+
+from nwt.common import BASE_URL, GRID_ID
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+TABLE_TAG_RE = re.compile(r"<(/?)table\b[^>]*>", re.IGNORECASE)
+GRID_ID_RE = re.compile(r"""id\s*=\s*["']%s["']""" % GRID_ID)
+
+
+def bs4_rows(html):
+    """Reference backend: filtered (cell texts, Location href) rows, header included."""
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", id=GRID_ID)
+
+    if not table:
+        return None
+    return _bs4_iter_rows(table)
+
+
+def _bs4_iter_rows(table):
+    # Get all rows
+    rows = table.find_all("tr")
+
+    # Apply more comprehensive filtering for pagination rows
+    filtered_rows = []
+    for row in rows:
+        # Skip rows with class 'pgr'
+        if 'pgr' in row.get('class', []):
+            continue
+        # Skip rows containing pagination links
+        if row.find('a', href=lambda x: x and 'Page$' in x):
+            continue
+        # Skip rows containing page number spans
+        if row.find('span') and row.find('span').text.strip().isdigit():
+            continue
+        filtered_rows.append(row)
+
+    for row in filtered_rows:
+        cols = row.find_all("td")
+        link = cols[5].find("a") if len(cols) >= 6 else None
+        yield [col.text for col in cols], link["href"] if link else None
+
+
+def grid_table_html(html):
+    """Slice the gvReferences <table>...</table> (nested pager table included) out of the page."""
+    marker = GRID_ID_RE.search(html)
+    if marker is None:
+        return None
+    start = html.rfind("<table", 0, marker.start())
+    if start < 0:
+        return None
+    depth = 0
+    for tag in TABLE_TAG_RE.finditer(html, start):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[start:tag.end()]
+    return html[start:]
+
+
+def lxml_rows(html):
+    """Fast backend: same rows as bs4_rows, parsing only the grid table."""
+    fragment = grid_table_html(html)
+    if fragment is None:
+        return None
+    return _lxml_iter_rows(lxml.html.fragment_fromstring(fragment))
+
+
+def _lxml_iter_rows(table):
+    for row in table.iter("tr"):
+        if 'pgr' in (row.get("class") or "").split():
+            continue
+        if any('Page$' in (a.get("href") or "") for a in row.iter("a")):
+            continue
+        span = next(row.iter("span"), None)
+        if span is not None and span.text_content().strip().isdigit():
+            continue
+        cols = list(row.iter("td"))
+        link = next(cols[5].iter("a"), None) if len(cols) >= 6 else None
+        yield [col.text_content() for col in cols], link.get("href") if link is not None else None
+
+
+BACKENDS = {"bs4": bs4_rows}
+if lxml is not None:
+    BACKENDS["lxml"] = lxml_rows
+DEFAULT_BACKEND = "lxml" if lxml is not None else "bs4"
+
+
+def set_default_backend(name):
+    """Choose the parser backend used when none is passed explicitly."""
+    global DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise Exception(f"Parser backend {name} is not available (have: {', '.join(BACKENDS)})")
+    DEFAULT_BACKEND = name
+
+
+def skip_header(rows):
+    """Drop the first row if there is more than one, without materialising the rows."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    second = next(rows, None)
+    if second is None:
+        yield first
+        return
+    yield second
+    yield from rows
+
+
+def grid_rows(html, backend=None):
+    """Data rows of the results grid as (cell texts, Location href), or None if it's missing."""
+    rows = BACKENDS[backend or DEFAULT_BACKEND](html)
+    if rows is None:
+        return None
+    return skip_header(rows)
+
+
+def parse_records(html, backend=None):
+    """Return the record dicts for the results grid, or None if the grid is missing."""
+    rows = grid_rows(html, backend)
+    if rows is None:
+        return None
+    return build_records(rows)
+
+
+def records_from_grid_rows(grid_rows):
+    """Build records from nwt.dom.grid_rows output instead of the page HTML."""
+    if grid_rows is None:
+        return None
+    return build_records([(row["cells"], row["location_href"]) for row in grid_rows])
+
+
+def build_records(rows):
+    """Turn filtered (cell texts, Location href) rows into PAGE_N.json records."""
+    return list(iter_records(rows))
+
+
+def iter_records(rows):
+    """Yield PAGE_N.json records for filtered, header-less rows."""
+    for idx, (cols, href) in enumerate(rows, start=1):
+        if len(cols) >= 6:
+            download_link = None
+            if href is not None:
+                download_link = BASE_URL + " " + href
+
+            # NOTE: S.No starts at -1 (idx-2) - existing PAGE_N.json files depend on it,
+            # and benchmarks/bench_parse.py pins it so any change is deliberate
+            yield {
+                "S.No": idx-2,
+                "Reference": cols[0].strip(),
+                "Type": cols[1].strip(),
+                "Title": cols[2].strip(),
+                "Company": cols[3].strip(),
+                "Date": cols[4].strip(),
+                "Location": cols[5].strip(),
+                "Download Link": download_link
+            }
+
+
+def save_page_data(page_data, page_number, folder="assessment_reports"):
+    """Write one page of records to PAGE_N.json and return (file path, sha256 of its content)."""
+    filename = f"PAGE_{page_number}.json"
+    filepath = os.path.join(folder, filename)
+    text = json.dumps(page_data, indent=2)
+    # Write to a temp file first so a crashed worker never leaves a half-written page
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, filepath)
+    print(f"Saved {len(page_data)} records to {filepath}")
+    return filepath, hashlib.sha256(text.encode("utf-8")).hexdigest()
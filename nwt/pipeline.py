@@ -0,0 +1,122 @@
+"""Producer/consumer download pipeline.
+
+The page walker (producer) resolves each row's files and submits them; a pool
+of worker threads (consumers) drains a bounded queue and streams the files to
+disk with a Downloader. Paging on no longer waits for the current page's
+files, so total time approaches the longest transfer rather than the sum of
+all of them. The queue is bounded: when the workers fall behind, submit()
+blocks and the crawler stops running ahead of the transfers.
+"""
+import os
+import queue
+import threading
+import time
+
+from nwt import trace
+
+_STOP = object()
+
+
+class DownloadPipeline:
+    """Bounded job queue drained by a pool of download workers."""
+
+    def __init__(self, downloader, dest_dir, workers=None, max_queue=None):
+        """dest_dir is a folder, or a function of the job returning one."""
+        self.downloader = downloader
+        self.dest_dir = dest_dir
+        self.workers = workers or downloader.max_workers
+        # Room for one job per worker waiting behind the ones in flight
+        self.jobs = queue.Queue(maxsize=max_queue or 2 * self.workers)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        self.blocked = 0.0
+        self.start = time.time()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"download-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job, on_done=None):
+        """Queue a job; blocks while the queue is full.
+
+        on_done(job, result, error) runs on the worker thread when the job ends;
+        result is Downloader.fetch()'s (path, bytes, sha256), or None on error.
+        """
+        waited = time.time()
+        self.jobs.put((job, on_done))
+        with self.lock:
+            self.blocked += time.time() - waited
+
+    def _work(self):
+        while True:
+            item = self.jobs.get()
+            if item is _STOP:
+                self.jobs.task_done()
+                return
+            job, on_done = item
+            with self.lock:
+                self.in_flight += 1
+            result, error = None, None
+            started = time.perf_counter()
+            try:
+                result = self.downloader.fetch(job, self.dest_dir(job) if callable(self.dest_dir) else self.dest_dir)
+                size = result[1]
+                print(f"Downloaded {os.path.basename(result[0])} for {job.reference} ({size / 1e6:.1f} MB)")
+            except Exception as e:
+                size, error = 0, str(e)
+                print(f"Failed {job.reference}: {e}")
+            trace.record("transfer", time.perf_counter() - started, bytes=size, reference=job.reference,
+                         engine="http", **({"error": error} if error else {}))
+            with self.lock:
+                self.in_flight -= 1
+                self.bytes += size
+                if error:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            if on_done:
+                try:
+                    on_done(job, result, error)
+                except Exception as e:
+                    print(f"Callback for {job.reference} failed: {e}")
+            self.jobs.task_done()
+
+    def metrics(self):
+        """Snapshot of queue depth, in-flight and finished jobs, and throughput."""
+        with self.lock:
+            elapsed = max(time.time() - self.start, 1e-6)
+            return {
+                "queued": self.jobs.qsize(),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "mb": self.bytes / 1e6,
+                "mb_per_s": self.bytes / 1e6 / elapsed,
+                "producer_blocked_s": self.blocked,
+            }
+
+    def report(self):
+        m = self.metrics()
+        print(f"[downloads] queued {m['queued']}, in flight {m['in_flight']}, "
+              f"done {m['completed']}, failed {m['failed']}, "
+              f"{m['mb']:.1f} MB at {m['mb_per_s']:.2f} MB/s, "
+              f"crawler blocked {m['producer_blocked_s']:.1f}s")
+
+    def close(self):
+        """Wait for every queued job to finish, then stop the workers."""
+        for _ in self.threads:
+            self.jobs.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,244 @@
+"""Shared request policy: adaptive rate limit, classified retries and a circuit breaker.
+
+Every request to the site (a Chrome postback, an HTTP postback, the start of
+a file transfer) goes through one Policy per run:
+
+- A token bucket paces requests. Its rate adapts like TCP congestion control:
+  it creeps up while the smoothed latency stays near the best seen, is cut
+  by 30% when latency doubles, and halved on a server error. Throughput
+  settles at the highest rate the site handles without slowing down.
+- Failures are classified. Server trouble (5xx/429, resets, timeouts) is
+  retried with exponential backoff and full jitter and counts against the
+  site. Browser hiccups (stale elements and the like) are retried without
+  counting. Anything else (a 404, a bug) is raised at once.
+- After several server errors in a row, the circuit breaker opens and every
+  worker waits out a cooldown before the next request. The cooldown doubles
+  each time the first request after it fails too.
+
+The state lives in a multiprocessing.Array, so the threads of the download
+pool and the shard worker processes (see install()) share one budget.
+metrics() and report() expose the current state.
+"""
+import multiprocessing
+import random
+import time
+
+import requests
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+SERVER = "server"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# Selenium exceptions by name, so this module doesn't need selenium. A timeout
+# waiting for the page is the server being slow; the rest are browser-side.
+BROWSER_SLOW = {"TimeoutException"}
+BROWSER_TRANSIENT = {"StaleElementReferenceException", "NoSuchElementException",
+                     "ElementClickInterceptedException", "ElementNotInteractableException",
+                     "WebDriverException"}
+
+# Slots of the shared state array
+(RATE, MIN_RATE, MAX_RATE, TOKENS, UPDATED, LATENCY, BASELINE, ADJUSTED, FAILURES, OPEN_UNTIL,
+ COOLDOWN, REQUESTS, ERRORS, RETRIES, TRIPS, WAITED) = range(16)
+FIELDS = 16
+
+
+class RetryableStatus(Exception):
+    """An HTTP status worth retrying (429 or a 5xx)."""
+
+
+def check_status(response):
+    """Raise RetryableStatus for a status the policy retries; return the response otherwise."""
+    if response.status_code in RETRY_STATUS:
+        raise RetryableStatus(f"HTTP {response.status_code}")
+    return response
+
+
+def classify(error):
+    """SERVER, TRANSIENT or FATAL for an exception raised while talking to the site."""
+    if isinstance(error, RetryableStatus):
+        return SERVER
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return SERVER if status is None or status in RETRY_STATUS else FATAL
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return SERVER
+    if isinstance(error, requests.RequestException):
+        return FATAL
+    name = type(error).__name__
+    if name in BROWSER_SLOW:
+        return SERVER
+    if name in BROWSER_TRANSIENT:
+        return TRANSIENT
+    if isinstance(error, (TypeError, AttributeError, KeyError, IndexError, NameError, ValueError, OSError)):
+        return FATAL
+    # Our own "page didn't change"/"table not found" errors: worth another try
+    return TRANSIENT
+
+
+class Policy:
+    """Rate limiter, retry policy and circuit breaker over one shared state array."""
+
+    failure_threshold = 5
+    cooldown = 30.0
+    max_cooldown = 300.0
+    base_backoff = 1.0
+    max_backoff = 30.0
+    attempts = 5
+
+    def __init__(self, rate=4.0, max_rate=16.0, min_rate=0.2, state=None):
+        if state is None:
+            state = multiprocessing.Array("d", FIELDS)
+            state[RATE], state[MIN_RATE], state[MAX_RATE] = rate, min(min_rate, rate), max(max_rate, rate)
+            state[TOKENS], state[UPDATED] = 1.0, time.time()
+        self.state = state
+
+    def acquire(self):
+        """Block while the breaker is open, then until a token is free."""
+        started = time.time()
+        while True:
+            with self.state.get_lock():
+                s = self.state
+                now = time.time()
+                if s[OPEN_UNTIL] > now:
+                    delay = s[OPEN_UNTIL] - now
+                else:
+                    burst = max(1.0, s[RATE])
+                    s[TOKENS] = min(burst, s[TOKENS] + (now - s[UPDATED]) * s[RATE])
+                    s[UPDATED] = now
+                    if s[TOKENS] >= 1.0:
+                        s[TOKENS] -= 1.0
+                        s[REQUESTS] += 1
+                        s[WAITED] += now - started
+                        return
+                    delay = (1.0 - s[TOKENS]) / s[RATE]
+            time.sleep(min(delay, 1.0))
+
+    def observe(self, seconds=None, ok=True):
+        """Feed back one request's outcome: its latency on success, or ok=False for a server error."""
+        with self.state.get_lock():
+            s = self.state
+            now = time.time()
+            if ok:
+                s[FAILURES] = 0
+                s[COOLDOWN] = 0.0
+                if seconds is None:
+                    return
+                s[LATENCY] = seconds if not s[LATENCY] else 0.8 * s[LATENCY] + 0.2 * seconds
+                # The baseline follows new lows at once and drifts up slowly, so a server
+                # that is slower for good gets a new normal instead of being throttled forever
+                if not s[BASELINE] or s[LATENCY] < s[BASELINE]:
+                    s[BASELINE] = s[LATENCY]
+                else:
+                    s[BASELINE] += 0.005 * (s[LATENCY] - s[BASELINE])
+                if now - s[ADJUSTED] >= 1.0:
+                    if s[LATENCY] > 2 * s[BASELINE]:
+                        s[RATE] = max(s[MIN_RATE], s[RATE] * 0.7)
+                    else:
+                        s[RATE] = min(s[MAX_RATE], s[RATE] + 0.25)
+                    s[ADJUSTED] = now
+                return
+            s[ERRORS] += 1
+            s[FAILURES] += 1
+            if now - s[ADJUSTED] >= 1.0:
+                s[RATE] = max(s[MIN_RATE], s[RATE] * 0.5)
+                s[ADJUSTED] = now
+            # Right after a cooldown one more failure is enough to re-open
+            if s[OPEN_UNTIL] <= now and (s[FAILURES] >= self.failure_threshold or s[COOLDOWN]):
+                s[COOLDOWN] = min(self.max_cooldown, s[COOLDOWN] * 2 or self.cooldown)
+                s[OPEN_UNTIL] = now + s[COOLDOWN]
+                s[TRIPS] += 1
+                s[FAILURES] = 0
+                print(f"[policy] server errors keep coming; pausing all requests for {s[COOLDOWN]:.0f}s")
+
+    def share(self, workers):
+        """Raise the rate for `workers` parallel workers, up to max_rate.
+
+        --rate is what one worker starts at. Without this, N workers would
+        split that budget and wait on the limiter until the rate had crept up.
+        Latency and errors still cut the rate back from there.
+        """
+        with self.state.get_lock():
+            s = self.state
+            s[RATE] = min(s[MAX_RATE], s[RATE] * max(1, workers))
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter for the given retry (0-based); counts the retry."""
+        with self.state.get_lock():
+            self.state[RETRIES] += 1
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def retry(self, action, what, attempts=None):
+        """Run action(), retrying server and transient failures; fatal ones are raised at once."""
+        attempts = attempts or self.attempts
+        for attempt in range(attempts):
+            try:
+                return action()
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL or attempt == attempts - 1:
+                    raise
+                if kind == SERVER:
+                    self.observe(ok=False)
+                delay = self.backoff(attempt)
+                print(f"{what} failed ({e}); retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1})")
+                time.sleep(delay)
+
+    def call(self, request, what, attempts=None):
+        """request() under the full policy: a token per attempt, latency observed, retries."""
+        def attempt():
+            self.acquire()
+            start = time.time()
+            result = request()
+            self.observe(time.time() - start)
+            return result
+        return self.retry(attempt, what, attempts)
+
+    def metrics(self):
+        with self.state.get_lock():
+            s = list(self.state)
+        now = time.time()
+        return {
+            "rate": s[RATE],
+            "max_rate": s[MAX_RATE],
+            "latency_ms": s[LATENCY] * 1000,
+            "baseline_ms": s[BASELINE] * 1000,
+            "requests": int(s[REQUESTS]),
+            "errors": int(s[ERRORS]),
+            "retries": int(s[RETRIES]),
+            "breaker": "open" if s[OPEN_UNTIL] > now else "closed",
+            "breaker_trips": int(s[TRIPS]),
+            "waited_s": s[WAITED],
+        }
+
+    def report(self):
+        m = self.metrics()
+        print(f"[policy] {m['rate']:.1f} req/s (max {m['max_rate']:.0f}), latency {m['latency_ms']:.0f} ms "
+              f"(baseline {m['baseline_ms']:.0f} ms), {m['requests']} requests, {m['errors']} server errors, "
+              f"{m['retries']} retries, breaker {m['breaker']} ({m['breaker_trips']} trips), "
+              f"{m['waited_s']:.1f}s spent waiting for the limiter")
+
+
+_shared = None
+
+
+def shared():
+    """This process's Policy, created with the defaults on first use."""
+    global _shared
+    if _shared is None:
+        _shared = Policy()
+    return _shared
+
+
+def configure(rate=4.0, max_rate=16.0):
+    """Start this run's Policy at `rate` requests/s, allowed to grow to max_rate."""
+    global _shared
+    _shared = Policy(rate, max_rate)
+    return _shared
+
+
+def install(state):
+    """ProcessPoolExecutor initializer: make a worker share its parent's policy state."""
+    global _shared
+    _shared = Policy(state=state)
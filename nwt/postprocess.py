@@ -0,0 +1,358 @@
+"""Post-download processing: verify, unzip and extract text as each file lands.
+
+PostProcessor takes files from the DownloadStore the moment they are stored
+and hands them to a pool of worker processes, so unpacking and text
+extraction overlap with the crawl instead of running as a serial pass after
+it. Each worker:
+
+- verifies the file: its SHA-256 against the store index, a PDF's header and
+  trailer, and every ZIP member's CRC;
+- stream-extracts a ZIP into <Reference>/<zip name>/, one member at a time in
+  1 MB chunks, so an archive is never held in memory;
+- extracts each PDF's page count and text into a .txt next to it with pypdf.
+  Without pypdf, PDFs are only verified and the catalog notes the skip.
+
+Workers are spawned rather than forked (the download threads are already
+running), and each one's address space is capped at memory_mb where the
+platform allows it. At most two files per worker are handed to the pool at a
+time; the rest wait as (reference, name) pairs.
+
+Results go to catalog.jsonl in the store root, one line per processed file.
+A file whose (reference, name, sha256) is already catalogued is skipped, so
+an interrupted run picks up where it stopped, and catch_up() queues whatever
+the store has that the catalog doesn't.
+
+    python -m nwt.postprocess run downloaded_reports --workers 4
+    python -m nwt.postprocess show downloaded_reports 090000
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+
+from nwt import trace
+from nwt.fetch import CHUNK_SIZE, hash_file, safe_name
+
+try:
+    import resource
+except ImportError:
+    # Not on Windows; workers run without a memory cap there
+    resource = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+CATALOG_NAME = "catalog.jsonl"
+
+# Limits on what one ZIP may unpack to, against archive bombs
+MAX_UNZIP_BYTES = 50 * 10 ** 9
+MAX_RATIO = 200
+# How far into a PDF the header may start, and how close to the end the trailer must be
+HEADER_BYTES = 1024
+TRAILER_BYTES = 2048
+NO_PYPDF = "text not extracted: pypdf is not installed"
+
+_STOP = object()
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Catalog:
+    """Append-only JSONL of processed files; the last line per (reference, name) wins."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[(entry["reference"], entry["name"])] = entry
+
+    def done(self, reference, name, sha256):
+        entry = self.entries.get((reference, name))
+        return entry is not None and entry.get("sha256") == sha256
+
+    def add(self, entry):
+        entry["time"] = now()
+        with self.lock:
+            self.entries[(entry["reference"], entry["name"])] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def reference(self, reference):
+        """Every catalogued file of one report."""
+        return [entry for (ref, _), entry in sorted(self.entries.items()) if ref == reference]
+
+
+def catalog(root):
+    return Catalog(os.path.join(root, CATALOG_NAME))
+
+
+def limit_memory(memory_mb):
+    """Worker initializer: cap the process's address space so one bad file can't exhaust RAM."""
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 2 ** 20
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    except (ValueError, OSError):
+        pass
+
+
+# --- PDF -------------------------------------------------------------------
+
+def check_pdf(path):
+    """Check a PDF's header and startxref/%%EOF trailer, reading only the two ends of the file."""
+    size = os.path.getsize(path)
+    if size == 0:
+        raise ValueError("empty file")
+    with open(path, "rb") as f:
+        head = f.read(HEADER_BYTES)
+        f.seek(max(0, size - TRAILER_BYTES))
+        tail = f.read()
+    if not head.lstrip().startswith(b"%PDF-"):
+        raise ValueError("not a PDF (no %PDF- header)")
+    if b"%%EOF" not in tail or b"startxref" not in tail:
+        raise ValueError("truncated PDF (no startxref/%%EOF trailer)")
+
+
+def pdf_text(path, out_path):
+    """Write the PDF's text to out_path with pypdf; returns (pages, characters)."""
+    chars = 0
+    # An open file lets pypdf seek to the objects it needs instead of reading the whole PDF
+    with open(path, "rb") as f, open(out_path, "w", encoding="utf-8") as out:
+        reader = PdfReader(f)
+        for page in reader.pages:
+            text = page.extract_text() or ""
+            out.write(text + "\n\f")
+            chars += len(text)
+        return len(reader.pages), chars
+
+
+def process_pdf(path):
+    """Verify one PDF and extract its text; returns its catalog fields."""
+    check_pdf(path)
+    if PdfReader is None:
+        return {"pages": None, "text": None, "skipped": NO_PYPDF}
+    text_path = path + ".txt"
+    pages, chars = pdf_text(path, text_path)
+    return {"pages": pages, "chars": chars, "text": text_path}
+
+
+# --- ZIP -------------------------------------------------------------------
+
+def member_path(dest, name):
+    """Where a ZIP member goes under dest, with every path part sanitized (no ../ escapes)."""
+    parts = [safe_name(part) for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return os.path.join(dest, *parts) if parts else None
+
+
+def process_zip(path):
+    """Check and stream-extract a ZIP, extracting text from the PDFs inside."""
+    dest = os.path.splitext(path)[0]
+    members, total = [], 0
+    with zipfile.ZipFile(path) as archive:
+        infos = [info for info in archive.infolist() if not info.is_dir()]
+        declared = sum(info.file_size for info in infos)
+        packed = sum(info.compress_size for info in infos) or 1
+        if declared > MAX_UNZIP_BYTES or declared / packed > MAX_RATIO:
+            raise ValueError(f"refusing to unpack {declared / 1e9:.1f} GB from {packed / 1e6:.1f} MB")
+        for info in infos:
+            target = member_path(dest, info.filename)
+            if target is None:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # ZipExtFile checks the CRC when the member has been read to the end
+            with archive.open(info) as source, open(target, "wb") as out:
+                shutil.copyfileobj(source, out, CHUNK_SIZE)
+            total += info.file_size
+            member = {"name": os.path.relpath(target, os.path.dirname(path)), "size": info.file_size}
+            if target.lower().endswith(".pdf"):
+                try:
+                    member.update(process_pdf(target))
+                    if member["text"]:
+                        member["text"] = os.path.relpath(member["text"], os.path.dirname(path))
+                except Exception as e:
+                    member["error"] = str(e)
+            members.append(member)
+    return {"members": members, "unpacked": total}
+
+
+def process_file(root, reference, name, sha256):
+    """Worker: verify and process one stored file. Returns its catalog entry."""
+    started = time.perf_counter()
+    path = os.path.join(root, safe_name(reference), name)
+    entry = {"reference": reference, "name": name, "sha256": sha256, "size": None, "ok": False}
+    try:
+        entry["size"] = os.path.getsize(path)
+        if sha256 and hash_file(path).hexdigest() != sha256:
+            raise ValueError("SHA-256 doesn't match the store index")
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        if magic.startswith(b"PK"):
+            entry["kind"] = "zip"
+            entry.update(process_zip(path))
+        elif magic.startswith(b"%PDF") or name.lower().endswith(".pdf"):
+            entry["kind"] = "pdf"
+            entry.update(process_pdf(path))
+            if entry["text"]:
+                entry["text"] = os.path.relpath(entry["text"], os.path.dirname(path))
+        else:
+            entry["kind"] = "other"
+        entry["ok"] = True
+    except MemoryError:
+        entry["error"] = "out of memory (worker limit)"
+    except (zipfile.BadZipFile, zlib.error) as e:
+        entry["error"] = f"corrupt archive: {e}"
+    except Exception as e:
+        entry["error"] = str(e)
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+class PostProcessor:
+    """Feeds stored files to a bounded process pool and records the results in the catalog."""
+
+    def __init__(self, root, workers=None, memory_mb=2048):
+        self.root = root
+        self.catalog = catalog(root)
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.pending = queue.Queue()
+        # Two files per worker in the pool at a time; the rest wait here as names
+        self.slots = threading.BoundedSemaphore(2 * self.workers)
+        self.lock = threading.Lock()
+        self.queued = set()
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.start = time.time()
+        if PdfReader is None:
+            print(f"[postprocess] {NO_PYPDF}; PDFs are only verified")
+        # Spawned, not forked: the parent has download threads holding locks
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=limit_memory, initargs=(memory_mb,))
+        self.dispatcher = threading.Thread(target=self._dispatch, name="postprocess", daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, reference, path, sha256):
+        """Queue a stored file (DownloadStore's on_file hook); never blocks."""
+        name = os.path.basename(path)
+        with self.lock:
+            if self.catalog.done(reference, name, sha256) or (reference, name) in self.queued:
+                self.skipped += 1
+                return
+            self.queued.add((reference, name))
+        self.pending.put((reference, name, sha256))
+
+    def catch_up(self, store):
+        """Queue every stored file the catalog doesn't cover yet (after an interrupted run)."""
+        before = self.pending.qsize()
+        for reference, report in list(store.reports.items()):
+            for name, entry in list(report["files"].items()):
+                self.submit(reference, store.path(reference, name), entry["sha256"])
+        queued = self.pending.qsize() - before
+        if queued:
+            print(f"[postprocess] {queued} stored files not processed yet; queued")
+
+    def _dispatch(self):
+        while True:
+            item = self.pending.get()
+            if item is _STOP:
+                return
+            self.slots.acquire()
+            future = self.pool.submit(process_file, self.root, *item)
+            future.add_done_callback(lambda future, item=item: self._finished(item, future))
+
+    def _finished(self, item, future):
+        reference, name, sha256 = item
+        try:
+            entry = future.result()
+        except Exception as e:
+            # The worker died (e.g. killed by the OOM killer); the pool replaces it on the next run
+            entry = {"reference": reference, "name": name, "sha256": sha256, "ok": False,
+                     "error": f"worker failed: {e}"}
+        self.slots.release()
+        self.catalog.add(entry)
+        trace.record("postprocess", entry.get("seconds", 0.0), reference=reference, name=name,
+                     kind=entry.get("kind"), **({"error": entry["error"]} if entry.get("error") else {}))
+        with self.lock:
+            self.queued.discard((reference, name))
+            if entry["ok"]:
+                self.processed += 1
+            else:
+                self.failed += 1
+        if entry["ok"]:
+            detail = (f"{len(entry['members'])} files unpacked" if entry.get("kind") == "zip"
+                      else entry["skipped"] if entry.get("skipped")
+                      else f"{entry.get('pages') or '?'} pages, {entry.get('chars', 0)} chars" if entry.get("kind") == "pdf"
+                      else entry.get("kind"))
+            print(f"[postprocess] {reference}/{name}: {detail}")
+        else:
+            print(f"[postprocess] {reference}/{name} failed: {entry['error']}")
+
+    def report(self):
+        with self.lock:
+            waiting = self.pending.qsize()
+            print(f"[postprocess] {self.processed} files processed, {self.failed} failed, "
+                  f"{len(self.queued)} queued or running ({waiting} waiting), {self.skipped} already catalogued, "
+                  f"{time.time() - self.start:.1f}s")
+
+    def close(self):
+        """Finish every queued file, then stop the pool."""
+        self.pending.put(_STOP)
+        self.dispatcher.join()
+        self.pool.shutdown(wait=True)
+        self.report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    from nwt.files import DownloadStore
+
+    parser = argparse.ArgumentParser(description="Process downloaded reports, or show a report's catalog.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="verify, unzip and extract text from every stored file not processed yet")
+    run.add_argument("root", nargs="?", default="downloaded_reports")
+    run.add_argument("--workers", type=int, default=None)
+    run.add_argument("--memory-mb", type=int, default=2048, help="address-space cap per worker (default 2048)")
+    show = sub.add_parser("show", help="print the catalog entries of one report")
+    show.add_argument("root")
+    show.add_argument("reference")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        for entry in catalog(args.root).reference(args.reference):
+            print(json.dumps(entry))
+        return
+    with PostProcessor(args.root, args.workers, args.memory_mb) as processor:
+        processor.catch_up(DownloadStore(args.root))
+
+
+if __name__ == "__main__":
+    main()
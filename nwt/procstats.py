@@ -0,0 +1,51 @@
+"""Resident memory of a process tree (a browser and its children, or a benchmark run).
+
+Kept free of selenium so the benchmarks can use it too.
+"""
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _proc_children():
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def process_tree_rss(pid):
+    """Resident memory of pid and all its descendants in bytes, or None if unknown.
+
+    Shared pages are counted once per process, so this overstates a little.
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [root] + root.children(recursive=True))
+        except psutil.Error:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    children = _proc_children()
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        stack.extend(children.get(current, []))
+    return total
@@ -0,0 +1,90 @@
+"""Reference types: which ones the site offers, and where each one's output goes.
+
+The search page lists its reference types in the gvRefTypeSel picker. A
+crawl asks for one type, several ("Assessment Report,Thesis") or "all", and
+every type is searched in a session of its own, so its page numbers, run
+manifest and known references never mix with another type's. Each type has
+its own partition folder:
+
+- assessment_reports/ for Assessment Report, as before;
+- assessment_reports/<type>/ for the others, e.g. assessment_reports/open_file/.
+
+The SQLite store is shared: every type's records go into the one database,
+keyed by Reference.
+"""
+import os
+import re
+
+from nwt.common import DEFAULT_REFERENCE_TYPE, REF_TYPE_GRID_ID
+
+OUTPUT = "assessment_reports"
+
+
+def picker_types(soup):
+    """Names of the types listed in an open gvRefTypeSel picker, in page order."""
+    table = soup.find("table", id=REF_TYPE_GRID_ID)
+    if table is None:
+        raise Exception("Reference type picker did not open")
+    names = []
+    for row in table.find_all("tr"):
+        cells = row.find_all("td")
+        if len(cells) >= 2 and cells[0].find("input") is not None:
+            name = " ".join(cells[1].text.split())
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+def requested(text):
+    """The names in a --report-type value ("all" stays as it is)."""
+    if text.strip().lower() == "all":
+        return ["all"]
+    names = []
+    for name in text.split(","):
+        name = " ".join(name.split())
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def needs_picker(text):
+    """Whether a --report-type value has to be looked up in the site's list: anything but the default type."""
+    return requested(text) != [DEFAULT_REFERENCE_TYPE]
+
+
+def resolve(text, available):
+    """The picker names a --report-type value stands for.
+
+    Each name may be any case, or part of one type's name ("thesis"); "all"
+    is every type the picker lists.
+    """
+    names = requested(text)
+    if names == ["all"]:
+        return list(available)
+    chosen = []
+    for name in names:
+        found = [t for t in available if t.lower() == name.lower()] or \
+                [t for t in available if name.lower() in t.lower()]
+        if not found:
+            raise ValueError(f"no reference type {name!r}; the site lists {', '.join(available)}")
+        if len(found) > 1:
+            raise ValueError(f"{name!r} could be any of {', '.join(found)}")
+        if found[0] not in chosen:
+            chosen.append(found[0])
+    if not chosen:
+        raise ValueError("no reference type given")
+    return chosen
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def partition(reference_type, root=OUTPUT):
+    """The folder under root for one type's PAGE_N.json files, run manifest and known references.
+
+    The downloader keeps each type's run manifest in the same kind of folder under its own root.
+    """
+    if reference_type == DEFAULT_REFERENCE_TYPE:
+        return root
+    return os.path.join(root, slug(reference_type))
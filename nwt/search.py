@@ -0,0 +1,274 @@
+"""Full-text search over the reports' Title, Company and Type.
+
+An SQLite FTS5 inverted index lives next to the reports table, so a search
+reads a few posting lists instead of loading every record. MetadataStore
+updates it on every upsert (i.e. during a --store sqlite scrape). Each
+report's row is replaced only when its text or date changed. An existing
+database is indexed the first time it is opened. The store maps the
+database file into memory, so a query touches only the pages it needs.
+
+Text is tokenized here rather than by FTS5, for report titles:
+
+- "Copper-Cobalt" is the phrase "copper cobalt"; "F-17" and "NTS-85" also
+  match as one word ("f17");
+- a claim range "Claims 1000-1012" also matches every claim number in it,
+  up to MAX_RANGE numbers;
+- element symbols read as the element ("Au" is "gold", "Cu-Ni" is "copper
+  nickel"), and "sulph..." is "sulf...";
+- plurals are folded ("Diamonds" is "diamond", "Properties" is "property").
+
+Queries: words (all must match), "quoted phrases", prefix* and -excluded
+words, with optional company and date range filters. Dates are compared as
+ISO dates whatever format the grid shows them in.
+
+    python -m nwt.search query 'kimberlite "till sampling" diam*' --company "De Beers" --date-from 2000-01-01
+    python -m nwt.search build --pages assessment_reports
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+import unicodedata
+
+from nwt.incremental import parse_date
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_text USING fts5 (
+    title, company, type, reference UNINDEXED, day UNINDEXED, prefix = '2 3'
+);
+CREATE TABLE IF NOT EXISTS text_indexed (
+    reference TEXT PRIMARY KEY,
+    digest TEXT
+);
+"""
+
+REPORTS = """
+SELECT reports.rowid, reports.reference, reports.title, reports.company, reports.type, reports.date,
+       text_indexed.digest
+FROM reports LEFT JOIN text_indexed ON text_indexed.reference = reports.reference
+"""
+
+# Relative weight of a hit in title, company and type for ranking
+WEIGHTS = (3.0, 1.0, 0.5)
+
+MAX_RANGE = 100
+SYMBOLS = {"au": "gold", "ag": "silver", "cu": "copper", "pb": "lead", "zn": "zinc", "ni": "nickel",
+           "mo": "molybdenum", "pt": "platinum", "pd": "palladium", "sn": "tin", "li": "lithium",
+           "ta": "tantalum", "nb": "niobium", "bi": "bismuth", "sb": "antimony"}
+WORD_RE = re.compile(r"[^\W_]+(?:[-/][^\W_]+)*")
+TERM_RE = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+
+_available = None
+
+
+def fold(word, symbols=True):
+    """One word as indexed: lower case, no accents, symbols and spellings normalized, singular.
+
+    symbols=False is for the start of a prefix query, where "ni*" means words starting with "ni".
+    """
+    word = unicodedata.normalize("NFKD", word).encode("ascii", "ignore").decode().lower()
+    word = SYMBOLS.get(word, word) if symbols else word
+    if word.startswith("sulph"):
+        word = "sulf" + word[5:]
+    if len(word) > 4 and not word.isdigit():
+        if word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+    return word
+
+
+def tokens(text):
+    """(tokens in order, extra tokens) of a text; extras go after the text so phrases stay intact."""
+    ordered, extra = [], []
+    for compound in WORD_RE.findall(text or ""):
+        parts = [part for part in re.split(r"[-/]", compound) if part]
+        ordered.extend(fold(part) for part in parts)
+        if len(parts) == 2 and all(part.isdigit() for part in parts):
+            low, high = int(parts[0]), int(parts[1])
+            if 0 < high - low <= MAX_RANGE and len(parts[0]) == len(parts[1]):
+                extra.extend(str(n).zfill(len(parts[0])) for n in range(low + 1, high))
+        elif len(parts) > 1 and any(part.isdigit() for part in parts) and not all(part.isdigit() for part in parts):
+            extra.append("".join(part.lower() for part in parts))
+    return ordered, extra
+
+
+def indexed_text(text):
+    ordered, extra = tokens(text)
+    return " ".join(ordered + extra)
+
+
+def available(db):
+    """Whether this SQLite has FTS5; without it the search index is skipped."""
+    global _available
+    if _available is None:
+        try:
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5 (x)")
+            db.execute("DROP TABLE temp.fts5_probe")
+            _available = True
+        except Exception:
+            print("This SQLite has no FTS5; full-text search is off")
+            _available = False
+    return _available
+
+
+def digest(title, company, report_type, date):
+    return hashlib.sha1(json.dumps([title, company, report_type, date]).encode("utf-8")).hexdigest()
+
+
+def ensure(db, full=False):
+    """Create the index and index the reports that aren't yet; full=True also re-checks every indexed one.
+
+    Upserts keep the index current, so only rows written by an older version
+    of the store are missing; a full check is for `build`.
+    """
+    if not available(db):
+        return
+    db.executescript(SCHEMA)
+    rows = db.execute(REPORTS if full else REPORTS + " WHERE text_indexed.reference IS NULL")
+    stale = [row[:6] for row in rows if row[6] != digest(*row[2:6])]
+    if stale:
+        with db:
+            _index(db, stale)
+        print(f"Indexed the text of {len(stale)} reports")
+
+
+def index_records(db, records):
+    """Re-index the upserted records whose text changed; call inside the upsert's transaction."""
+    if not available(db) or not records:
+        return
+    references = [record.get("Reference") for record in records if record.get("Reference")]
+    rows = []
+    for start in range(0, len(references), 500):
+        chunk = references[start:start + 500]
+        rows += db.execute(REPORTS + f" WHERE reports.reference IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+    _index(db, [row[:6] for row in rows if row[6] != digest(*row[2:6])])
+
+
+def _index(db, rows):
+    # The FTS rowid is the reports rowid, which an upsert keeps, so a stale row is found without a scan
+    for rowid, reference, title, company, report_type, date in rows:
+        db.execute("DELETE FROM reports_text WHERE rowid = ?", (rowid,))
+        day = parse_date(date)
+        db.execute("INSERT INTO reports_text (rowid, title, company, type, reference, day) VALUES (?, ?, ?, ?, ?, ?)",
+                   (rowid, indexed_text(title), indexed_text(company), indexed_text(report_type), reference,
+                    day.isoformat() if day else None))
+        db.execute("INSERT OR REPLACE INTO text_indexed (reference, digest) VALUES (?, ?)",
+                   (reference, digest(title, company, report_type, date)))
+
+
+def _phrase(words):
+    return '"' + " ".join(words) + '"'
+
+
+def match_expression(text=None, company=None):
+    """FTS5 MATCH expression for a query string and a company filter, or None if neither has words."""
+    included, excluded = [], []
+    for negated_phrase, phrase, negated, word in TERM_RE.findall(text or ""):
+        prefix = not phrase and word.endswith("*")
+        ordered, _ = tokens(phrase or word.rstrip("*"))
+        if not ordered:
+            continue
+        if prefix:
+            # Folded like the index ("Diamonds*" finds "diamond..."); a shortened prefix is still a prefix
+            term = _phrase(ordered[:-1] + [fold(re.split(r"[-/]", word.rstrip("*"))[-1], symbols=False)]) + " *"
+        else:
+            term = _phrase(ordered)
+        (excluded if negated_phrase or negated else included).append(term)
+    parts = []
+    if included:
+        parts.append("{title company type} : (" + " AND ".join(included) + ")")
+    if company:
+        ordered, _ = tokens(company)
+        if ordered:
+            # Every word, in any order: "Beers De" still finds De Beers
+            parts.append("company : (" + " AND ".join(_phrase([word]) for word in ordered) + ")")
+    if not parts:
+        if excluded:
+            raise ValueError("a query needs at least one word that isn't excluded")
+        return None
+    expression = " AND ".join(parts)
+    for term in excluded:
+        expression += " NOT {title company type} : " + term
+    return expression
+
+
+def query(db, text=None, company=None, date_from=None, date_to=None, limit=None):
+    """Reports (reports-table dicts plus "score") matching a query, best first, newest first without words."""
+    if not available(db):
+        raise ValueError("full-text search needs an SQLite built with FTS5")
+    expression = match_expression(text, company)
+    clauses, params = [], []
+    if expression:
+        clauses.append("reports_text MATCH ?")
+        params.append(expression)
+    for value, operator in ((date_from, ">="), (date_to, "<=")):
+        if value:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"not a date: {value!r}")
+            clauses.append(f"reports_text.day {operator} ?")
+            params.append(day.isoformat())
+    if not clauses:
+        raise ValueError("give a query, a company or a date range")
+    score = f"bm25(reports_text, {', '.join(map(str, WEIGHTS))})" if expression else "0"
+    sql = (f"SELECT reports.*, {score} AS score FROM reports_text "
+           f"JOIN reports ON reports.rowid = reports_text.rowid WHERE {' AND '.join(clauses)} "
+           f"ORDER BY score, reports_text.day DESC")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def main():
+    from nwt.spatial import page_files
+    from nwt.store import DEFAULT_DB, MetadataStore, to_record
+
+    parser = argparse.ArgumentParser(description="Search report titles, companies and types.")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"database path (default {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="index the database, importing PAGE_N.json files first if given")
+    build.add_argument("--pages", metavar="FOLDER", help="folder of PAGE_N.json files from a --store json scrape")
+    find = sub.add_parser("query", help="reports matching words, \"phrases\", prefix* and -exclusions")
+    find.add_argument("text", nargs="?", default="")
+    find.add_argument("--company", help="words that must all appear in the company name, in any order")
+    find.add_argument("--date-from")
+    find.add_argument("--date-to")
+    find.add_argument("--limit", type=int)
+    find.add_argument("--links", action="store_true", help="print only Reference and download link")
+    args = parser.parse_args()
+
+    store = MetadataStore(args.db)
+    if args.command == "build":
+        for page, path in page_files(args.pages) if args.pages else ():
+            with open(path, encoding="utf-8") as f:
+                store.upsert(json.load(f), page)
+        ensure(store.db, full=True)
+        if available(store.db):
+            # Merge the index's segments into one b-tree: smallest file, fastest lookups
+            with store.db:
+                store.db.execute("INSERT INTO reports_text (reports_text) VALUES ('optimize')")
+        total = store.db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        print(f"{total} reports indexed")
+        store.close()
+        return
+
+    try:
+        started = time.perf_counter()
+        rows = query(store.db, args.text, args.company, args.date_from, args.date_to, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = (time.perf_counter() - started) * 1000
+    for row in rows:
+        if args.links:
+            print(f"{row['reference']}\t{row['download_link'] or ''}")
+        else:
+            print(json.dumps(to_record(row)))
+    print(f"{len(rows)} reports in {elapsed:.1f} ms", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Split a page range into shards and scrape them in parallel worker processes.
+
+Every shard gets its own session (or Chrome driver) with its own search setup,
+so workers never share viewstate. Shards are disjoint, which is what makes each
+PAGE_N.json get written exactly once.
+
+Several reference types are crawled the same way, one worker process per
+type (run_per_type): each searches its own type and walks all of that
+type's pages into the type's partition folder (nwt.reftypes).
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from nwt import policy
+from nwt.common import BASE_URL, DEFAULT_REFERENCE_TYPE
+from nwt.manifest import RunManifest, open_manifest
+from nwt.reftypes import partition
+from nwt.store import MetadataStore
+
+
+def split_range(first_page, last_page, workers):
+    """Cut first_page..last_page into at most `workers` contiguous (first, last) shards."""
+    total = last_page - first_page + 1
+    workers = max(1, min(workers, total))
+    size, extra = divmod(total, workers)
+    shards = []
+    start = first_page
+    for i in range(workers):
+        end = start + size - 1 + (1 if i < extra else 0)
+        shards.append((start, end))
+        start = end + 1
+    return shards
+
+
+def shard_progress(worker_id, first_page, last_page, status):
+    """Return a progress(page, error) callback that records into `status` and prints."""
+    # An open range (last_page None) doesn't know its total
+    total = last_page - first_page + 1 if last_page is not None else "?"
+
+    def progress(page, error=None):
+        if status.get(page, "") is None:
+            # Already written by this shard; never count a page twice
+            return
+        status[page] = error
+        done = sum(1 for e in status.values() if e is None)
+        if error is None:
+            print(f"[worker {worker_id}] page {page} done ({done}/{total})")
+        else:
+            print(f"[worker {worker_id}] page {page} failed: {error}")
+    return progress
+
+
+def run_sharded(first_page, last_page, workers, shard_worker):
+    """Run shard_worker(worker_id, first, last) for every shard and merge the results.
+
+    shard_worker must be a picklable top-level function returning {page: error or None}.
+    Returns the merged {page: error or None} for the whole range.
+    """
+    shards = split_range(first_page, last_page, workers)
+    print(f"Scraping pages {first_page}-{last_page} with {len(shards)} workers: {shards}")
+    status = {}
+    # Every worker draws on the parent's rate limit and circuit breaker
+    policy.shared().share(len(shards))
+    with ProcessPoolExecutor(max_workers=len(shards), initializer=policy.install,
+                             initargs=(policy.shared().state,)) as pool:
+        futures = {pool.submit(shard_worker, i + 1, a, b): (i + 1, a, b)
+                   for i, (a, b) in enumerate(shards)}
+        for future in as_completed(futures):
+            worker_id, a, b = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {}
+                print(f"[worker {worker_id}] crashed: {e}")
+                for page in range(a, b + 1):
+                    result[page] = f"worker crashed: {e}"
+            for page in range(a, b + 1):
+                # Pages outside a worker's shard are ignored so nothing is merged twice
+                status[page] = result.get(page, "not reached")
+    print_shard_report(status)
+    return status
+
+
+def print_shard_report(status):
+    """Print which pages succeeded and which failed and why."""
+    failed = {page: error for page, error in sorted(status.items()) if error is not None}
+    print(f"\n{len(status) - len(failed)}/{len(status)} pages scraped.")
+    if failed:
+        print("Failed pages:")
+        for page, error in failed.items():
+            print(f"  page {page}: {error}")
+
+
+def run_per_type(reference_types, type_worker):
+    """Run type_worker(reference_type) for every type at once and report on each.
+
+    type_worker must be a picklable top-level function returning {page: error or None}
+    for that type's pages. Returns {reference type: that status}.
+    """
+    print(f"Scraping {len(reference_types)} reference types in parallel: {', '.join(reference_types)}")
+    statuses = {}
+    policy.shared().share(len(reference_types))
+    with ProcessPoolExecutor(max_workers=len(reference_types), initializer=policy.install,
+                             initargs=(policy.shared().state,)) as pool:
+        futures = {pool.submit(type_worker, reference_type): reference_type for reference_type in reference_types}
+        for future in as_completed(futures):
+            reference_type = futures[future]
+            try:
+                statuses[reference_type] = future.result()
+            except Exception as e:
+                print(f"[{reference_type}] crashed: {e}")
+                statuses[reference_type] = {0: f"worker crashed: {e}"}
+    for reference_type in reference_types:
+        print(f"\n{reference_type}:", end="")
+        print_shard_report(statuses[reference_type])
+    return statuses
+
+
+def http_type_worker(reference_type, base_url=BASE_URL, store_path=None, cache_path=None, trace_path=None):
+    """Scrape every page of one reference type over plain HTTP into its partition folder."""
+    from nwt import http_engine, trace
+    from nwt.bootstrap import SessionCache
+
+    if trace_path:
+        trace.enable(trace_path, append=True)
+
+    status = {}
+    folder = partition(reference_type)
+    manifest = open_manifest(folder)
+    store = MetadataStore(store_path) if store_path else None
+    session = http_engine.HttpGridSession(base_url)
+    try:
+        session.setup(reference_type, SessionCache(cache_path) if cache_path else None)
+        progress = shard_progress(reference_type, 1, None, status)
+        http_engine.scrape_pages_in_range(session, 1, None, folder, progress, manifest, store)
+    except Exception as e:
+        status[max(status) + 1 if status else 1] = str(e)
+        print(f"[{reference_type}] stopped: {e}")
+    return status
+
+
+def http_shard_worker(worker_id, first_page, last_page, base_url=BASE_URL,
+                      folder="assessment_reports", manifest_path=None, store_path=None, cache_path=None,
+                      trace_path=None, reference_type=DEFAULT_REFERENCE_TYPE):
+    """Scrape one shard over plain HTTP in its own session."""
+    from nwt import http_engine, trace
+    from nwt.bootstrap import SessionCache
+
+    if trace_path:
+        trace.enable(trace_path, append=True)
+
+    status = {}
+    progress = shard_progress(worker_id, first_page, last_page, status)
+    manifest = RunManifest(manifest_path) if manifest_path else None
+    store = MetadataStore(store_path) if store_path else None
+    session = http_engine.HttpGridSession(base_url)
+    try:
+        session.setup(reference_type, SessionCache(cache_path) if cache_path else None)
+        http_engine.scrape_pages_in_range(session, first_page, last_page, folder, progress, manifest, store)
+    except Exception as e:
+        progress(first_page if not status else max(status) + 1, str(e))
+    return status
+
@@ -0,0 +1,205 @@
+"""Spatial index over the reports' Location: which reports cover an area.
+
+Each report's Location is parsed (nwt.location) into NTS sheets and points,
+and every piece's bounding box goes into an SQLite R*Tree next to the
+reports table. A query for a box or a list of sheets then reads a handful of
+index pages instead of scanning every record. MetadataStore keeps the index
+in step with every upsert, and indexes an existing database the first time
+it is opened.
+
+Tables in reports.sqlite:
+
+- location_parts: one row per sheet or point of a report, with its box;
+- location_rtree: R*Tree over those boxes (stored as 32-bit floats, rounded
+  outwards, so hits are checked again against location_parts);
+- location_indexed: the Location text each report was indexed from, so an
+  unchanged row isn't parsed again.
+
+A report matches when one of its pieces overlaps the area. Neighbouring
+sheets only share an edge and don't match each other.
+
+    python -m nwt.spatial query --sheets 85J/8,85I --bbox=-116,62,-114,63
+    python -m nwt.spatial build --pages assessment_reports
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from nwt.location import intersects, parse, sheet_box, split_sheet
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS location_parts (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL,
+    sheet TEXT,
+    west REAL NOT NULL,
+    south REAL NOT NULL,
+    east REAL NOT NULL,
+    north REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS location_parts_reference ON location_parts (reference);
+CREATE INDEX IF NOT EXISTS location_parts_sheet ON location_parts (sheet);
+CREATE VIRTUAL TABLE IF NOT EXISTS location_rtree USING rtree (id, west, east, south, north);
+CREATE TABLE IF NOT EXISTS location_indexed (
+    reference TEXT PRIMARY KEY,
+    location TEXT
+);
+"""
+
+UNINDEXED = """
+SELECT reports.reference, reports.location FROM reports
+LEFT JOIN location_indexed ON location_indexed.reference = reports.reference
+WHERE location_indexed.reference IS NULL OR location_indexed.location IS NOT reports.location
+"""
+
+CANDIDATES = """
+SELECT location_parts.reference, location_parts.sheet, location_parts.west, location_parts.south,
+       location_parts.east, location_parts.north
+FROM location_rtree JOIN location_parts ON location_parts.id = location_rtree.id
+WHERE location_rtree.west <= ? AND location_rtree.east >= ? AND location_rtree.south <= ? AND location_rtree.north >= ?
+"""
+
+
+def ensure(db):
+    """Create the index tables and index any report that isn't yet (or whose Location changed)."""
+    db.executescript(SCHEMA)
+    rows = db.execute(UNINDEXED).fetchall()
+    if rows:
+        with db:
+            _index(db, [(row[0], row[1]) for row in rows])
+        print(f"Indexed the locations of {len(rows)} reports")
+
+
+def index_records(db, records):
+    """Index the Location of PAGE_N.json-style records; call inside the upsert's transaction."""
+    pairs = [(record.get("Reference"), record.get("Location")) for record in records if record.get("Reference")]
+    known = {}
+    for start in range(0, len(pairs), 500):
+        chunk = [reference for reference, _ in pairs[start:start + 500]]
+        known.update(db.execute(f"SELECT reference, location FROM location_indexed WHERE reference IN "
+                                f"({','.join('?' * len(chunk))})", chunk).fetchall())
+    _index(db, [(reference, location) for reference, location in pairs
+                if reference not in known or known[reference] != location])
+
+
+def _index(db, pairs):
+    for reference, location in pairs:
+        for (part_id,) in db.execute("SELECT id FROM location_parts WHERE reference = ?", (reference,)).fetchall():
+            db.execute("DELETE FROM location_rtree WHERE id = ?", (part_id,))
+        db.execute("DELETE FROM location_parts WHERE reference = ?", (reference,))
+        for sheet, (west, south, east, north) in parse(location):
+            cursor = db.execute("INSERT INTO location_parts (reference, sheet, west, south, east, north) "
+                                "VALUES (?, ?, ?, ?, ?, ?)", (reference, sheet, west, south, east, north))
+            db.execute("INSERT INTO location_rtree VALUES (?, ?, ?, ?, ?)", (cursor.lastrowid, west, east, south, north))
+        db.execute("INSERT OR REPLACE INTO location_indexed (reference, location) VALUES (?, ?)", (reference, location))
+
+
+def parse_bbox(text):
+    """ "west,south,east,north" in decimal degrees (west longitudes negative) as a box."""
+    values = [float(value) for value in re.split(r"[,\s]+", text.strip())]
+    if len(values) != 4 or values[0] > values[2] or values[1] > values[3]:
+        raise ValueError(f"expected west,south,east,north, got {text!r}")
+    return tuple(values)
+
+
+def area_boxes(bbox=None, sheets=None):
+    """The boxes of a query area: an explicit box and/or sheet ids in any spelling."""
+    boxes = [bbox] if bbox else []
+    for sheet in sheets or ():
+        parts = split_sheet(sheet)
+        if parts is None:
+            raise ValueError(f"not an NTS sheet, map area or series: {sheet!r}")
+        boxes.append(sheet_box(*parts))
+    return boxes
+
+
+def matches(db, boxes):
+    """{reference: [sheet ids or None for points]} of the reports with a piece overlapping any box."""
+    found = {}
+    for box in boxes:
+        west, south, east, north = box
+        for reference, sheet, *part in db.execute(CANDIDATES, (east, west, north, south)):
+            if intersects(part, box):
+                pieces = found.setdefault(reference, [])
+                if sheet not in pieces:
+                    pieces.append(sheet)
+    return found
+
+
+def query(db, bbox=None, sheets=None, limit=None):
+    """Reports (reports-table dicts, newest first, plus "sheets") in the area of a box and/or sheets."""
+    found = matches(db, area_boxes(bbox, sheets))
+    references = sorted(found)
+    rows = []
+    for start in range(0, len(references), 500):
+        chunk = references[start:start + 500]
+        rows += [dict(row) for row in db.execute(
+            f"SELECT * FROM reports WHERE reference IN ({','.join('?' * len(chunk))})", chunk)]
+    rows.sort(key=lambda row: row["reference"])
+    rows.sort(key=lambda row: row["day"] or "", reverse=True)
+    for row in rows:
+        row["sheets"] = [sheet for sheet in found[row["reference"]] if sheet]
+    return rows[:limit] if limit else rows
+
+
+def page_files(folder):
+    """(page number, path) of every PAGE_N.json in folder."""
+    pages = []
+    for path in glob.glob(os.path.join(folder, "PAGE_*.json")):
+        match = re.search(r"PAGE_(\d+)\.json$", path)
+        if match:
+            pages.append((int(match.group(1)), path))
+    return sorted(pages)
+
+
+def main():
+    from nwt.store import DEFAULT_DB, MetadataStore, to_record
+
+    parser = argparse.ArgumentParser(description="Find reports by NTS sheet or area.")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"database path (default {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="index the database, importing PAGE_N.json files first if given")
+    build.add_argument("--pages", metavar="FOLDER", help="folder of PAGE_N.json files from a --store json scrape")
+    find = sub.add_parser("query", help="reports whose location overlaps a box or sheets")
+    find.add_argument("--bbox", help="west,south,east,north in decimal degrees, e.g. -116,62,-114,63")
+    find.add_argument("--sheets", help="comma-separated NTS sheets, map areas or series, e.g. 85J/8,85I,96")
+    find.add_argument("--limit", type=int)
+    find.add_argument("--links", action="store_true", help="print only Reference and download link")
+    args = parser.parse_args()
+
+    store = MetadataStore(args.db)
+    if args.command == "build":
+        for page, path in page_files(args.pages) if args.pages else ():
+            with open(path, encoding="utf-8") as f:
+                store.upsert(json.load(f), page)
+        count = store.db.execute("SELECT COUNT(DISTINCT reference) FROM location_parts").fetchone()[0]
+        total = store.db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        print(f"{count} of {total} reports have a location the index understands")
+        store.close()
+        return
+
+    if not args.bbox and not args.sheets:
+        parser.error("query needs --bbox and/or --sheets")
+    try:
+        bbox = parse_bbox(args.bbox) if args.bbox else None
+        sheets = [sheet for sheet in (args.sheets or "").split(",") if sheet.strip()]
+        started = time.perf_counter()
+        rows = query(store.db, bbox, sheets, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = (time.perf_counter() - started) * 1000
+    for row in rows:
+        if args.links:
+            print(f"{row['reference']}\t{row['download_link'] or ''}")
+        else:
+            print(json.dumps(dict(to_record(row), Sheets=row["sheets"])))
+    print(f"{len(rows)} reports in {elapsed:.1f} ms", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""SQLite metadata store: one row per Reference instead of one JSON file per page.
+
+Page boundaries move whenever the site adds reports, so PAGE_N.json files
+from different runs overlap. Here every record is upserted on its Reference,
+each page is written in one transaction, and first_seen/last_seen record when
+a report was first and most recently crawled. Each Date is also kept as an
+ISO day, whatever format the grid shows it in, so date ranges and ordering
+work on real dates. Company, day and Type are indexed so lookups over the
+whole index don't need a directory scan, and every Location goes into a
+spatial index (nwt.spatial) for area queries and Title/Company/Type into a
+full-text index (nwt.search).
+
+Query/export from the command line:
+
+    python -m nwt.store query --company "De Beers" --date-from 2000-01-01
+    python -m nwt.store export reports.csv
+"""
+from datetime import datetime, timezone
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+from nwt import search, spatial
+from nwt.incremental import parse_date
+
+DEFAULT_DB = "assessment_reports/reports.sqlite"
+
+# PAGE_N.json key -> column
+COLUMNS = {
+    "Reference": "reference",
+    "Type": "type",
+    "Title": "title",
+    "Company": "company",
+    "Date": "date",
+    "Location": "location",
+    "Download Link": "download_link",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    reference TEXT PRIMARY KEY,
+    type TEXT,
+    title TEXT,
+    company TEXT,
+    date TEXT,
+    day TEXT,
+    location TEXT,
+    download_link TEXT,
+    page INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_company ON reports (company);
+CREATE INDEX IF NOT EXISTS reports_type ON reports (type);
+"""
+
+# Created after the day column is added, since older databases lack it
+DAY_INDEX = """
+DROP INDEX IF EXISTS reports_date;
+CREATE INDEX IF NOT EXISTS reports_day ON reports (day);
+"""
+
+UPSERT = """
+INSERT INTO reports (reference, type, title, company, date, location, download_link, day, page, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (reference) DO UPDATE SET
+    type = excluded.type,
+    title = excluded.title,
+    company = excluded.company,
+    date = excluded.date,
+    day = excluded.day,
+    location = excluded.location,
+    download_link = excluded.download_link,
+    page = excluded.page,
+    last_seen = excluded.last_seen
+"""
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def iso_day(text):
+    """A Date cell or --date-from/--date-to value as YYYY-MM-DD, or None."""
+    day = parse_date(text)
+    return day.isoformat() if day else None
+
+
+def add_day_column(db):
+    """Give a database from before the day column one, filled in from each row's date."""
+    if "day" in [row[1] for row in db.execute("PRAGMA table_info(reports)")]:
+        return
+    with db:
+        db.execute("ALTER TABLE reports ADD COLUMN day TEXT")
+        db.executemany("UPDATE reports SET day = ? WHERE rowid = ?", [
+            (iso_day(date), rowid) for rowid, date in db.execute("SELECT rowid, date FROM reports").fetchall()
+        ])
+
+
+class MetadataStore:
+    """Embedded SQLite database of scraped report metadata."""
+
+    def __init__(self, path=DEFAULT_DB, crawl_time=None):
+        self.path = path
+        self.crawl_time = crawl_time or now()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # WAL lets shard workers in other processes write while readers query
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        # Read the indexes through the page cache instead of copying them into SQLite's own
+        self.db.execute("PRAGMA mmap_size=268435456")
+        self.db.executescript(SCHEMA)
+        add_day_column(self.db)
+        self.db.executescript(DAY_INDEX)
+        spatial.ensure(self.db)
+        search.ensure(self.db)
+
+    def upsert(self, records, page=None):
+        """Insert or update records in a single transaction."""
+        with self.db:
+            self.db.executemany(UPSERT, [
+                tuple(record.get(key) for key in COLUMNS)
+                + (iso_day(record.get("Date")), page, self.crawl_time, self.crawl_time)
+                for record in records
+            ])
+            spatial.index_records(self.db, records)
+            search.index_records(self.db, records)
+
+    def save_page(self, page_data, page_number):
+        """Store one scraped page; returns (db path, sha256 of the page's records) like save_page_data."""
+        self.upsert(page_data, page_number)
+        print(f"Stored {len(page_data)} records from page {page_number} in {self.path}")
+        digest = hashlib.sha256(json.dumps(page_data, sort_keys=True).encode("utf-8")).hexdigest()
+        return self.path, digest
+
+    def query(self, reference=None, company=None, report_type=None, title=None,
+              date_from=None, date_to=None, limit=None):
+        """Return matching reports as dicts, newest first."""
+        clauses, params = [], []
+        if reference:
+            clauses.append("reference = ?")
+            params.append(reference)
+        if company:
+            clauses.append("company LIKE ?")
+            params.append(f"%{company}%")
+        if report_type:
+            clauses.append("type = ?")
+            params.append(report_type)
+        if title:
+            clauses.append("title LIKE ?")
+            params.append(f"%{title}%")
+        for value, operator in ((date_from, ">="), (date_to, "<=")):
+            if value:
+                day = iso_day(value)
+                if day is None:
+                    raise ValueError(f"not a date: {value!r}")
+                clauses.append(f"day {operator} ?")
+                params.append(day)
+        sql = "SELECT * FROM reports"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY day DESC, reference"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def in_area(self, bbox=None, sheets=None, limit=None):
+        """Reports whose Location overlaps a (west, south, east, north) box and/or NTS sheets."""
+        return spatial.query(self.db, bbox, sheets, limit)
+
+    def search(self, text=None, company=None, date_from=None, date_to=None, limit=None):
+        """Reports matching a full-text query (see nwt.search), best match first."""
+        return search.query(self.db, text, company, date_from, date_to, limit)
+
+    def close(self):
+        self.db.close()
+
+
+def to_record(row):
+    """Turn a reports row back into the PAGE_N.json shape (plus crawl timestamps)."""
+    record = {key: row[column] for key, column in COLUMNS.items()}
+    record["First Seen"] = row["first_seen"]
+    record["Last Seen"] = row["last_seen"]
+    return record
+
+
+def export(rows, path):
+    """Write rows to .json or .csv depending on the file extension."""
+    records = [to_record(row) for row in rows]
+    if path.endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(COLUMNS) + ["First Seen", "Last Seen"])
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+    print(f"Exported {len(records)} records to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or export the scraped report metadata.")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"database path (default {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("query", "export"):
+        cmd = sub.add_parser(name)
+        if name == "export":
+            cmd.add_argument("output", help="output file, .json or .csv")
+        cmd.add_argument("--reference")
+        cmd.add_argument("--company", help="substring match")
+        cmd.add_argument("--type", dest="report_type")
+        cmd.add_argument("--title", help="substring match")
+        cmd.add_argument("--date-from")
+        cmd.add_argument("--date-to")
+        cmd.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    store = MetadataStore(args.db)
+    try:
+        rows = store.query(args.reference, args.company, args.report_type, args.title,
+                           args.date_from, args.date_to, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "export":
+        export(rows, args.output)
+    else:
+        for row in rows:
+            print(json.dumps(to_record(row)))
+        print(f"{len(rows)} records", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Wait for an ASP.NET postback to actually finish instead of sleeping.
+
+The results table exists both before and after a postback, so waiting for it to
+be present proves nothing. wait_for_postback snapshots the page first (the old
+document/grid element, the __VIEWSTATE fingerprint and the current pager page),
+performs the action, and returns as soon as the old element has gone stale or
+the fingerprint changed and the new grid is rendered.
+"""
+import time
+
+from nwt import policy, trace
+from nwt.common import GRID_ID
+
+# Cheap fingerprint of the page state; only the tail of the viewstate is sent back
+FINGERPRINT_JS = """
+var vs = document.getElementById('__VIEWSTATE');
+var cur = document.querySelector('span.current');
+var v = vs ? vs.value : '';
+return [v.length, v.slice(-64), cur ? cur.textContent.trim() : null];
+"""
+
+READY_JS = """
+if (document.readyState !== 'complete') return false;
+if (!arguments[0]) return true;
+var el = document.getElementById(arguments[0]);
+return !!el && el.getElementsByTagName('tr').length > 0;
+"""
+
+
+class AdaptiveTimeout:
+    """Timeout derived from observed postback latency (smoothed mean + 4 deviations).
+
+    Same idea as TCP's retransmission timer: fast when the server is healthy,
+    patient when it has been slow, always within [floor, ceiling].
+    """
+
+    def __init__(self, initial=30.0, floor=5.0, ceiling=120.0):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.mean = None
+        self.deviation = None
+        self.initial = initial
+
+    def observe(self, seconds):
+        if self.mean is None:
+            self.mean, self.deviation = seconds, seconds / 2
+        else:
+            self.deviation = 0.75 * self.deviation + 0.25 * abs(seconds - self.mean)
+            self.mean = 0.875 * self.mean + 0.125 * seconds
+
+    def value(self):
+        if self.mean is None:
+            return self.initial
+        return max(self.floor, min(self.ceiling, self.mean + 4 * self.deviation))
+
+
+postback_timeout = AdaptiveTimeout()
+
+
+def page_fingerprint(driver):
+    try:
+        return tuple(driver.execute_script(FINGERPRINT_JS))
+    except Exception:
+        return None
+
+
+def _anchor(driver, ready_id):
+    """The element whose staleness proves the page was replaced."""
+    from selenium.webdriver.common.by import By
+
+    try:
+        return driver.find_element(By.ID, ready_id) if ready_id else driver.find_element(By.TAG_NAME, "html")
+    except Exception:
+        return driver.find_element(By.TAG_NAME, "html")
+
+
+def _is_stale(element):
+    from selenium.common.exceptions import StaleElementReferenceException
+
+    try:
+        element.is_enabled()
+        return False
+    except StaleElementReferenceException:
+        return True
+
+
+def wait_for_postback(driver, action, ready_id=GRID_ID, timeout=None, optional=False):
+    """Run action() and block until the postback it triggers has rendered.
+
+    ready_id is the element that must exist once the new page is in (None for
+    any page). Returns the elapsed seconds; raises TimeoutException on timeout
+    unless optional is set, for actions that may not post back at all.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    anchor = _anchor(driver, ready_id)
+    before = page_fingerprint(driver)
+    timeout = timeout or postback_timeout.value()
+    # Chrome's postbacks share the run's rate limit and circuit breaker
+    policy.shared().acquire()
+    start = time.time()
+    action()
+
+    def rendered(d):
+        if not _is_stale(anchor) and page_fingerprint(d) == before:
+            return False
+        try:
+            return d.execute_script(READY_JS, ready_id)
+        except Exception:
+            return False
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(rendered)
+    except TimeoutException:
+        trace.record("postback", time.time() - start, ready=ready_id, timeout=True)
+        if optional:
+            return None
+        policy.shared().observe(ok=False)
+        raise TimeoutException(f"Postback did not complete within {timeout:.1f}s")
+    elapsed = time.time() - start
+    postback_timeout.observe(elapsed)
+    policy.shared().observe(elapsed)
+    trace.record("postback", elapsed, ready=ready_id)
+    return elapsed
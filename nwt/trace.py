@@ -0,0 +1,164 @@
+"""Phase timings for scraping and downloading, written to a JSONL trace.
+
+Wrap a phase in `with trace.phase("parse", page=n):`. When tracing is enabled
+(--trace FILE), each phase appends one line with its duration and fields to
+the trace file, and summary() prints per-phase count / p50 / p95 / max,
+pages per minute and MB/s at the end of the run. When it's off, phase()
+returns a shared no-op context after a single flag check.
+
+Shard workers append to the same file, so the parent's summary covers the
+whole run. An existing trace can be summarised again with:
+
+    python -m nwt.trace trace.jsonl
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+_path = None
+_lock = threading.Lock()
+
+# Phases whose events carry "bytes"; their total over the run's wall time is the MB/s figure
+TRANSFER_PHASES = ("transfer",)
+
+
+class _Phase:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        record(self.name, time.perf_counter() - self.start, **self.fields)
+        return False
+
+
+class _NullPhase:
+    @property
+    def fields(self):
+        # A fresh dict each time, so fields set on a disabled phase go nowhere
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullPhase()
+
+
+def enable(path, append=False):
+    """Start tracing to path; append=True for shard workers joining the parent's trace."""
+    global _path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if not append:
+        open(path, "w").close()
+    _path = path
+
+
+def trace_path():
+    return _path
+
+
+def phase(phase_name, **fields):
+    """Context manager timing one phase; extra fields may be added via .fields."""
+    if _path is None:
+        return _NULL
+    return _Phase(phase_name, fields)
+
+
+def record(phase_name, seconds, **fields):
+    """Log a phase that was timed elsewhere (e.g. a download's own clock)."""
+    if _path is None:
+        return
+    _write(dict(fields, phase=phase_name, seconds=round(seconds, 6)))
+
+
+def count(event_name, **fields):
+    """Log a point event, e.g. a finished page."""
+    if _path is None:
+        return
+    _write(dict(fields, event=event_name))
+
+
+def _write(event):
+    event["t"] = time.time()
+    event["pid"] = os.getpid()
+    line = json.dumps(event) + "\n"
+    with _lock, open(_path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def load(path):
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def summarize(events):
+    """Per-phase stats plus pages/min and MB/s, as printable lines."""
+    if not events:
+        return ["(trace is empty)"]
+    durations = {}
+    transferred = 0
+    pages = 0
+    for event in events:
+        if "phase" in event:
+            durations.setdefault(event["phase"], []).append(event["seconds"])
+            if event["phase"] in TRANSFER_PHASES:
+                transferred += event.get("bytes", 0)
+        elif event.get("event") == "page":
+            pages += 1
+    span = max(e["t"] for e in events) - min(e["t"] - e.get("seconds", 0) for e in events)
+    span = max(span, 1e-6)
+
+    # Phases nest (a navigate contains postbacks), so the bars are relative to the largest total
+    largest = max((sum(values) for values in durations.values()), default=0) or 1e-6
+    lines = [f"{'phase':<16}{'count':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"]
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        bar = "#" * max(1, round(20 * sum(values) / largest))
+        lines.append(f"{name:<16}{len(values):>7}{sum(values):>10.1f}{percentile(values, 0.5):>9.3f}"
+                     f"{percentile(values, 0.95):>9.3f}{values[-1]:>9.3f}  {bar}")
+    lines.append(f"wall {span:.1f}s, {pages} pages ({pages / span * 60:.1f} pages/min), "
+                 f"{transferred / 1e6:.1f} MB transferred ({transferred / 1e6 / span:.2f} MB/s)")
+    return lines
+
+
+def summary(path=None):
+    """Print the summary of this run's trace (or of path)."""
+    path = path or _path
+    if path is None or not os.path.exists(path):
+        return
+    print(f"\n--- Timing summary ({path}) ---")
+    for line in summarize(load(path)):
+        print(line)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m nwt.trace TRACE.jsonl")
+    summary(sys.argv[1])
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.mock_server import MockSite, serve
+
+
+@pytest.fixture
+def mock_site():
+    """A small MockSite served on a free port; yields (site, base url)."""
+    site = MockSite(pages=3, page_size=5, file_size=64 * 1024)
+    server = serve(site, port=0)
+    yield site, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,32 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from nwt.bootstrap import SessionCache, results_valid
+
+BASE_URL = "https://example.org/"
+
+
+def test_saved_entry_is_loaded_until_it_expires(tmp_path):
+    cache = SessionCache(str(tmp_path / "cache.json"))
+    cache.save(BASE_URL, "Thesis", {"ASP.NET_SessionId": "abc"}, {"__VIEWSTATE": "x"})
+    assert cache.load("https://example.org", "Thesis")["cookies"] == {"ASP.NET_SessionId": "abc"}
+    assert cache.load(BASE_URL, "Map") is None
+    assert SessionCache(cache.path, max_age=-1).load(BASE_URL, "Thesis") is None
+    cache.forget(BASE_URL, "Thesis")
+    assert cache.load(BASE_URL, "Thesis") is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_cache_file_is_private(tmp_path):
+    path = str(tmp_path / "cache.json")
+    SessionCache(path).save(BASE_URL, "Thesis", {"ASP.NET_SessionId": "abc"}, {})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_results_valid():
+    assert results_valid([{"Type": "Assessment Report"}], "assessment report")
+    assert not results_valid([{"Type": "Thesis"}], "Assessment Report")
+    assert not results_valid([], "Thesis")
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+from nwt.downloads import DownloadTracker
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def tracker(request, tmp_path, monkeypatch):
+    if request.param == "polling":
+        monkeypatch.setattr(sys, "platform", "darwin")
+    tracker = DownloadTracker(str(tmp_path), stall_timeout=300, tick=0.05)
+    yield tracker
+    tracker.close()
+
+
+def chrome_download(folder, name, chunks, tracker):
+    """Write a file the way Chrome does, polling the tracker between chunks."""
+    partial = os.path.join(folder, name + ".crdownload")
+    with open(partial, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            tracker.poll()
+    os.rename(partial, os.path.join(folder, name))
+
+
+def test_download_is_attributed_and_hashed(tracker, tmp_path):
+    chunks = [os.urandom(10000) for _ in range(3)]
+    tracker.expect("090000")
+    chrome_download(str(tmp_path), "090000.pdf", chunks, tracker)
+    (download,) = tracker.wait()
+    assert (download.owner, download.name, download.error) == ("090000", "090000.pdf", None)
+    assert download.size == 30000
+    assert download.sha256 == hashlib.sha256(b"".join(chunks)).hexdigest()
+    assert tracker.owned("090000") == [download]
+
+
+def test_each_file_goes_to_the_row_that_expected_it(tracker, tmp_path):
+    for reference in ("090000", "089999"):
+        tracker.expect(reference)
+        chrome_download(str(tmp_path), f"{reference}.pdf", [b"x"], tracker)
+        tracker.wait()
+    assert [(d.owner, d.name) for d in tracker.finished] == [("090000", "090000.pdf"), ("089999", "089999.pdf")]
+
+
+def test_our_own_files_are_ignored(tracker, tmp_path):
+    (tmp_path / "run_manifest.jsonl").write_text("{}\n")
+    tracker.poll()
+    assert tracker.finished == [] and tracker.in_flight == {}
+
+
+def test_deleted_partial_is_cancelled(tracker, tmp_path):
+    partial = tmp_path / "090000.pdf.crdownload"
+    partial.write_bytes(b"x")
+    tracker.poll()
+    partial.unlink()
+    (download,) = tracker.wait()
+    assert download.error == "cancelled"
+
+
+def test_partial_that_stops_growing_is_stalled(tmp_path):
+    tracker = DownloadTracker(str(tmp_path), stall_timeout=0.1, tick=0.05)
+    (tmp_path / "090000.pdf.crdownload").write_bytes(b"x")
+    tracker.poll()
+    (download,) = tracker.wait()
+    assert download.error == "stalled"
+    tracker.close()
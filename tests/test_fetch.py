@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+import pytest
+
+from nwt.fetch import Downloader, DownloadJob, ShortRead, check_length
+from nwt.policy import SERVER, Policy, classify
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def downloader(**kwargs):
+    policy = Policy(rate=100.0, max_rate=100.0)
+    policy.base_backoff = 0.0
+    return Downloader(policy=policy, chunk_size=4096, **kwargs)
+
+
+def file_job(site, url):
+    row = site.row(site.types, 0)
+    name = site.files(row)[0]
+    return DownloadJob(row["Reference"], f"{url}/Files/{row['Reference']}/{name}", name=name), \
+        site.file_bytes(row, name)
+
+
+def test_wrong_range_offset_starts_over(mock_site, tmp_path):
+    site, url = mock_site
+    job, data = file_job(site, url)
+    with open(tmp_path / (job.key() + ".part"), "wb") as f:
+        f.write(data[:len(data) // 2])
+    site.bad_range_rate = 1.0
+    path, size, sha256 = downloader().fetch(job, str(tmp_path))
+    assert site.stats["bad_ranges_injected"] == 1
+    assert size == len(data)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(tmp_path / (job.key() + ".part"))
+
+
+def test_part_file_is_resumed_with_a_range_request(mock_site, tmp_path):
+    site, url = mock_site
+    job, data = file_job(site, url)
+    with open(tmp_path / (job.key() + ".part"), "wb") as f:
+        f.write(data[:1000])
+    path, size, sha256 = downloader().fetch(job, str(tmp_path))
+    assert site.stats["bytes"] == len(data) - 1000
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert os.path.basename(path) == job.name
+
+
+def test_cut_off_transfer_is_resumed_by_the_next_run(mock_site, tmp_path):
+    site, url = mock_site
+    job, data = file_job(site, url)
+    site.drop_rate = 1.0
+    with pytest.raises(Exception, match="giving up after 2 attempts"):
+        downloader(retries=1).fetch(job, str(tmp_path))
+    assert site.stats["drops_injected"] == 2
+    # What did arrive is kept, and the next run only asks for the rest
+    have = os.path.getsize(tmp_path / (job.key() + ".part"))
+    assert 0 < have < len(data)
+    site.drop_rate = 0.0
+    sent = site.stats["bytes"]
+    path, size, sha256 = downloader().fetch(job, str(tmp_path))
+    assert site.stats["bytes"] - sent == len(data) - have
+    assert sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_check_length():
+    check_length(Response({"Content-Length": "100"}), 100)
+    with pytest.raises(ShortRead):
+        check_length(Response({"Content-Length": "100"}), 60)
+    # A compressed body's length can't be compared, nor can a missing one
+    check_length(Response({"Content-Length": "100", "Content-Encoding": "gzip"}), 60)
+    check_length(Response({}), 60)
+
+
+def test_short_read_is_retried():
+    assert classify(ShortRead("body cut off")) == SERVER
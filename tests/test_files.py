@@ -0,0 +1,51 @@
+import hashlib
+import os
+
+from nwt.files import DownloadStore
+
+
+def add(store, tmp_path, reference, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return store.add_file(reference, str(path), hashlib.sha256(data).hexdigest())
+
+
+def test_report_is_complete_once_marked(tmp_path):
+    store = DownloadStore(str(tmp_path / "store"))
+    stored = add(store, tmp_path, "090000", "090000.pdf", b"report")
+    assert stored == os.path.join(str(tmp_path / "store"), "090000", "090000.pdf")
+    assert not store.is_complete("090000")
+    store.mark_complete("090000")
+    assert store.is_complete("090000")
+    # The index is replayed by the next run
+    assert DownloadStore(str(tmp_path / "store")).is_complete("090000", verify=True)
+
+
+def test_missing_or_changed_file_is_incomplete(tmp_path):
+    store = DownloadStore(str(tmp_path / "store"))
+    stored = add(store, tmp_path, "090000", "090000.pdf", b"report")
+    store.mark_complete("090000")
+    with open(stored, "wb") as f:
+        f.write(b"tamper")
+    # Same size, so only verify notices
+    assert store.is_complete("090000")
+    assert not store.is_complete("090000", verify=True)
+    os.remove(stored)
+    assert not store.is_complete("090000")
+
+
+def test_duplicate_content_is_hard_linked(tmp_path):
+    store = DownloadStore(str(tmp_path / "store"))
+    first = add(store, tmp_path, "090000", "a.pdf", b"same bytes")
+    second = add(store, tmp_path, "089999", "b.pdf", b"same bytes")
+    assert os.path.samefile(first, second)
+    third = add(store, tmp_path, "089998", "c.pdf", b"other bytes")
+    assert not os.path.samefile(first, third)
+
+
+def test_on_file_sees_every_stored_file(tmp_path):
+    seen = []
+    store = DownloadStore(str(tmp_path / "store"), on_file=lambda *args: seen.append(args))
+    stored = add(store, tmp_path, "090000", "090000.pdf", b"report")
+    assert seen == [("090000", stored, hashlib.sha256(b"report").hexdigest())]
+    assert store.summary().startswith("0 reports")
@@ -0,0 +1,65 @@
+from benchmarks.mock_gridview import MockGridView, synthetic_row
+from nwt.incremental import NewestFirst, crawl_new, known_references
+
+PAGE_SIZE = 10
+
+
+def site_rows(hidden=0, total=60):
+    """The grid's rows newest first, with the `hidden` newest not published yet."""
+    return [synthetic_row(n) for n in range(hidden, total)]
+
+
+def crawl(rows, known):
+    """crawl_new over a MockGridView of rows; returns (pages read, emitted references)."""
+    grid = MockGridView(-(-len(rows) // PAGE_SIZE))
+    emitted = []
+
+    def read_page(page):
+        assert grid.current == page
+        return [dict(row) for row in rows[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]]
+    pages, count = crawl_new(read_page, lambda: grid.post("Page$Next"), lambda: grid.current == grid.total_pages,
+                             known, lambda page, records: emitted.extend(r["Reference"] for r in records))
+    assert count == len(emitted)
+    return pages, emitted
+
+
+def test_second_run_stops_at_the_first_page_with_nothing_new(tmp_path):
+    known = known_references(str(tmp_path))
+    assert crawl(site_rows(hidden=3), known) == (6, [row["Reference"] for row in site_rows(hidden=3)])
+    # Three reports published since: they push everything down, and page 2 is all known
+    pages, emitted = crawl(site_rows(), known_references(str(tmp_path)))
+    assert pages == 2
+    assert emitted == [row["Reference"] for row in site_rows()[:3]]
+
+
+def test_changed_row_is_emitted_again(tmp_path):
+    known = known_references(str(tmp_path))
+    rows = site_rows()
+    crawl(rows, known)
+    rows[4] = dict(rows[4], Title="Revised")
+    assert crawl(rows, known) == (2, [rows[4]["Reference"]])
+
+
+def test_out_of_order_grid_is_read_to_the_end(tmp_path):
+    known = known_references(str(tmp_path))
+    rows = site_rows()
+    crawl(rows, known)
+    # A new report, but sorted by something other than date: one on page 2 is newer than page 1
+    rows = rows[:5] + [synthetic_row(-1)] + rows[5:]
+    rows[12], rows[2] = rows[2], rows[12]
+    pages, emitted = crawl(rows, known)
+    assert pages == 7
+    assert emitted == [synthetic_row(-1)["Reference"]]
+
+
+def test_newest_first():
+    rows = site_rows()
+    order = NewestFirst()
+    assert order.check(1, rows[:10])
+    assert order.check(2, rows[10:20])
+    # Undated rows don't count either way
+    assert order.check(3, [dict(row, Date="") for row in rows[20:30]])
+    assert not order.check(4, rows[:10])
+    assert not order.check(5, rows[30:40])
+    unsorted = NewestFirst()
+    assert not unsorted.check(1, rows[:10][::-1])
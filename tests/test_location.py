@@ -0,0 +1,75 @@
+import pytest
+
+from nwt.location import intersects, parse, sheet_box, split_sheet
+
+
+def ids(text):
+    return [sheet for sheet, _ in parse(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("85I/12", ["085I12"]),
+    ("085I12", ["085I12"]),
+    ("85 I/1,2,8", ["085I01", "085I02", "085I08"]),
+    ("NTS 85I/1-4, 85J/8", ["085I01", "085I02", "085I03", "085I04", "085J08"]),
+    ("86B", ["086B"]),
+    ("NTS 96", ["096"]),
+    # A year after a map area isn't a sheet number
+    ("85I 1990", ["085I"]),
+    ("85I/12, 085I12", ["085I12"]),
+])
+def test_sheet_ids(text, expected):
+    assert ids(text) == expected
+
+
+def test_coordinates_are_points():
+    (sheet, box), = parse("62°27'N 114°22'W")
+    assert sheet is None
+    assert box[1] == box[3] == pytest.approx(62.45)
+    assert box[0] == box[2] == pytest.approx(-114.3667, abs=1e-4)
+    assert parse("Lat 62.45 Long 114.37") == [(None, (-114.37, 62.45, -114.37, 62.45))]
+
+
+def test_series_box():
+    assert sheet_box(85) == (-120.0, 60.0, -112.0, 64.0)
+    assert sheet_box(5) is None
+
+
+def test_map_areas_snake_from_the_south_east():
+    # First row east to west, the next one back west to east
+    assert sheet_box(85, "A") == (-114.0, 60.0, -112.0, 61.0)
+    assert sheet_box(85, "D") == (-120.0, 60.0, -118.0, 61.0)
+    assert sheet_box(85, "E") == (-120.0, 61.0, -118.0, 62.0)
+    assert sheet_box(85, "H") == (-114.0, 61.0, -112.0, 62.0)
+    assert sheet_box(85, "I") == (-114.0, 62.0, -112.0, 63.0)
+
+
+def test_arctic_map_areas_are_four_degrees_wide():
+    assert sheet_box(87, "A") == (-116.0, 68.0, -112.0, 69.0)
+    assert sheet_box(87, "B") == (-120.0, 68.0, -116.0, 69.0)
+    assert sheet_box(87, "C") == (-120.0, 69.0, -116.0, 70.0)
+    assert sheet_box(87, "I") is None
+
+
+def test_sheets_snake_within_their_map_area():
+    assert sheet_box(85, "I", 1) == (-112.5, 62.0, -112.0, 62.25)
+    assert sheet_box(85, "I", 4) == (-114.0, 62.0, -113.5, 62.25)
+    assert sheet_box(85, "I", 5) == (-114.0, 62.25, -113.5, 62.5)
+    assert sheet_box(85, "I", 12) == (-114.0, 62.5, -113.5, 62.75)
+    assert sheet_box(85, "I", 16) == (-112.5, 62.75, -112.0, 63.0)
+    assert sheet_box(85, "I", 17) is None
+
+
+def test_split_sheet():
+    assert split_sheet("85i/12") == (85, "I", 12)
+    assert split_sheet("096") == (96, None, None)
+    assert split_sheet("85Q") is None
+
+
+def test_intersects():
+    a = (-114.0, 62.0, -112.0, 63.0)
+    assert intersects(a, (-113.0, 62.5, -111.0, 64.0))
+    # Neighbouring map areas only share an edge
+    assert not intersects(a, (-116.0, 62.0, -114.0, 63.0))
+    # A point on the edge is inside
+    assert intersects(a, (-114.0, 62.5, -114.0, 62.5))
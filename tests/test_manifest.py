@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+from benchmarks.mock_gridview import MockGridView, synthetic_rows
+from nwt.crawl import first_todo, scrape_range
+from nwt.manifest import DONE, FAILED, MANIFEST_NAME, RunManifest, open_manifest
+from nwt.pager import jump_to_page
+
+
+def test_latest_line_wins_after_reload(tmp_path):
+    path = str(tmp_path / MANIFEST_NAME)
+    manifest = RunManifest(path)
+    manifest.mark_page(1, FAILED, error="timeout")
+    manifest.mark_page(1, DONE, records=10)
+    manifest.mark_row(1, 0, "090000", DONE)
+    reloaded = RunManifest(path)
+    assert reloaded.page_done(1)
+    assert reloaded.pages[1]["records"] == 10
+    assert reloaded.row_done("090000")
+    assert not reloaded.row_done("089999")
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["status"] for line in f] == [FAILED, DONE, DONE]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / MANIFEST_NAME)
+    RunManifest(path).mark_page(1, DONE)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"kind": "page", "page": 2, "sta')
+    manifest = RunManifest(path)
+    assert manifest.page_done(1)
+    assert not manifest.page_done(2)
+
+
+def test_page_with_a_missing_output_file_is_redone(tmp_path):
+    manifest = RunManifest(str(tmp_path / MANIFEST_NAME))
+    output = tmp_path / "PAGE_1.json"
+    output.write_text("[]")
+    manifest.mark_page(1, DONE, path=str(output))
+    manifest.mark_page(2, DONE)
+    assert manifest.next_incomplete_page(1, 3) == 3
+    output.unlink()
+    assert manifest.next_incomplete_page(1, 3) == 1
+    assert manifest.summary(1, 3) == "1/3 pages already complete"
+
+
+def test_fresh_sets_the_old_manifest_aside(tmp_path):
+    open_manifest(str(tmp_path)).mark_page(1, DONE)
+    assert not open_manifest(str(tmp_path), fresh=True).page_done(1)
+    assert (tmp_path / (MANIFEST_NAME + ".prev")).exists()
+
+
+def test_first_todo_looks_up_the_last_page_only_when_skipping(tmp_path):
+    manifest = RunManifest(str(tmp_path / MANIFEST_NAME))
+    lookups = []
+
+    def find_last_page():
+        lookups.append(1)
+        return 3
+    assert first_todo(1, None, manifest, find_last_page) == (1, None)
+    assert lookups == []
+    for page in (1, 2, 3):
+        manifest.mark_page(page, DONE)
+    assert first_todo(1, None, manifest, find_last_page) == (None, 3)
+    assert lookups == [1]
+
+
+def crawl(grid, folder, manifest, first_page, last_page):
+    """scrape_range over a MockGridView; returns the pages extracted."""
+    extracted = []
+
+    def extract(page):
+        assert grid.current == page
+        extracted.append(page)
+        data = json.dumps(synthetic_rows(page)).encode("utf-8")
+        path = folder / f"PAGE_{page}.json"
+        path.write_bytes(data)
+        return str(path), hashlib.sha256(data).hexdigest(), 10
+
+    def navigate(page):
+        jump_to_page(page, lambda: grid.current, grid.links, grid.post)
+        return grid.current == page
+    scrape_range(first_page, last_page, extract, lambda: grid.post("Page$Next"), navigate,
+                 folder=str(folder), manifest=manifest)
+    return extracted
+
+
+def test_crawl_resumes_after_the_finished_pages(tmp_path):
+    path = str(tmp_path / MANIFEST_NAME)
+    assert crawl(MockGridView(30), tmp_path, RunManifest(path), 1, 4) == [1, 2, 3, 4]
+    # A new run over a wider range jumps straight to page 5
+    grid = MockGridView(30)
+    assert crawl(grid, tmp_path, RunManifest(path), 1, 8) == [5, 6, 7, 8]
+    assert grid.current == 8
+    # And a gap left by a lost output file is filled in
+    (tmp_path / "PAGE_6.json").unlink()
+    assert crawl(MockGridView(30), tmp_path, RunManifest(path), 1, 8) == [6]
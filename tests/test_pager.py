@@ -0,0 +1,104 @@
+import pytest
+
+from benchmarks.mock_gridview import MockGridView
+from nwt.pager import (PagerCache, choose_hop, find_last_page, is_last_page, jump_to_page, link_page_number,
+                       links_from_hrefs, reach_distance)
+
+
+def jump(grid, target, last_page=None):
+    return jump_to_page(target, lambda: grid.current, grid.links, grid.post, last_page=last_page)
+
+
+def test_links_from_hrefs():
+    hrefs = ["javascript:__doPostBack('ctl00$MainContent$gvReferences','Page$2')",
+             "javascript:__doPostBack('ctl00$MainContent$gvReferences','DownloadRec$0')",
+             "javascript:__doPostBack('ctl00$MainContent$other','Page$3')",
+             None]
+    assert links_from_hrefs(hrefs) == {"Page$2": "Page$2"}
+
+
+@pytest.mark.parametrize("argument, expected", [
+    ("Page$12", 12),
+    ("Page$First", 1),
+    ("Page$Next", 8),
+    ("Page$Prev", 6),
+    ("Page$Last", None),
+])
+def test_link_page_number(argument, expected):
+    assert link_page_number(argument, 7) == expected
+
+
+def test_choose_hop():
+    assert choose_hop(1, 30, {"Page$2": 1, "Page$11": 1, "Page$Last": 1}) == "Page$11"
+    # On a tie the link that doesn't overshoot wins
+    assert choose_hop(10, 12, {"Page$11": 1, "Page$13": 1}) == "Page$11"
+    # Page$Last only when nothing else gets closer, unless the last page is known
+    assert choose_hop(1, 300, {"Page$Last": 1}) == "Page$Last"
+    assert choose_hop(1, 248, {"Page$2": 1, "Page$Last": 1}, last_page=250) == "Page$Last"
+    assert choose_hop(5, 5, {"Page$4": 1, "Page$6": 1}) is None
+
+
+def test_jump_follows_the_pager_windows():
+    grid = MockGridView(250)
+    assert jump(grid, 95) == 10
+    assert grid.current == 95
+    assert jump(grid, 95) == 0
+
+
+def test_jump_near_the_end_starts_from_last_when_known():
+    assert jump(MockGridView(250), 248) == 25
+    assert jump(MockGridView(250), 248, last_page=250) == 2
+
+
+def test_jump_without_first_last_or_next_prev():
+    grid = MockGridView(250, first_last=False, next_prev=False)
+    assert jump(grid, 95) == 10
+    # Back down one window at a time
+    assert jump(grid, 3) == 10
+
+
+def test_jump_past_the_end_raises():
+    with pytest.raises(Exception):
+        jump(MockGridView(20), 25)
+
+
+def test_find_last_page():
+    grid = MockGridView(250)
+    assert find_last_page(lambda: grid.current, grid.links, grid.post) == (250, 1)
+    grid = MockGridView(250, first_last=False, next_prev=False)
+    assert find_last_page(lambda: grid.current, grid.links, grid.post) == (250, 25)
+    grid = MockGridView(1)
+    assert find_last_page(lambda: grid.current, grid.links, grid.post) == (1, 0)
+
+
+def test_is_last_page():
+    grid = MockGridView(12, first_last=False, next_prev=False)
+    assert not is_last_page(grid.current, grid.links())
+    grid.current = 12
+    assert is_last_page(grid.current, grid.links())
+
+
+def test_reach_distance():
+    links = {"Page$10": 1, "Page$20": 1}
+    assert reach_distance(5, links, 5) == 0
+    assert reach_distance(5, links, 19) == 2
+    assert reach_distance(5, {}, 19) == 14
+
+
+def test_pager_cache_picks_the_closest_start():
+    cache = PagerCache()
+    cache.remember(1, {"Page$2": 1, "Page$11": 1}, "state 1")
+    cache.remember(40, {"Page$41": 1, "Page$50": 1}, "state 40")
+    assert cache.best_start(48)[0] == 40
+    assert cache.best_start(9)[2] == "state 1"
+    assert PagerCache().best_start(3) is None
+
+
+def test_pager_cache_drops_the_oldest_entries():
+    cache = PagerCache(max_entries=2)
+    for page in (1, 2, 3):
+        cache.remember(page, {})
+    assert list(cache.entries) == [2, 3]
+    cache.remember(2, {})
+    cache.remember(4, {})
+    assert list(cache.entries) == [2, 4]
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+
+from nwt.fetch import Downloader, DownloadJob
+from nwt.pipeline import DownloadPipeline
+from nwt.policy import Policy
+
+
+class GatedDownloader:
+    """Holds every fetch until the gate opens."""
+
+    max_workers = 1
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def fetch(self, job, dest_dir):
+        self.started.set()
+        self.gate.wait(5)
+        return f"{dest_dir}/{job.name}", 1, "sha"
+
+
+def test_submit_blocks_while_the_queue_is_full(tmp_path):
+    downloader = GatedDownloader()
+    pipeline = DownloadPipeline(downloader, str(tmp_path), max_queue=1)
+    pipeline.submit(DownloadJob("1", "url", name="a"))
+    downloader.started.wait(5)
+    # One job in flight and one waiting fill the pipeline; a third has to wait
+    pipeline.submit(DownloadJob("2", "url", name="b"))
+    third = threading.Thread(target=pipeline.submit, args=(DownloadJob("3", "url", name="c"),))
+    third.start()
+    third.join(0.2)
+    assert third.is_alive()
+    assert pipeline.metrics()["in_flight"] == 1
+    downloader.gate.set()
+    third.join(5)
+    pipeline.close()
+    metrics = pipeline.metrics()
+    assert metrics["completed"] == 3
+    assert metrics["producer_blocked_s"] > 0
+
+
+def test_pipeline_downloads_every_file(mock_site, tmp_path):
+    site, url = mock_site
+    policy = Policy(rate=100.0, max_rate=100.0)
+    policy.base_backoff = 0.0
+    expected, results = {}, {}
+    with DownloadPipeline(Downloader(max_workers=3, retries=0, policy=policy), str(tmp_path)) as pipeline:
+        for n in range(6):
+            row = site.row(site.types, n)
+            for name in site.files(row):
+                expected[name] = hashlib.sha256(site.file_bytes(row, name)).hexdigest()
+                pipeline.submit(DownloadJob(row["Reference"], f"{url}/Files/{row['Reference']}/{name}", name=name),
+                                lambda job, result, error: results.update({job.name: (result, error)}))
+        pipeline.submit(DownloadJob("000000", f"{url}/Files/000000/missing.pdf", name="missing.pdf"),
+                        lambda job, result, error: results.update({job.name: (result, error)}))
+    assert {name: result[2] for name, (result, error) in results.items() if result} == expected
+    assert results["missing.pdf"][0] is None and "404" in results["missing.pdf"][1]
+    metrics = pipeline.metrics()
+    assert (metrics["completed"], metrics["failed"]) == (len(expected), 1)
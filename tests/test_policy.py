@@ -0,0 +1,128 @@
+import pytest
+import requests
+
+from nwt.policy import FATAL, SERVER, TRANSIENT, Policy, RetryableStatus, check_status, classify
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class StaleElementReferenceException(Exception):
+    """Stands in for selenium's, which classify() matches by name."""
+
+
+def quick_policy(**kwargs):
+    policy = Policy(**kwargs)
+    policy.base_backoff = 0.0
+    return policy
+
+
+def http_error(status):
+    return requests.HTTPError(response=Response(status))
+
+
+@pytest.mark.parametrize("error, kind", [
+    (RetryableStatus("HTTP 503"), SERVER),
+    (http_error(502), SERVER),
+    (http_error(404), FATAL),
+    (requests.ConnectionError(), SERVER),
+    (requests.Timeout(), SERVER),
+    (requests.exceptions.ChunkedEncodingError(), SERVER),
+    (requests.exceptions.InvalidURL(), FATAL),
+    (StaleElementReferenceException(), TRANSIENT),
+    (KeyError("x"), FATAL),
+    (Exception("Page didn't change"), TRANSIENT),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_check_status():
+    assert check_status(Response(200)).status_code == 200
+    with pytest.raises(RetryableStatus):
+        check_status(Response(503))
+    assert check_status(Response(404)).status_code == 404
+
+
+def test_retry_until_success():
+    policy = quick_policy()
+    outcomes = [RetryableStatus("HTTP 500"), requests.ConnectionError(), "ok"]
+
+    def action():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    assert policy.retry(action, "test") == "ok"
+    metrics = policy.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["errors"] == 2
+
+
+def test_fatal_errors_are_not_retried():
+    policy = quick_policy()
+    calls = []
+
+    def action():
+        calls.append(1)
+        raise KeyError("bug")
+    with pytest.raises(KeyError):
+        policy.retry(action, "test")
+    assert len(calls) == 1
+
+
+def test_single_attempt_neither_retries_nor_counts():
+    policy = quick_policy()
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise RetryableStatus("HTTP 500")
+    with pytest.raises(RetryableStatus):
+        policy.call(request, "test", attempts=1)
+    assert len(calls) == 1
+    assert policy.metrics()["errors"] == 0
+
+
+def test_server_errors_halve_the_rate():
+    policy = quick_policy(rate=4.0, min_rate=0.2)
+    policy.observe(ok=False)
+    assert policy.metrics()["rate"] == 2.0
+
+
+def test_breaker_opens_after_repeated_server_errors():
+    policy = quick_policy()
+    for _ in range(policy.failure_threshold - 1):
+        policy.observe(ok=False)
+    assert policy.metrics()["breaker"] == "closed"
+    policy.observe(ok=False)
+    metrics = policy.metrics()
+    assert metrics["breaker"] == "open"
+    assert metrics["breaker_trips"] == 1
+
+
+def test_success_resets_the_failure_count():
+    policy = quick_policy()
+    for _ in range(policy.failure_threshold - 1):
+        policy.observe(ok=False)
+    policy.observe(0.05)
+    policy.observe(ok=False)
+    assert policy.metrics()["breaker"] == "closed"
+
+
+def test_backoff_is_capped():
+    policy = Policy()
+    assert all(0 <= policy.backoff(attempt) <= policy.max_backoff for attempt in range(12))
+
+
+def test_share_scales_the_start_rate_up_to_the_ceiling():
+    policy = Policy(rate=4.0, max_rate=16.0)
+    policy.share(3)
+    assert policy.metrics()["rate"] == 12.0
+    policy.share(3)
+    assert policy.metrics()["rate"] == 16.0
+    single = Policy(rate=4.0)
+    single.share(1)
+    assert single.metrics()["rate"] == 4.0
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from nwt import search
+from nwt.search import MAX_RANGE, fold, match_expression, tokens
+from nwt.store import MetadataStore
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("Diamonds", "diamond"),
+    ("Properties", "property"),
+    ("Mines", "mine"),
+    # Short words, and -ss/-us/-is endings, are left alone
+    ("Gas", "gas"),
+    ("Ores", "ores"),
+    ("Pass", "pass"),
+    ("Campus", "campus"),
+    ("Basis", "basis"),
+    ("Sulphides", "sulfide"),
+    ("Au", "gold"),
+    ("Cu", "copper"),
+])
+def test_fold(word, expected):
+    assert fold(word) == expected
+
+
+def test_fold_keeps_symbols_for_prefixes():
+    assert fold("ni", symbols=False) == "ni"
+
+
+def test_claim_range_adds_the_numbers_between():
+    ordered, extra = tokens("Claims 1000-1012")
+    assert ordered == ["claim", "1000", "1012"]
+    assert extra == [str(n) for n in range(1001, 1012)]
+
+
+def test_claim_range_keeps_zero_padding():
+    assert tokens("Claims 08-11")[1] == ["09", "10"]
+
+
+@pytest.mark.parametrize("text", [
+    "Claims 10-9",
+    f"Claims 1-{MAX_RANGE + 2}",
+    # Different widths are more likely a date or a code than a range
+    "Claims 01-100",
+])
+def test_claim_range_limits(text):
+    assert tokens(text)[1] == []
+
+
+def test_hyphenated_words():
+    assert tokens("Copper-Cobalt") == (["copper", "cobalt"], [])
+    assert tokens("Cu-Ni showing") == (["copper", "nickel", "showing"], [])
+    assert tokens("F-17") == (["f", "17"], ["f17"])
+
+
+def test_match_expression():
+    expression = match_expression('kimberlite "till sampling" diam* -gold', "De Beers")
+    assert expression == ('{title company type} : ("kimberlite" AND "till sampling" AND "diam" *)'
+                          ' AND company : ("de" AND "beer") NOT {title company type} : "gold"')
+    assert match_expression(None, None) is None
+    with pytest.raises(ValueError):
+        match_expression("-gold")
+
+
+@pytest.mark.skipif(not search.available(sqlite3.connect(":memory:")), reason="SQLite without FTS5")
+def test_company_words_match_in_any_order(tmp_path):
+    store = MetadataStore(str(tmp_path / "reports.sqlite"))
+    store.upsert([{"Reference": "090000", "Title": "Till sampling", "Company": "De Beers Canada Inc.",
+                   "Date": "2001-01-05"}])
+    for company in ("De Beers", "beers de", "Canada Beers"):
+        assert [row["reference"] for row in store.search(company=company)] == ["090000"]
+    assert store.search(company="Beers Rio") == []
+    store.close()
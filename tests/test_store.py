@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.mock_gridview import synthetic_row, synthetic_rows
+from nwt.store import MetadataStore
+
+# The reports table as the first version of the store created it, before the day column
+OLD_SCHEMA = """
+CREATE TABLE reports (
+    reference TEXT PRIMARY KEY,
+    type TEXT,
+    title TEXT,
+    company TEXT,
+    date TEXT,
+    location TEXT,
+    download_link TEXT,
+    page INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX reports_date ON reports (date);
+"""
+
+
+def open_store(tmp_path, crawl_time):
+    return MetadataStore(str(tmp_path / "reports.sqlite"), crawl_time=crawl_time)
+
+
+def test_upsert_keeps_one_row_per_reference(tmp_path):
+    store = open_store(tmp_path, "2024-01-01T00:00:00+00:00")
+    store.upsert(synthetic_rows(1), page=1)
+    store.close()
+    # The site added reports, so the same rows are on page 2 now, one of them retitled
+    rows = synthetic_rows(1)
+    rows[0]["Title"] = "Revised"
+    store = open_store(tmp_path, "2024-02-01T00:00:00+00:00")
+    store.upsert(rows, page=2)
+    assert len(store.query()) == 10
+    (row,) = store.query(reference=rows[0]["Reference"])
+    assert row["title"] == "Revised"
+    assert row["page"] == 2
+    assert row["first_seen"] == "2024-01-01T00:00:00+00:00"
+    assert row["last_seen"] == "2024-02-01T00:00:00+00:00"
+    store.close()
+
+
+def test_dates_are_compared_as_days(tmp_path):
+    store = open_store(tmp_path, None)
+    old, new = synthetic_row(0), synthetic_row(1)
+    old["Date"], new["Date"] = "12/31/1999", "1/5/2000"
+    store.upsert([old, new])
+    assert [row["reference"] for row in store.query(date_from="2000-01-01")] == [new["Reference"]]
+    assert [row["day"] for row in store.query()] == ["2000-01-05", "1999-12-31"]
+    with pytest.raises(ValueError):
+        store.query(date_to="sometime")
+    store.close()
+
+
+def test_old_database_gets_the_day_column(tmp_path):
+    path = str(tmp_path / "reports.sqlite")
+    db = sqlite3.connect(path)
+    db.executescript(OLD_SCHEMA)
+    db.execute("INSERT INTO reports (reference, date, first_seen, last_seen) VALUES (?, ?, ?, ?)",
+               ("090000", "1/5/2000", "2024-01-01", "2024-01-01"))
+    db.commit()
+    db.close()
+    store = MetadataStore(path)
+    assert store.query(date_from="2000-01-05")[0]["day"] == "2000-01-05"
+    indexes = {row[0] for row in store.db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "reports_day" in indexes and "reports_date" not in indexes
+    store.close()
@@ -0,0 +1,38 @@
+from nwt import trace
+
+
+def test_summary_of_point_events_only():
+    # A run that fails before its first timed phase still records counts
+    events = [{"event": "page", "page": 1, "t": 100.0}, {"event": "page", "page": 2, "t": 102.0}]
+    lines = trace.summarize(events)
+    assert len(lines) == 2
+    assert lines[-1].startswith("wall 2.0s, 2 pages")
+
+
+def test_summary_of_phases():
+    events = [
+        {"phase": "navigate", "seconds": 1.5, "t": 101.5},
+        {"phase": "parse", "seconds": 0.5, "t": 102.0},
+        {"phase": "transfer", "seconds": 2.0, "bytes": 4000000, "t": 104.0},
+        {"event": "page", "page": 1, "t": 104.0},
+    ]
+    lines = trace.summarize(events)
+    assert [line.split()[0] for line in lines[1:4]] == ["transfer", "navigate", "parse"]
+    assert "4.0 MB transferred" in lines[-1]
+
+
+def test_summary_of_an_empty_trace():
+    assert trace.summarize([]) == ["(trace is empty)"]
+
+
+def test_written_trace_round_trips(tmp_path, monkeypatch):
+    # Put tracing back the way it was afterwards
+    monkeypatch.setattr(trace, "_path", None)
+    path = str(tmp_path / "trace.jsonl")
+    trace.enable(path)
+    with trace.phase("parse", page=3):
+        pass
+    trace.count("page", page=3)
+    events = trace.load(path)
+    assert [event.get("phase") or event.get("event") for event in events] == ["parse", "page"]
+    assert events[0]["page"] == 3